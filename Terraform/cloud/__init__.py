@@ -0,0 +1,7 @@
+"""
+Terraform Cloud / HCP Terraform client and commands
+
+Sublime Text only loads the modules at the root of the package, so nothing in
+here is imported until a cloud command first runs. The commands are
+registered by the shims in terraform_cloud_commands.py.
+"""
@@ -0,0 +1,290 @@
+"""
+Response cache for the Terraform Cloud API
+Serves repeat requests from memory (and optionally disk) with per-resource TTLs
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import sublime
+
+from ..terraform_settings import get_settings
+
+
+class TerraformCloudCacheEntry:
+    """A cached API response"""
+
+    __slots__ = ("data", "stored_at", "ttl", "etag", "last_modified", "size")
+
+    def __init__(self, data, stored_at, ttl, etag=None, last_modified=None, size=0):
+        self.data = data
+        self.stored_at = stored_at
+        self.ttl = ttl
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+
+    def age(self):
+        """Seconds since the entry was stored or last revalidated"""
+        return time.time() - self.stored_at
+
+    def is_fresh(self):
+        """Check if the entry can be used without revalidation"""
+        return self.age() < self.ttl
+
+    def to_json(self, key):
+        """Serialize the entry for the on-disk cache"""
+        return [
+            key,
+            self.stored_at,
+            self.ttl,
+            self.etag,
+            self.last_modified,
+            self.size,
+            self.data,
+        ]
+
+    @classmethod
+    def from_json(cls, item):
+        """Deserialize an entry from the on-disk cache"""
+        key, stored_at, ttl, etag, last_modified, size, data = item
+        return key, cls(data, stored_at, ttl, etag, last_modified, size)
+
+
+class TerraformCloudResponseCache:
+    """Size-bounded LRU cache of API responses with stale-while-revalidate
+
+    Fresh entries are served directly. Stale entries younger than stale_ttl
+    are served immediately while a background refresh revalidates them with
+    If-None-Match / If-Modified-Since. Older entries are refetched inline.
+    """
+
+    # Seconds a response stays fresh, by resource type
+    DEFAULT_TTLS = {
+        "organizations": 3600,
+        "workspaces": 300,
+        "runs": 15,
+        "default": 60,
+    }
+
+    CACHE_FILE = "cloud-cache.json"
+
+    def __init__(
+        self,
+        ttls=None,
+        stale_ttl=86400,
+        max_entries=1000,
+        max_bytes=32 * 1024 * 1024,
+        persist=False,
+    ):
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persist = persist
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._revalidate_executor = None
+        self._loaded = not persist
+        self._save_pending = False
+
+    def get_ttl(self, url):
+        """Get the TTL for a URL based on the resource it points to"""
+        parsed = urllib.parse.urlsplit(url)
+        segments = [s for s in parsed.path.split("/") if s]
+        include = urllib.parse.parse_qs(parsed.query).get("include", [""])[0]
+        if "runs" in segments or "run" in include:
+            return self.ttls["runs"]
+        if "workspaces" in segments:
+            return self.ttls["workspaces"]
+        if segments and segments[-1] == "organizations":
+            return self.ttls["organizations"]
+        return self.ttls["default"]
+
+    def get(self, key):
+        """Get an entry, or None if missing or too stale to serve"""
+        self._load()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.age() >= entry.ttl + self.stale_ttl:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, data, ttl, etag=None, last_modified=None, size=0):
+        """Store a response and evict the least recently used entries"""
+        self._load()
+        entry = TerraformCloudCacheEntry(
+            data, time.time(), ttl, etag, last_modified, size
+        )
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+        self._schedule_save()
+
+    def touch(self, key):
+        """Mark an entry as fresh again after a 304 Not Modified"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                entry.stored_at = time.time()
+        self._schedule_save()
+
+    def revalidate_async(self, key, refresh):
+        """Run refresh() in the background unless key is already refreshing"""
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+            if self._revalidate_executor is None:
+                self._revalidate_executor = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix="terraform-cloud-cache"
+                )
+            executor = self._revalidate_executor
+
+        def run():
+            try:
+                refresh()
+            except Exception as e:
+                print(f"Terraform Cloud cache refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        executor.submit(run)
+
+    def clear(self):
+        """Drop every entry, including the on-disk cache"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        self._loaded = True
+
+        path = self.get_cache_file()
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        """Persist the cache and stop background refreshes"""
+        with self._lock:
+            executor, self._revalidate_executor = self._revalidate_executor, None
+        if executor:
+            executor.shutdown(wait=False)
+        self.save()
+
+    def _remove(self, key):
+        """Remove an entry; the lock must be held"""
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._bytes -= entry.size
+
+    def get_cache_file(self):
+        """Get the path of the on-disk cache"""
+        if not self.persist:
+            return None
+        return os.path.join(sublime.cache_path(), "Terraform", self.CACHE_FILE)
+
+    def _load(self):
+        """Load the on-disk cache on first use"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        path = self.get_cache_file()
+        if not path or not os.path.exists(path):
+            return
+
+        try:
+            with open(path, "r") as f:
+                items = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return
+
+        with self._lock:
+            for item in items:
+                try:
+                    key, entry = TerraformCloudCacheEntry.from_json(item)
+                except (TypeError, ValueError):
+                    continue
+                if key not in self._entries:
+                    self._entries[key] = entry
+                    self._bytes += entry.size
+
+    def _schedule_save(self):
+        """Save the cache to disk a few seconds after the last change"""
+        if not self.persist or self._save_pending:
+            return
+        self._save_pending = True
+        sublime.set_timeout_async(self.save, 5000)
+
+    def save(self):
+        """Write the cache to disk"""
+        self._save_pending = False
+        path = self.get_cache_file()
+        if not path:
+            return
+
+        with self._lock:
+            items = [entry.to_json(key) for key, entry in self._entries.items()]
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(items, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except (IOError, OSError) as e:
+            print(f"Failed to save Terraform Cloud cache: {e}")
+
+
+# Global cache instance
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Get the shared response cache, or None if caching is disabled"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            cloud_settings = get_settings().get("terraform_cloud", {}) or {}
+            cache_settings = cloud_settings.get("cache", {}) or {}
+            if not cache_settings.get("enabled", True):
+                return None
+
+            _response_cache = TerraformCloudResponseCache(
+                ttls=cache_settings.get("ttl"),
+                stale_ttl=cache_settings.get("stale_ttl", 86400),
+                max_entries=cache_settings.get("max_entries", 1000),
+                max_bytes=cache_settings.get("max_size_mb", 32) * 1024 * 1024,
+                persist=cache_settings.get("persist", False),
+            )
+        return _response_cache
+
+
+def close_response_cache():
+    """Persist and release the shared response cache"""
+    global _response_cache
+    with _response_cache_lock:
+        cache, _response_cache = _response_cache, None
+
+    if cache:
+        cache.close()
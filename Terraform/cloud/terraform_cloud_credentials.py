@@ -0,0 +1,133 @@
+"""
+Credentials discovery for Terraform Cloud / HCP Terraform and Terraform Enterprise
+Resolves API tokens the same way the Terraform CLI does
+"""
+
+import json
+import os
+import threading
+
+import sublime
+
+from ..terraform_settings import get_settings_snapshot
+
+DEFAULT_HOSTNAME = "app.terraform.io"
+
+
+def get_default_hostname():
+    """Get the configured Terraform Cloud / Enterprise hostname"""
+    return get_settings_snapshot().get("terraform_cloud.hostname") or DEFAULT_HOSTNAME
+
+
+def get_credentials_file():
+    """Get the path of the CLI credentials file written by terraform login"""
+    if sublime.platform() == "windows" and os.environ.get("APPDATA"):
+        return os.path.join(
+            os.environ["APPDATA"], "terraform.d", "credentials.tfrc.json"
+        )
+    return os.path.expanduser("~/.terraform.d/credentials.tfrc.json")
+
+
+def encode_token_variable(hostname):
+    """Get the TF_TOKEN_ environment variable name for a hostname"""
+    return "TF_TOKEN_" + hostname.replace("-", "__").replace(".", "_")
+
+
+def decode_token_variable(name):
+    """Get the hostname a TF_TOKEN_ environment variable is for"""
+    encoded = name[len("TF_TOKEN_") :]
+    return encoded.replace("__", "-").replace("_", ".").lower()
+
+
+class TerraformCredentialsResolver:
+    """Resolves API tokens per hostname
+
+    Tokens come from TF_TOKEN_<host> environment variables first, then from
+    the CLI credentials file. The parsed file is cached and only read again
+    once its modification time or size changes.
+    """
+
+    def __init__(self, credentials_file=None):
+        self.credentials_file = credentials_file
+        self._credentials = {}
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def get_token(self, hostname=None):
+        """Get the token for a hostname, or None"""
+        hostname = (hostname or get_default_hostname()).lower()
+        return self.get_env_token(hostname) or self.get_file_token(hostname)
+
+    def get_env_token(self, hostname):
+        """Get a token from a TF_TOKEN_ environment variable"""
+        token = os.environ.get(encode_token_variable(hostname))
+        if token:
+            return token
+
+        # Hyphens may also be left as-is in the variable name
+        for name, value in os.environ.items():
+            if name.startswith("TF_TOKEN_") and value:
+                if decode_token_variable(name) == hostname:
+                    return value
+        return None
+
+    def get_file_token(self, hostname):
+        """Get a token from the CLI credentials file"""
+        credentials = self.get_credentials()
+        return (credentials.get(hostname) or {}).get("token")
+
+    def get_hostnames(self):
+        """Get every hostname that has credentials"""
+        hostnames = set(self.get_credentials())
+        for name, value in os.environ.items():
+            if name.startswith("TF_TOKEN_") and value:
+                hostnames.add(decode_token_variable(name))
+        return sorted(hostnames)
+
+    def get_credentials(self):
+        """Get the credentials file contents, re-reading it only when changed"""
+        path = self.credentials_file or get_credentials_file()
+        try:
+            stat = os.stat(path)
+            signature = (path, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+
+        with self._lock:
+            if signature == self._signature:
+                return self._credentials
+
+            credentials = {}
+            if signature:
+                try:
+                    with open(path, "r") as f:
+                        data = json.load(f)
+                    credentials = {
+                        host.lower(): value
+                        for host, value in (data.get("credentials") or {}).items()
+                    }
+                except (json.JSONDecodeError, IOError, AttributeError):
+                    pass
+
+            self._credentials = credentials
+            self._signature = signature
+            return credentials
+
+
+# Global resolver instance
+_credentials_resolver = TerraformCredentialsResolver()
+
+
+def get_credentials_resolver():
+    """Get the shared credentials resolver"""
+    return _credentials_resolver
+
+
+def resolve_token(hostname=None):
+    """Get the token for a hostname from the CLI credentials or settings"""
+    token = _credentials_resolver.get_token(hostname)
+    if token:
+        return token
+
+    # Fall back to settings (not recommended)
+    return get_settings_snapshot().get("terraform_cloud.token") or None
@@ -0,0 +1,142 @@
+"""
+Workspace dashboard for Terraform Cloud / HCP Terraform
+Lists every workspace with its current run status, grouped and sorted
+"""
+
+import sublime
+import sublime_plugin
+
+from . import terraform_cloud
+from .terraform_cloud import (
+    TerraformCloudAPI,
+    TerraformCloudShowWorkspacesCommand,
+    get_cloud_api,
+    run_cloud_task,
+)
+
+
+class TerraformCloudWorkspaceIndex:
+    """Sort and filter indexes over the workspaces of an organization
+
+    Built once per load so that switching between views of a large
+    organization does not walk the whole workspace list again.
+    """
+
+    def __init__(self, workspaces):
+        self.workspaces = workspaces
+        self.by_status = {}
+        self.by_tag = {}
+        self.by_environment = {}
+
+        for ws in workspaces:
+            attrs = ws.get("attributes", {})
+            status = TerraformCloudAPI.get_current_run_status(ws) or "no runs"
+            self.by_status.setdefault(status, []).append(ws)
+            self.by_environment.setdefault(
+                attrs.get("environment") or "default", []
+            ).append(ws)
+            for tag in attrs.get("tag-names") or []:
+                self.by_tag.setdefault(tag, []).append(ws)
+
+        self.by_name = sorted(
+            workspaces, key=lambda ws: ws.get("attributes", {}).get("name", "")
+        )
+        self.by_updated = sorted(
+            workspaces,
+            key=lambda ws: ws.get("attributes", {}).get("updated-at") or "",
+            reverse=True,
+        )
+
+    def get_views(self):
+        """Get the available views as (caption, details, workspaces) tuples"""
+        views = [
+            ("All workspaces", "Sorted by name", self.by_name),
+            ("Recently updated", "Sorted by last update", self.by_updated),
+        ]
+
+        for status, workspaces in sorted(
+            self.by_status.items(), key=lambda item: -len(item[1])
+        ):
+            views.append((f"Status: {status}", "Current run status", workspaces))
+
+        for tag, workspaces in sorted(self.by_tag.items()):
+            views.append((f"Tag: {tag}", "Workspace tag", workspaces))
+
+        if len(self.by_environment) > 1:
+            for environment, workspaces in sorted(self.by_environment.items()):
+                views.append(
+                    (f"Environment: {environment}", "Workspace environment", workspaces)
+                )
+
+        return views
+
+
+class TerraformCloudWorkspaceDashboardCommand(sublime_plugin.WindowCommand):
+    """Show every workspace of the organization grouped by status and tag"""
+
+    def run(self):
+        state = terraform_cloud._cloud_state
+        if not state.token:
+            self.window.run_command("terraform_cloud_login")
+            return
+
+        if not state.organization:
+            sublime.error_message("No organization selected")
+            return
+
+        api = get_cloud_api(state.token, state.hostname)
+        organization = state.organization
+        run_cloud_task(
+            lambda task: TerraformCloudWorkspaceIndex(api.get_workspaces(organization)),
+            on_done=self.show_views,
+            on_error=lambda e: sublime.error_message(
+                f"Failed to get workspaces: {str(e)}"
+            ),
+            message="Loading workspace dashboard...",
+        )
+
+    def show_views(self, index):
+        """Show the dashboard views"""
+        terraform_cloud._cloud_state.workspaces = index.workspaces
+        if not index.workspaces:
+            sublime.status_message("No workspaces found")
+            return
+
+        views = index.get_views()
+        items = [
+            [caption, f"{details} · {len(workspaces)} workspace(s)"]
+            for caption, details, workspaces in views
+        ]
+
+        self.window.show_quick_panel(
+            items,
+            lambda idx: self.on_view_selected(idx, views, index),
+            placeholder=f"{len(index.workspaces)} workspaces",
+        )
+
+    def on_view_selected(self, index, views, workspace_index):
+        """Show the workspaces of the selected view"""
+        if index < 0:
+            return
+
+        caption, _, workspaces = views[index]
+        formatter = TerraformCloudShowWorkspacesCommand(self.window)
+        items = [formatter.format_workspace(ws) for ws in workspaces]
+
+        self.window.show_quick_panel(
+            items,
+            lambda idx: self.on_workspace_selected(idx, workspaces, workspace_index),
+            placeholder=f"{caption} · select workspace to view runs",
+        )
+
+    def on_workspace_selected(self, index, workspaces, workspace_index):
+        """Show the runs of the selected workspace, or go back to the views"""
+        if index < 0:
+            self.show_views(workspace_index)
+            return
+
+        terraform_cloud._cloud_state.current_workspace = workspaces[index]
+        self.window.run_command("terraform_cloud_show_runs")
+
+    def is_enabled(self):
+        return terraform_cloud._cloud_state.token is not None
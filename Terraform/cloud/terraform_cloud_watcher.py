@@ -0,0 +1,548 @@
+"""
+Live run watcher for Terraform Cloud / HCP Terraform
+Follows runs and workspaces in the background and reports status changes
+"""
+
+import threading
+import time
+
+import sublime
+import sublime_plugin
+
+from . import terraform_cloud
+from .terraform_cloud import TerraformCloudAPIError, get_cloud_api
+
+# Run statuses while Terraform Cloud is actively working on a run
+ACTIVE_STATUSES = {
+    "pending",
+    "fetching",
+    "fetching_completed",
+    "pre_plan_running",
+    "pre_plan_completed",
+    "queuing",
+    "plan_queued",
+    "planning",
+    "post_plan_running",
+    "post_plan_completed",
+    "cost_estimating",
+    "policy_checking",
+    "confirmed",
+    "apply_queued",
+    "pre_apply_running",
+    "pre_apply_completed",
+    "applying",
+}
+
+# Run statuses waiting for someone to confirm, discard or override
+WAITING_STATUSES = {
+    "planned",
+    "cost_estimated",
+    "policy_checked",
+    "policy_override",
+    "policy_soft_failed",
+    "post_plan_awaiting_decision",
+}
+
+# Run statuses after which a run no longer changes
+FINAL_STATUSES = {
+    "applied",
+    "planned_and_finished",
+    "planned_and_saved",
+    "errored",
+    "discarded",
+    "canceled",
+    "force_canceled",
+}
+
+
+def get_run_workspace_id(run):
+    """Get the ID of the workspace a run belongs to, or None"""
+    workspace = run.get("relationships", {}).get("workspace", {}).get("data")
+    return workspace["id"] if workspace else None
+
+
+class TerraformCloudWatchTarget:
+    """A run or workspace followed by the watcher"""
+
+    __slots__ = (
+        "kind",
+        "id",
+        "name",
+        "workspace_id",
+        "workspace_name",
+        "hostname",
+        "organization",
+        "token",
+        "status",
+        "run_id",
+        "run_number",
+        "interval",
+        "next_poll",
+    )
+
+    def __init__(
+        self,
+        kind,
+        id,
+        name,
+        workspace_id,
+        workspace_name,
+        hostname,
+        organization,
+        token,
+    ):
+        self.kind = kind
+        self.id = id
+        self.name = name
+        self.workspace_id = workspace_id
+        self.workspace_name = workspace_name
+        self.hostname = hostname
+        self.organization = organization
+        self.token = token
+        self.status = None
+        self.run_id = id if kind == "run" else None
+        self.run_number = None
+        self.interval = 0
+        self.next_poll = 0
+
+    @property
+    def key(self):
+        return (self.kind, self.id)
+
+
+class TerraformCloudRunWatcher:
+    """Polls watched runs and workspaces from a single scheduler thread
+
+    Targets of the same organization are polled together with one request
+    per batch of workspaces. Each target picks its own polling interval from
+    its status: fast while a run is active, slower while it waits for a
+    decision, and backing off exponentially while idle. A poll is made as
+    soon as any target of the organization is due.
+    """
+
+    # Seconds between polls, by run activity
+    ACTIVE_INTERVAL = 3
+    WAITING_INTERVAL = 15
+    IDLE_INTERVAL = 30
+    IDLE_INTERVAL_MAX = 300
+
+    # Workspaces per batched runs request, keeps URLs short
+    BATCH_SIZE = 25
+
+    # Pages of a batch's runs read before the workspaces still without a run
+    # are looked up one at a time, so a workspace with no runs doesn't page
+    # through the history of the others
+    MAX_BATCH_PAGES = 2
+
+    def __init__(self):
+        self._targets = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._org_runs_supported = {}
+
+    def watch_workspace(self, workspace, hostname, organization, token):
+        """Follow the latest run of a workspace"""
+        name = workspace["attributes"]["name"]
+        target = TerraformCloudWatchTarget(
+            "workspace",
+            workspace["id"],
+            name,
+            workspace["id"],
+            name,
+            hostname,
+            organization,
+            token,
+        )
+        self._add(target)
+
+    def watch_run(self, run, workspace, hostname, organization, token):
+        """Follow a single run until it reaches a final status"""
+        attrs = run["attributes"]
+        workspace_name = workspace["attributes"]["name"]
+        target = TerraformCloudWatchTarget(
+            "run",
+            run["id"],
+            f"{workspace_name} run #{attrs.get('run-number', '?')}",
+            workspace["id"],
+            workspace_name,
+            hostname,
+            organization,
+            token,
+        )
+        target.status = attrs.get("status")
+        self._add(target)
+
+    def unwatch(self, key):
+        """Stop following a target"""
+        with self._condition:
+            self._targets.pop(key, None)
+        self._update_status_bar()
+
+    def unwatch_all(self):
+        """Stop following every target"""
+        with self._condition:
+            self._targets.clear()
+        self._update_status_bar()
+
+    def get_targets(self):
+        """Get the watched targets"""
+        with self._condition:
+            return list(self._targets.values())
+
+    def stop(self):
+        """Stop the scheduler thread"""
+        with self._condition:
+            self._stopped = True
+            self._targets.clear()
+            self._condition.notify()
+
+    def _add(self, target):
+        """Add a target and wake the scheduler to poll it right away"""
+        with self._condition:
+            self._targets[target.key] = target
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="terraform-cloud-watcher", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+        self._update_status_bar()
+
+    def _run(self):
+        """Scheduler loop: sleep until a target is due, then poll"""
+        while True:
+            groups = self._wait_for_due_groups()
+            if groups is None:
+                return
+
+            for (hostname, organization, token), targets in groups.items():
+                try:
+                    self._poll_organization(hostname, organization, token, targets)
+                except Exception as e:
+                    print(f"Terraform Cloud watcher: {e}")
+                    for target in targets:
+                        self._reschedule(target, changed=False, failed=True)
+
+            self._update_status_bar()
+
+    def _wait_for_due_groups(self):
+        """Wait until a target is due and get the targets to poll
+
+        Returns the targets of every organization that has one due, by
+        (hostname, organization, token), or None once stopped.
+        """
+        with self._condition:
+            while not self._stopped:
+                now = time.monotonic()
+                if self._targets:
+                    next_poll = min(t.next_poll for t in self._targets.values())
+                    if next_poll <= now:
+                        break
+                    self._condition.wait(next_poll - now)
+                else:
+                    self._condition.wait()
+
+            if self._stopped:
+                return None
+
+            due_orgs = {
+                (t.hostname, t.organization, t.token)
+                for t in self._targets.values()
+                if t.next_poll <= now
+            }
+            groups = {}
+            for target in self._targets.values():
+                group = (target.hostname, target.organization, target.token)
+                if group in due_orgs:
+                    groups.setdefault(group, []).append(target)
+            return groups
+
+    def _poll_organization(self, hostname, organization, token, targets):
+        """Refresh the status of all targets of an organization"""
+        api = get_cloud_api(token, hostname)
+        runs = self._get_latest_runs(api, organization, targets)
+
+        latest = {}
+        by_id = {}
+        for run in runs:
+            by_id[run["id"]] = run
+            workspace_id = get_run_workspace_id(run)
+            if workspace_id:
+                # Runs are listed newest first
+                latest.setdefault(workspace_id, run)
+
+        reported = set()
+        for target in targets:
+            if target.kind == "run":
+                run = by_id.get(target.id)
+                if run is None:
+                    run = api.make_request(f"/runs/{target.id}", use_cache=False)
+                    run = run.get("data")
+            else:
+                run = latest.get(target.workspace_id)
+
+            changed = self._apply_run(target, run, reported)
+            self._reschedule(target, changed)
+
+    def _get_latest_runs(self, api, organization, targets):
+        """Get the most recent runs of the targets' workspaces"""
+        workspaces = sorted({(t.workspace_name, t.workspace_id) for t in targets})
+
+        if self._org_runs_supported.get(organization, True):
+            try:
+                runs = []
+                for i in range(0, len(workspaces), self.BATCH_SIZE):
+                    runs.extend(
+                        self._get_batch_runs(
+                            api, organization, workspaces[i : i + self.BATCH_SIZE]
+                        )
+                    )
+                return runs
+            except TerraformCloudAPIError as e:
+                if e.status != 404:
+                    raise
+                # Older Terraform Enterprise releases lack organization runs
+                self._org_runs_supported[organization] = False
+
+        runs = []
+        for workspace_id in sorted({workspace_id for _, workspace_id in workspaces}):
+            runs.extend(self._get_workspace_runs(api, workspace_id))
+        return runs
+
+    def _get_workspace_runs(self, api, workspace_id):
+        """Get the latest run of one workspace, as a list of at most one run"""
+        result = api.make_request(
+            f"/workspaces/{workspace_id}/runs",
+            params={"page[size]": 1},
+            use_cache=False,
+        )
+        runs = result.get("data", [])
+        for run in runs:
+            run.setdefault("relationships", {})["workspace"] = {
+                "data": {"id": workspace_id, "type": "workspaces"}
+            }
+        return runs
+
+    def _get_batch_runs(self, api, organization, workspaces):
+        """Get the runs of a batch of (name, id) workspaces, newest first
+
+        Busy workspaces can fill a page on their own, so up to
+        MAX_BATCH_PAGES pages are read until every workspace of the batch has
+        its latest run. Workspaces still missing one are looked up on their
+        own.
+        """
+        missing = {workspace_id for _, workspace_id in workspaces}
+        params = {
+            "filter[workspace_names]": ",".join(name for name, _ in workspaces),
+            "page[size]": api.PAGE_SIZE,
+        }
+        runs = []
+        for page_number in range(1, self.MAX_BATCH_PAGES + 1):
+            result = api.make_request(
+                f"/organizations/{organization}/runs",
+                params=dict(params, **{"page[number]": page_number}),
+                use_cache=False,
+            )
+            for run in result.get("data", []):
+                runs.append(run)
+                missing.discard(get_run_workspace_id(run))
+            if not missing or not result.get("links", {}).get("next"):
+                # The last page lists every run of the missing workspaces
+                return runs
+
+        for workspace_id in sorted(missing):
+            runs.extend(self._get_workspace_runs(api, workspace_id))
+        return runs
+
+    def _apply_run(self, target, run, reported):
+        """Update a target from a run and report a status transition
+
+        reported holds the transitions already shown during this poll, so a
+        run watched both directly and through its workspace is shown once.
+        """
+        if run is None:
+            return False
+
+        attrs = run.get("attributes", {})
+        status = attrs.get("status")
+        previous, previous_run = target.status, target.run_id
+        target.status = status
+        target.run_id = run["id"]
+        target.run_number = attrs.get("run-number", target.run_number)
+
+        if status == previous and run["id"] == previous_run:
+            return False
+
+        if previous is not None and (run["id"], status) not in reported:
+            reported.add((run["id"], status))
+            number = f" #{target.run_number}" if target.run_number else ""
+            message = (
+                f"Terraform Cloud: {target.workspace_name} run{number} "
+                f"{previous} → {status}"
+            )
+            sublime.set_timeout(lambda: sublime.status_message(message), 0)
+        return True
+
+    def _reschedule(self, target, changed, failed=False):
+        """Pick the next poll time of a target from its status"""
+        if target.kind == "run" and target.status in FINAL_STATUSES:
+            with self._condition:
+                self._targets.pop(target.key, None)
+            return
+
+        if failed:
+            interval = min(max(target.interval, 1) * 2, self.IDLE_INTERVAL_MAX)
+        elif target.status in ACTIVE_STATUSES:
+            interval = self.ACTIVE_INTERVAL
+        elif target.status in WAITING_STATUSES:
+            interval = self.WAITING_INTERVAL
+        elif changed or target.interval < self.IDLE_INTERVAL:
+            interval = self.IDLE_INTERVAL
+        else:
+            interval = min(target.interval * 2, self.IDLE_INTERVAL_MAX)
+
+        target.interval = interval
+        target.next_poll = time.monotonic() + interval
+
+    def get_summary(self):
+        """Get a short status bar summary of the watched targets"""
+        targets = self.get_targets()
+        if not targets:
+            return None
+
+        active = sum(1 for t in targets if t.status in ACTIVE_STATUSES)
+        waiting = sum(1 for t in targets if t.status in WAITING_STATUSES)
+        parts = [f"TFC: watching {len(targets)}"]
+        if active:
+            parts.append(f"{active} running")
+        if waiting:
+            parts.append(f"{waiting} awaiting confirmation")
+        return ", ".join(parts)
+
+    def _update_status_bar(self):
+        """Show the summary in the status bar of every window"""
+        summary = self.get_summary()
+
+        def update():
+            for window in sublime.windows():
+                for view in window.views():
+                    if summary:
+                        view.set_status("terraform_cloud_watcher", summary)
+                    else:
+                        view.erase_status("terraform_cloud_watcher")
+
+        sublime.set_timeout(update, 0)
+
+
+# Global watcher instance
+_run_watcher = None
+
+
+def get_run_watcher():
+    """Get the shared run watcher"""
+    global _run_watcher
+    if _run_watcher is None:
+        _run_watcher = TerraformCloudRunWatcher()
+    return _run_watcher
+
+
+def stop_run_watcher():
+    """Stop the shared run watcher"""
+    global _run_watcher
+    if _run_watcher:
+        _run_watcher.stop()
+        _run_watcher = None
+
+
+class TerraformCloudWatchWorkspaceCommand(sublime_plugin.WindowCommand):
+    """Watch the latest run of the current workspace"""
+
+    def run(self):
+        state = terraform_cloud._cloud_state
+        get_run_watcher().watch_workspace(
+            state.current_workspace, state.hostname, state.organization, state.token
+        )
+        name = state.current_workspace["attributes"]["name"]
+        sublime.status_message(f"Watching workspace {name}")
+
+    def is_enabled(self):
+        return terraform_cloud._cloud_state.current_workspace is not None
+
+
+class TerraformCloudWatchRunCommand(sublime_plugin.WindowCommand):
+    """Watch the selected run until it finishes"""
+
+    def run(self):
+        state = terraform_cloud._cloud_state
+        get_run_watcher().watch_run(
+            state.current_run,
+            state.current_workspace,
+            state.hostname,
+            state.organization,
+            state.token,
+        )
+        number = state.current_run["attributes"].get("run-number", "?")
+        sublime.status_message(f"Watching run #{number}")
+
+    def is_enabled(self):
+        state = terraform_cloud._cloud_state
+        return state.current_run is not None and state.current_workspace is not None
+
+
+class TerraformCloudShowWatchedCommand(sublime_plugin.WindowCommand):
+    """Show watched runs and workspaces, select one to stop watching it"""
+
+    def run(self):
+        targets = get_run_watcher().get_targets()
+        if not targets:
+            sublime.status_message("Nothing is being watched")
+            return
+
+        items = []
+        for target in targets:
+            items.append(
+                [
+                    f"{'🔄' if target.kind == 'run' else '📂'} {target.name}",
+                    f"Status: {target.status or 'unknown'}",
+                    f"Next poll in {max(0, int(target.next_poll - time.monotonic()))}s",
+                ]
+            )
+
+        self.window.show_quick_panel(
+            items,
+            lambda idx: self.on_select(idx, targets),
+            placeholder="Select to stop watching",
+        )
+
+    def on_select(self, index, targets):
+        """Stop watching the selected target"""
+        if index < 0:
+            return
+
+        target = targets[index]
+        get_run_watcher().unwatch(target.key)
+        sublime.status_message(f"Stopped watching {target.name}")
+
+
+class TerraformCloudUnwatchAllCommand(sublime_plugin.WindowCommand):
+    """Stop watching every run and workspace"""
+
+    def run(self):
+        get_run_watcher().unwatch_all()
+        sublime.status_message("Stopped watching all runs and workspaces")
+
+    def is_enabled(self):
+        return bool(get_run_watcher().get_targets())
+
+
+def show_watcher_status(view):
+    """Show the watcher summary in a view"""
+    if _run_watcher is None:
+        return
+
+    summary = _run_watcher.get_summary()
+    if summary:
+        view.set_status("terraform_cloud_watcher", summary)
+    else:
+        view.erase_status("terraform_cloud_watcher")
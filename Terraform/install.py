@@ -10,7 +10,6 @@ import platform
 import shutil
 import subprocess
 import sys
-import urllib.request
 
 
 def check_sublime_version():
@@ -73,6 +72,9 @@ def get_packages_path():
 
 def download_terraform_ls():
     """Download terraform-ls binary"""
+    # Sublime Text loads this file as a plugin too, keep urllib out of that
+    import urllib.request
+
     print("\n🔍 Checking terraform-ls...")
 
     # Check if already exists
@@ -8,10 +8,20 @@ import os
 import sublime
 import sublime_plugin
 
-from .terraform_cloud import (
+from .terraform_cloud_commands import (
     TerraformCloudLoginCommand,
     TerraformCloudShowRunsCommand,
+    TerraformCloudShowWatchedCommand,
     TerraformCloudShowWorkspacesCommand,
+    TerraformCloudWatchRunCommand,
+    TerraformCloudWatchWorkspaceCommand,
+    TerraformCloudWorkspaceDashboardCommand,
+    unload_cloud,
+)
+from .terraform_code_lens import (
+    TerraformReferenceCountListener,
+    TerraformUpdateReferenceCountsCommand,
+    close_reference_counts,
 )
 from .terraform_commands import (
     TerraformApplyCommand,
@@ -21,14 +31,50 @@ from .terraform_commands import (
     TerraformPlanCommand,
     TerraformValidateCommand,
 )
+from .terraform_completions import TerraformSchemaCompletionListener
+from .terraform_lockfile import close_lock_file_cache
 from .terraform_lsp import TerraformLSPPlugin
+from .terraform_lsp_trace import (
+    TerraformResetLspStatsCommand,
+    TerraformShowLspStatsCommand,
+    close_lsp_tracer,
+)
 from .terraform_module_explorer import (
     TerraformModuleExplorerListener,
     TerraformShowModulesCommand,
     TerraformShowProvidersCommand,
 )
+from .terraform_modules import (
+    TerraformGotoModuleSourceCommand,
+    TerraformShowModuleInterfaceCommand,
+    close_module_index,
+)
+from .terraform_perf import (
+    TerraformExportPerformanceTraceCommand,
+    TerraformResetPerformanceStatsCommand,
+    TerraformShowPerformanceStatsCommand,
+    load_perf_settings,
+    span,
+    unload_perf_settings,
+)
 from .terraform_project import TerraformProjectDetector
-from .terraform_settings import TerraformSettings
+from .terraform_references import (
+    TerraformFindReferencesCommand,
+    TerraformReferenceListener,
+    TerraformShowDependenciesCommand,
+    TerraformShowDependentsCommand,
+    close_reference_graphs,
+)
+from .terraform_report import (
+    TerraformModuleReportCommand,
+    TerraformProviderInventoryCommand,
+)
+from .terraform_schema import (
+    TerraformRefreshProviderSchemaCommand,
+    close_schema_cache,
+    get_provider_schemas,
+)
+from .terraform_settings import TerraformSettings, unload_settings_snapshot
 
 # Plugin version
 __version__ = "1.0.0"
@@ -43,15 +89,15 @@ def plugin_loaded():
 
     # Initialize settings
     settings = TerraformSettings()
+    load_perf_settings()
 
-    # Check for required dependencies
-    check_dependencies()
-
-    # Initialize project detector
-    TerraformProjectDetector.initialize()
+    with span("plugin.loaded"):
+        # Initialize project detector
+        TerraformProjectDetector.initialize()
 
-    # Setup terraform-ls if needed
-    setup_language_server()
+    # Running terraform and downloading terraform-ls can take seconds, so
+    # keep them out of Sublime Text's startup
+    sublime.set_timeout_async(check_environment)
 
     print(f"Terraform plugin v{__version__} loaded successfully")
 
@@ -60,9 +106,29 @@ def plugin_unloaded():
     """Called when the plugin is about to be unloaded"""
     # Cleanup any resources
     TerraformProjectDetector.cleanup()
+    unload_cloud()
+    close_schema_cache()
+    close_reference_counts()
+    close_reference_graphs()
+    close_module_index()
+    close_lock_file_cache()
+    unload_perf_settings()
+    close_lsp_tracer()
+    unload_settings_snapshot()
     print("Terraform plugin unloaded")
 
 
+def check_environment():
+    """Check the dependencies and set up terraform-ls in the background"""
+    # Check for required dependencies
+    with span("plugin.check_dependencies"):
+        check_dependencies()
+
+    # Setup terraform-ls if needed
+    with span("plugin.setup_language_server"):
+        setup_language_server()
+
+
 def check_dependencies():
     """Check for required dependencies"""
     # Check if LSP package is installed
@@ -194,7 +260,11 @@ class TerraformEventListener(sublime_plugin.EventListener):
         """Called when a view gains focus"""
         if self.is_terraform_file(view):
             # Update project context
-            TerraformProjectDetector.detect_project(view)
+            project = TerraformProjectDetector.detect_project(view)
+
+            # Cache the provider schemas for completions and hover
+            if project:
+                get_provider_schemas(project.root_path)
 
     def on_load_async(self, view):
         """Called when a file is loaded"""
@@ -0,0 +1,228 @@
+"""
+Block scanner for Terraform files
+Finds the top-level blocks of a file and their attributes without an HCL parser
+"""
+
+import bisect
+import re
+
+# Braces, with strings, heredocs and comments matched whole so the braces in
+# them are skipped. Interpolations may hold quotes: "${join(",", var.x)}"
+BLOCK_TOKENS = re.compile(
+    r'"(?:[^"\\\n$%]|\\.|[$%]\{[^}\n]*\}|[$%])*"'
+    r"|<<-?(\w+)\n.*?^[ \t]*\1[ \t]*$"
+    r"|#[^\n]*|//[^\n]*|/\*.*?\*/"
+    r"|[{}]",
+    re.DOTALL | re.MULTILINE,
+)
+
+# Header of a block: a type followed by quoted or bare labels
+BLOCK_HEADER = re.compile(
+    r'^[ \t]*([A-Za-z_][\w-]*)((?:[ \t]+(?:"[^"\n]*"|[A-Za-z_][\w-]*))*)[ \t]*$'
+)
+
+# Label of a block header
+BLOCK_LABEL = re.compile(r'"([^"\n]*)"|([A-Za-z_][\w-]*)')
+
+# Attribute at the start of a line, like name = value
+ATTRIBUTE = re.compile(r"^[ \t]*([A-Za-z_][\w-]*)[ \t]*=(?![=>])", re.MULTILINE)
+
+# String value of an object, like source = "hashicorp/aws"
+OBJECT_STRING = re.compile(r'([A-Za-z_][\w-]*)[ \t]*=[ \t]*"([^"\n]*)"')
+
+# Brackets and line ends of an expression, with strings, heredocs and
+# comments matched whole like in BLOCK_TOKENS
+EXPRESSION_TOKENS = re.compile(
+    r'"(?:[^"\\\n$%]|\\.|[$%]\{[^}\n]*\}|[$%])*"'
+    r"|<<-?(\w+)\n.*?^[ \t]*\1[ \t]*$"
+    r"|(?P<comment>#[^\n]*|//[^\n]*|/\*.*?\*/)"
+    r"|[\[\](){}\n]",
+    re.DOTALL | re.MULTILINE,
+)
+
+
+class TerraformBlock:
+    """A top-level block of a Terraform file"""
+
+    __slots__ = ("kind", "labels", "start", "body_start", "end", "line", "end_line")
+
+    def __init__(self, kind, labels, start, body_start, end, line, end_line):
+        self.kind = kind
+        self.labels = labels
+        self.start = start
+        self.body_start = body_start
+        self.end = end
+        self.line = line
+        self.end_line = end_line
+
+    @property
+    def address(self):
+        """Get the address expressions use for the block, or None"""
+        labels = self.labels
+        if self.kind == "resource" and len(labels) == 2:
+            return f"{labels[0]}.{labels[1]}"
+        if self.kind == "data" and len(labels) == 2:
+            return f"data.{labels[0]}.{labels[1]}"
+        if len(labels) == 1 and self.kind in BLOCK_PREFIXES:
+            return f"{BLOCK_PREFIXES[self.kind]}.{labels[0]}"
+        return None
+
+
+# Address prefix of the blocks with one label
+BLOCK_PREFIXES = {"variable": "var", "module": "module", "output": "output"}
+
+
+class TerraformLineIndex:
+    """Converts offsets in a text to 1-based line numbers"""
+
+    __slots__ = ("_starts",)
+
+    def __init__(self, text):
+        self._starts = [0]
+        self._starts.extend(m.end() for m in re.finditer("\n", text))
+
+    def line(self, offset):
+        """Get the line of an offset"""
+        return bisect.bisect_right(self._starts, offset)
+
+    def position(self, offset):
+        """Get the line and 1-based column of an offset"""
+        line = bisect.bisect_right(self._starts, offset)
+        return line, offset - self._starts[line - 1] + 1
+
+
+def parse_header(text):
+    """Get (type, labels) of a block header, or None"""
+    match = BLOCK_HEADER.match(text)
+    if not match:
+        return None
+    labels = tuple(
+        quoted if quoted is not None else bare
+        for quoted, bare in BLOCK_LABEL.findall(match.group(2))
+    )
+    return match.group(1), labels
+
+
+def scan_blocks(content, lines=None):
+    """Get the top-level blocks of a file
+
+    Braces are matched one token at a time, so an unclosed block runs to the
+    end of the file.
+    """
+    lines = lines or TerraformLineIndex(content)
+    blocks = []
+    depth = 0
+    header = None
+    for token in BLOCK_TOKENS.finditer(content):
+        value = token.group()
+        if value == "{":
+            if depth == 0:
+                line_start = content.rfind("\n", 0, token.start()) + 1
+                header = (
+                    parse_header(content[line_start : token.start()]),
+                    line_start,
+                    token.end(),
+                )
+            depth += 1
+        elif value == "}" and depth:
+            depth -= 1
+            if depth == 0 and header[0]:
+                blocks.append(make_block(header, token.end(), lines))
+
+    if depth and header[0]:
+        blocks.append(make_block(header, len(content), lines))
+    return blocks
+
+
+def make_block(header, end, lines):
+    """Create a block from its scanned header and end offset"""
+    (kind, labels), start, body_start = header
+    return TerraformBlock(
+        kind, labels, start, body_start, end, lines.line(start), lines.line(end - 1)
+    )
+
+
+def find_nested_blocks(content, block, lines):
+    """Get the blocks nested directly in a block"""
+    blocks = []
+    depth = 0
+    header = None
+    end = max(block.body_start, block.end - 1)
+    for token in BLOCK_TOKENS.finditer(content, block.body_start, end):
+        value = token.group()
+        if value == "{":
+            if depth == 0:
+                line_start = content.rfind("\n", 0, token.start()) + 1
+                header = (
+                    parse_header(content[line_start : token.start()]),
+                    line_start,
+                    token.end(),
+                )
+            depth += 1
+        elif value == "}" and depth:
+            depth -= 1
+            if depth == 0 and header[0]:
+                blocks.append(make_block(header, token.end(), lines))
+    return blocks
+
+
+def find_attributes(content, block):
+    """Get (name, offset) of the attributes set directly in a block"""
+    attributes = []
+    depth = 0
+    position = block.body_start
+    end = max(block.body_start, block.end - 1)
+    for token in BLOCK_TOKENS.finditer(content, block.body_start, end):
+        if depth == 0:
+            attributes.extend(
+                (m.group(1), m.start(1))
+                for m in ATTRIBUTE.finditer(content, position, token.start())
+            )
+        value = token.group()
+        if value == "{":
+            depth += 1
+        elif value == "}" and depth:
+            depth -= 1
+        position = token.end()
+
+    if depth == 0:
+        attributes.extend(
+            (m.group(1), m.start(1)) for m in ATTRIBUTE.finditer(content, position, end)
+        )
+    return attributes
+
+
+def read_expression(content, start, end=None):
+    """Get the expression starting at an offset, up to the end of its line
+
+    Brackets are matched, so values like object({ ... }) span lines.
+    Comments after the expression are left out.
+    """
+    end = len(content) if end is None else end
+    depth = 0
+    for token in EXPRESSION_TOKENS.finditer(content, start, end):
+        value = token.group()
+        if value in "([{":
+            depth += 1
+        elif value in ")]}":
+            depth -= 1
+            if depth < 0:
+                return content[start : token.start()].strip()
+        elif depth == 0 and (value == "\n" or token.group("comment")):
+            return content[start : token.start()].strip()
+    return content[start:end].strip()
+
+
+def get_attribute_values(content, block):
+    """Get {name: expression} of the attributes set directly in a block"""
+    end = max(block.body_start, block.end - 1)
+    values = {}
+    for name, offset in find_attributes(content, block):
+        equals = content.index("=", offset)
+        values[name] = read_expression(content, equals + 1, end)
+    return values
+
+
+def get_object_strings(expression):
+    """Get {key: value} of the string values of an object expression"""
+    return dict(OBJECT_STRING.findall(expression))
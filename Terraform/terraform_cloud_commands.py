@@ -0,0 +1,97 @@
+"""
+Terraform Cloud / HCP Terraform commands
+Shims that import the cloud client from the cloud package on first use
+"""
+
+import sublime_plugin
+
+from .terraform_lazy import (
+    TerraformLazyCommand,
+    get_loaded_module,
+    unload_plugin_modules,
+)
+
+
+class TerraformCloudLoginCommand(TerraformLazyCommand, sublime_plugin.WindowCommand):
+    IMPLEMENTATION = "cloud.terraform_cloud.TerraformCloudLoginCommand"
+
+
+class TerraformCloudLogoutCommand(TerraformLazyCommand, sublime_plugin.WindowCommand):
+    IMPLEMENTATION = "cloud.terraform_cloud.TerraformCloudLogoutCommand"
+    # Nobody is logged in before the client is loaded
+    ENABLED_BEFORE_LOAD = False
+
+
+class TerraformCloudShowWorkspacesCommand(
+    TerraformLazyCommand, sublime_plugin.WindowCommand
+):
+    IMPLEMENTATION = "cloud.terraform_cloud.TerraformCloudShowWorkspacesCommand"
+    ENABLED_BEFORE_LOAD = False
+
+
+class TerraformCloudShowRunsCommand(TerraformLazyCommand, sublime_plugin.WindowCommand):
+    IMPLEMENTATION = "cloud.terraform_cloud.TerraformCloudShowRunsCommand"
+    ENABLED_BEFORE_LOAD = False
+
+
+class TerraformCloudWorkspaceDashboardCommand(
+    TerraformLazyCommand, sublime_plugin.WindowCommand
+):
+    IMPLEMENTATION = (
+        "cloud.terraform_cloud_dashboard.TerraformCloudWorkspaceDashboardCommand"
+    )
+    ENABLED_BEFORE_LOAD = False
+
+
+class TerraformCloudWatchWorkspaceCommand(
+    TerraformLazyCommand, sublime_plugin.WindowCommand
+):
+    IMPLEMENTATION = "cloud.terraform_cloud_watcher.TerraformCloudWatchWorkspaceCommand"
+    ENABLED_BEFORE_LOAD = False
+
+
+class TerraformCloudWatchRunCommand(TerraformLazyCommand, sublime_plugin.WindowCommand):
+    IMPLEMENTATION = "cloud.terraform_cloud_watcher.TerraformCloudWatchRunCommand"
+    ENABLED_BEFORE_LOAD = False
+
+
+class TerraformCloudShowWatchedCommand(
+    TerraformLazyCommand, sublime_plugin.WindowCommand
+):
+    IMPLEMENTATION = "cloud.terraform_cloud_watcher.TerraformCloudShowWatchedCommand"
+
+
+class TerraformCloudUnwatchAllCommand(
+    TerraformLazyCommand, sublime_plugin.WindowCommand
+):
+    IMPLEMENTATION = "cloud.terraform_cloud_watcher.TerraformCloudUnwatchAllCommand"
+    ENABLED_BEFORE_LOAD = False
+
+
+class TerraformCloudWatcherListener(sublime_plugin.EventListener):
+    """Show the watcher summary in newly activated views"""
+
+    def on_activated(self, view):
+        watcher = get_loaded_module("cloud.terraform_cloud_watcher")
+        if watcher is not None:
+            watcher.show_watcher_status(view)
+
+
+def unload_cloud():
+    """Stop the cloud client's background work, if it was ever loaded"""
+    watcher = get_loaded_module("cloud.terraform_cloud_watcher")
+    if watcher is not None:
+        watcher.stop_run_watcher()
+
+    terraform_cloud = get_loaded_module("cloud.terraform_cloud")
+    if terraform_cloud is not None:
+        terraform_cloud.shutdown_task_executor()
+        terraform_cloud.close_connection_pool()
+
+    cache = get_loaded_module("cloud.terraform_cloud_cache")
+    if cache is not None:
+        cache.close_response_cache()
+
+    # Sublime Text only reloads the root modules, so drop the cloud package
+    # to have an upgraded plugin import its new code
+    unload_plugin_modules("cloud")
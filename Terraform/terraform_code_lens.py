@@ -0,0 +1,251 @@
+"""
+Reference counts shown next to Terraform blocks
+Counts come from the plugin's reference graph instead of one language server
+request per block, and only the blocks around the viewport get a phantom
+"""
+
+import bisect
+import threading
+
+import sublime
+import sublime_plugin
+
+from .terraform_project import TerraformProjectDetector
+from .terraform_references import (
+    get_indexed_graph,
+    get_reference_graph,
+    is_terraform_view,
+)
+from .terraform_settings import get_settings_snapshot
+
+# Key of the phantom set showing the counts
+PHANTOM_KEY = "terraform_reference_count"
+
+# Lines above and below the viewport whose blocks get counts too, so short
+# scrolls don't show blocks without one
+VIEWPORT_MARGIN = 50
+
+# Milliseconds between checks of the active view's viewport; counts are
+# redrawn once it has moved and then stayed put for one interval
+VIEWPORT_POLL_INTERVAL = 250
+
+PHANTOM_HTML = (
+    '<body id="terraform-reference-count"><style>'
+    "div {{ color: color(var(--foreground) alpha(0.5)); padding-left: 1em; }}"
+    "</style><div>{}</div></body>"
+)
+
+
+def is_enabled():
+    """Check if reference counts are shown"""
+    return get_settings_snapshot().get("code_lens.reference_count", False)
+
+
+def format_count(count):
+    """Get the text shown for a reference count"""
+    return "1 reference" if count == 1 else f"{count} references"
+
+
+def get_reference_counts(graph, path, first_line, last_line):
+    """Get {address: (line, count)} of the blocks of a file in a line range"""
+    symbols = graph.get_file_symbols(path)
+    counts = {}
+    for i in range(bisect.bisect_left(symbols, (first_line,)), len(symbols)):
+        line, _, address = symbols[i]
+        if line > last_line:
+            break
+        counts[address] = (line, graph.count_references(address))
+    return counts
+
+
+class TerraformReferenceCounts:
+    """Phantoms with the reference counts of the blocks of one view"""
+
+    def __init__(self, view, root_path):
+        self.view = view
+        self.root_path = root_path
+        self.phantom_set = sublime.PhantomSet(view, PHANTOM_KEY)
+        # address -> ((line, count), phantom) of the counts shown
+        self.shown = {}
+        # Viewport position the counts were collected for
+        self.viewport = None
+        # (visible region, change count) of the view when they were collected
+        self.view_state = None
+
+    def update(self, counts):
+        """Show counts, building phantoms only for the blocks that changed
+
+        Returns whether the phantoms were updated.
+        """
+        shown = {}
+        changed = counts.keys() != self.shown.keys()
+        for address, value in counts.items():
+            phantom = self.shown.get(address)
+            if phantom is None or phantom[0] != value:
+                phantom = (value, self.make_phantom(*value))
+                changed = True
+            shown[address] = phantom
+
+        if changed:
+            self.shown = shown
+            self.phantom_set.update([phantom for _, phantom in shown.values()])
+        return changed
+
+    def make_phantom(self, line, count):
+        """Create the phantom at the end of a block's first line"""
+        end = self.view.line(self.view.text_point(line - 1, 0)).end()
+        return sublime.Phantom(
+            sublime.Region(end),
+            PHANTOM_HTML.format(format_count(count)),
+            sublime.LAYOUT_INLINE,
+        )
+
+    def clear(self):
+        """Remove every phantom"""
+        if self.shown:
+            self.shown = {}
+            self.phantom_set.update([])
+
+
+# Reference counts by view id
+_views = {}
+_views_lock = threading.Lock()
+
+
+def update_reference_counts(view, graph=None):
+    """Show the reference counts of the blocks around a view's viewport"""
+    if not is_terraform_view(view) or not is_enabled():
+        with _views_lock:
+            counts = _views.pop(view.id(), None)
+        if counts is not None:
+            counts.clear()
+        return
+
+    project = TerraformProjectDetector.detect_project(view)
+    graph = graph or (get_indexed_graph(project.root_path) if project else None)
+    if graph is None:
+        return
+
+    with _views_lock:
+        counts = _views.get(view.id())
+        if counts is None:
+            counts = _views[view.id()] = TerraformReferenceCounts(
+                view, project.root_path
+            )
+
+    counts.viewport = view.viewport_position()
+    visible = view.visible_region()
+    counts.view_state = (visible, view.change_count())
+    first_line = view.rowcol(visible.begin())[0] + 1 - VIEWPORT_MARGIN
+    last_line = view.rowcol(visible.end())[0] + 1 + VIEWPORT_MARGIN
+    counts.update(get_reference_counts(graph, view.file_name(), first_line, last_line))
+
+
+def update_root_counts(root_path):
+    """Update the reference counts of every view of a root module"""
+    with _views_lock:
+        views = [c.view for c in _views.values() if c.root_path == root_path]
+    for view in views:
+        if view.is_valid():
+            update_reference_counts(view)
+
+
+# (view id, token) of the viewport poll running, a new token stops older polls
+_viewport_poll = None
+
+
+def poll_viewport(view):
+    """Redraw the counts of a view whenever its viewport is scrolled
+
+    Scrolling with the mouse or the scrollbar doesn't move the cursor, so
+    the viewport is polled while the view is active. Polling stops when
+    another view is activated or the view stops showing counts.
+    """
+    global _viewport_poll
+    token = object()
+    _viewport_poll = (view.id(), token)
+    last_position = view.viewport_position()
+
+    def poll():
+        nonlocal last_position
+        if _viewport_poll != (view.id(), token) or not view.is_valid():
+            return
+        counts = _views.get(view.id())
+        if counts is None:
+            return
+        position = view.viewport_position()
+        # Wait for scrolling to settle before redrawing
+        if position == last_position and position != counts.viewport:
+            update_reference_counts(view)
+        last_position = position
+        sublime.set_timeout_async(poll, VIEWPORT_POLL_INTERVAL)
+
+    sublime.set_timeout_async(poll, VIEWPORT_POLL_INTERVAL)
+
+
+def stop_viewport_poll(view=None):
+    """Stop polling the viewport of a view, or of any view"""
+    global _viewport_poll
+    if view is None or (_viewport_poll and _viewport_poll[0] == view.id()):
+        _viewport_poll = None
+
+
+def close_reference_counts():
+    """Remove the reference counts of every view"""
+    stop_viewport_poll()
+    with _views_lock:
+        views = list(_views.values())
+        _views.clear()
+    for counts in views:
+        if counts.view.is_valid():
+            counts.clear()
+
+
+class TerraformUpdateReferenceCountsCommand(sublime_plugin.TextCommand):
+    """Update the reference counts of the views sharing the view's root module
+
+    Run after a file was indexed again, since an edit can change the counts
+    of blocks in other files.
+    """
+
+    def run(self, edit):
+        if not is_enabled():
+            return
+        project = TerraformProjectDetector.detect_project(self.view)
+        if project:
+            sublime.set_timeout_async(lambda: update_root_counts(project.root_path))
+
+    def is_visible(self):
+        return False
+
+
+class TerraformReferenceCountListener(sublime_plugin.EventListener):
+    """Show reference counts as Terraform files are opened and browsed"""
+
+    def on_activated_async(self, view):
+        if not is_terraform_view(view):
+            return
+        if is_enabled():
+            project = TerraformProjectDetector.detect_project(view)
+            if project:
+                update_reference_counts(view, get_reference_graph(project.root_path))
+                poll_viewport(view)
+                return
+        update_reference_counts(view)
+
+    def on_deactivated_async(self, view):
+        stop_viewport_poll(view)
+
+    def on_selection_modified_async(self, view):
+        # Moving the cursor is how the viewport usually moves, but most moves
+        # stay inside it and leave the text alone
+        counts = _views.get(view.id())
+        if counts is None:
+            return
+        if counts.view_state != (view.visible_region(), view.change_count()):
+            update_reference_counts(view)
+
+    def on_close(self, view):
+        stop_viewport_poll(view)
+        with _views_lock:
+            _views.pop(view.id(), None)
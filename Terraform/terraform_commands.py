@@ -11,7 +11,8 @@ import threading
 import sublime
 import sublime_plugin
 
-from .terraform_settings import get_settings
+from .terraform_perf import span
+from .terraform_settings import get_settings_snapshot
 
 
 class TerraformCommand(sublime_plugin.WindowCommand):
@@ -19,7 +20,7 @@ class TerraformCommand(sublime_plugin.WindowCommand):
 
     def get_terraform_path(self):
         """Get the path to terraform binary"""
-        return get_settings().get("terraform_path", "terraform")
+        return get_settings_snapshot().terraform_path
 
     def get_working_dir(self):
         """Get the working directory for terraform commands"""
@@ -59,6 +60,12 @@ class TerraformCommand(sublime_plugin.WindowCommand):
 
     def _run_command_thread(self, cmd, working_dir, panel, callback):
         """Run command in a separate thread"""
+        subcommand = cmd[1] if len(cmd) > 1 else "run"
+        with span(f"terraform.{subcommand}") as timing:
+            self._run_command(cmd, working_dir, panel, callback, timing)
+
+    def _run_command(self, cmd, working_dir, panel, callback, timing):
+        """Run command and stream its output to the panel"""
         try:
             # Update panel with command
             panel.run_command(
@@ -86,6 +93,7 @@ class TerraformCommand(sublime_plugin.WindowCommand):
 
             # Stream output
             for line in process.stdout:
+                timing.add_bytes(len(line))
                 panel.run_command(
                     "append", {"characters": line, "force": True, "scroll_to_end": True}
                 )
@@ -208,17 +216,18 @@ class TerraformFormatCommand(sublime_plugin.TextCommand):
         viewport_position = self.view.viewport_position()
 
         # Get terraform path
-        terraform_path = get_settings().get("terraform_path", "terraform")
+        terraform_path = get_settings_snapshot().terraform_path
 
         # Run terraform fmt
         try:
-            result = subprocess.run(
-                [terraform_path, "fmt", "-"],
-                input=self.view.substr(sublime.Region(0, self.view.size())),
-                capture_output=True,
-                text=True,
-                check=True,
-            )
+            with span("terraform.fmt", self.view.size()):
+                result = subprocess.run(
+                    [terraform_path, "fmt", "-"],
+                    input=self.view.substr(sublime.Region(0, self.view.size())),
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
 
             # Replace content
             formatted_content = result.stdout
@@ -257,8 +266,7 @@ class TerraformFormatOnSaveListener(sublime_plugin.EventListener):
             return
 
         # Check if format on save is enabled
-        settings = get_settings()
-        if not settings.get("format_on_save", False):
+        if not get_settings_snapshot().format_on_save:
             return
 
         # Run format command
@@ -0,0 +1,398 @@
+"""
+Completions from the cached provider schemas
+Offers resource and data source types, attributes and nested blocks without
+waiting for terraform-ls
+"""
+
+import bisect
+import html
+import os
+import re
+import threading
+import time
+import weakref
+
+import sublime
+import sublime_plugin
+
+from .terraform_blocks import BLOCK_TOKENS
+from .terraform_perf import span
+from .terraform_project import LOCK_FILE, TerraformProjectDetector
+from .terraform_schema import get_provider_schemas
+from .terraform_settings import get_settings_snapshot
+
+# Characters before the cursor searched for the enclosing blocks
+MAX_CONTEXT = 64 * 1024
+
+# Most completions returned at once; longer lists are marked incomplete
+MAX_COMPLETIONS = 500
+
+# Completions built between two checks of the latency budget
+BUDGET_CHECK_INTERVAL = 64
+
+# Seconds a view's provider schemas are used before they are looked up again
+# in the background, which picks up lock files changed by terraform init
+SCHEMA_CHECK_INTERVAL = 5
+
+# Start of a top-level block, like resource "aws_s3_bucket" "this" {
+TOP_LEVEL_BLOCK = re.compile(r'^[A-Za-z_][\w-]*(?:[ \t]+"[^"\n]*")*[ \t]*\{', re.M)
+
+# Header of a nested block: a name followed by quoted labels
+BLOCK_HEADER = re.compile(r'([A-Za-z_][\w-]*)((?:\s+"[^"]*")*)\s*$')
+
+# resource "aws_ or data "aws_ before the cursor
+TYPE_PREFIX = re.compile(r'^\s*(resource|data)\s+"([\w-]*)$')
+
+# Attribute or block name being typed before the cursor
+NAME_PREFIX = re.compile(r"^\s*([\w-]*)$")
+
+KIND_RESOURCE = (sublime.KIND_ID_TYPE, "r", "Resource")
+KIND_DATA_SOURCE = (sublime.KIND_ID_TYPE, "d", "Data Source")
+KIND_ATTRIBUTE = (sublime.KIND_ID_VARIABLE, "a", "Attribute")
+KIND_BLOCK = (sublime.KIND_ID_NAMESPACE, "b", "Block")
+
+
+class TerraformPrefixIndex:
+    """Sorted names searched by prefix with bisect"""
+
+    __slots__ = ("names",)
+
+    def __init__(self, names):
+        self.names = sorted(names)
+
+    def find(self, prefix):
+        """Get the range of names starting with prefix as (start, end)"""
+        start = bisect.bisect_left(self.names, prefix)
+        end = bisect.bisect_left(self.names, prefix + "\U0010ffff", start)
+        return start, end
+
+
+# Prefix indexes of the resource and data source types, by schemas
+_type_indexes = weakref.WeakKeyDictionary()
+
+
+def get_type_index(schemas, kind):
+    """Get the prefix index of the resource or data source types"""
+    indexes = _type_indexes.get(schemas)
+    if indexes is None:
+        indexes = _type_indexes[schemas] = {
+            "resource": TerraformPrefixIndex(schemas.resource_types),
+            "data": TerraformPrefixIndex(schemas.data_source_types),
+        }
+    return indexes[kind]
+
+
+# (root path, schemas, time looked up) of each view, by view id
+_view_schemas = {}
+_view_schemas_lock = threading.Lock()
+
+
+def lookup_view_schemas(view):
+    """Look up the provider schemas of a view's root module and remember them"""
+    project = TerraformProjectDetector.detect_project(view)
+    root_path = project.root_path if project else None
+    schemas = get_provider_schemas(root_path) if project else None
+    with _view_schemas_lock:
+        _view_schemas[view.id()] = (root_path, schemas, time.monotonic())
+    return schemas
+
+
+def get_view_schemas(view):
+    """Get the provider schemas of a view
+
+    Only the first lookup of a view detects its project and hashes the lock
+    file on the calling thread. Later ones use the remembered schemas, which
+    are looked up again in the background once they are older than
+    SCHEMA_CHECK_INTERVAL.
+    """
+    cached = _view_schemas.get(view.id())
+    if cached is None:
+        return lookup_view_schemas(view)
+
+    root_path, schemas, checked = cached
+    now = time.monotonic()
+    if now - checked > SCHEMA_CHECK_INTERVAL:
+        with _view_schemas_lock:
+            _view_schemas[view.id()] = (root_path, schemas, now)
+        sublime.set_timeout_async(lambda: lookup_view_schemas(view))
+    return schemas
+
+
+def forget_view_schemas(view_id=None, root_path=None):
+    """Forget the schemas of a view, or of every view of a root module"""
+    with _view_schemas_lock:
+        if view_id is not None:
+            _view_schemas.pop(view_id, None)
+        if root_path is not None:
+            for key, (view_root, _, _) in list(_view_schemas.items()):
+                if view_root == root_path:
+                    del _view_schemas[key]
+
+
+def parse_block_header(line):
+    """Get (name, labels) of the block opened at the end of line
+
+    Object values like tags = { give (None, ()).
+    """
+    if "=" in line:
+        return None, ()
+    match = BLOCK_HEADER.search(line)
+    if not match:
+        return None, ()
+    return match.group(1), tuple(re.findall(r'"([^"]*)"', match.group(2)))
+
+
+def find_enclosing_blocks(text):
+    """Get the headers of the blocks still open at the end of text
+
+    Scanning starts at the last top-level block, so only that block's text
+    is tokenized. Headers are (name, labels), outermost first.
+    """
+    start = 0
+    for match in TOP_LEVEL_BLOCK.finditer(text):
+        start = match.start()
+
+    stack = []
+    for token in BLOCK_TOKENS.finditer(text, start):
+        value = token.group()
+        if value == "{":
+            line_start = text.rfind("\n", 0, token.start()) + 1
+            stack.append(parse_block_header(text[line_start : token.start()]))
+        elif value == "}" and stack:
+            stack.pop()
+    return stack
+
+
+def get_completion_context(view, point):
+    """Get what is being completed at point
+
+    Returns ("type", "resource" or "data", prefix) in a block header,
+    ("body", headers, prefix) for a name inside a block, or None.
+    """
+    begin = max(0, point - MAX_CONTEXT)
+    text = view.substr(sublime.Region(begin, point))
+    line = text[text.rfind("\n") + 1 :]
+
+    match = TYPE_PREFIX.match(line)
+    if match:
+        return "type", match.group(1), match.group(2)
+
+    match = NAME_PREFIX.match(line)
+    if not match:
+        return None
+    headers = find_enclosing_blocks(text)
+    if not headers:
+        return None
+    return "body", tuple(headers), match.group(1)
+
+
+def resolve_top_level_block(schemas, name, label, load=True):
+    """Get the schema of a resource, data source or provider block
+
+    Returns None for other blocks and unknown types, and False when the
+    provider's schema is not in memory and load is off.
+    """
+    if name == "resource":
+        if label not in schemas.resource_types:
+            return None
+        block = schemas.get_resource(label, load)
+    elif name == "data":
+        if label not in schemas.data_source_types:
+            return None
+        block = schemas.get_data_source(label, load)
+    elif name == "provider":
+        address = schemas.find_provider(label)
+        if address is None:
+            return None
+        provider = schemas.get_provider(address, load)
+        block = provider["provider"] if provider else None
+    else:
+        return None
+    return False if block is None else block
+
+
+def resolve_nested_block(block, headers):
+    """Get the schema of the innermost of nested block headers, or None"""
+    in_dynamic = False
+    for name, labels in headers:
+        if name is None:
+            return None
+        # The content of dynamic "name" { content { } } is a "name" block
+        if in_dynamic and name == "content":
+            in_dynamic = False
+            continue
+        in_dynamic = name == "dynamic"
+        if in_dynamic:
+            if not labels:
+                return None
+            name = labels[0]
+
+        nested = (block.get("blocks") or {}).get(name)
+        if nested is None:
+            return None
+        block = nested["block"]
+    return block
+
+
+def resolve_block(schemas, headers, load=True):
+    """Get the schema of the innermost block, or None if it has none
+
+    Returns False when the provider's schema is not in memory and load is
+    off.
+    """
+    name, labels = headers[0]
+    if not labels:
+        return None
+    block = resolve_top_level_block(schemas, name, labels[0], load)
+    if block is None or block is False:
+        return block
+    return resolve_nested_block(block, headers[1:])
+
+
+def get_details(schema):
+    """Get the first sentence of a description for the completion popup"""
+    description = schema.get("description")
+    if not description:
+        return ""
+    sentence = description.strip().split("\n", 1)[0].split(". ", 1)[0]
+    if len(sentence) > 120:
+        sentence = sentence[:117] + "..."
+    return html.escape(sentence)
+
+
+def build_completions(schemas, context, deadline=None, load=True):
+    """Build the completions of a context
+
+    Returns (items, complete), or None when the provider's schema is not in
+    memory and load is off. Past the deadline the items built so far are
+    returned as incomplete.
+    """
+    if context[0] == "type":
+        _, kind, prefix = context
+        return build_type_completions(schemas, kind, prefix, deadline)
+
+    _, headers, prefix = context
+    block = resolve_block(schemas, headers, load)
+    if block is False:
+        return None
+    if block is None:
+        return [], True
+    return build_block_completions(block), True
+
+
+def build_type_completions(schemas, kind, prefix, deadline=None):
+    """Complete resource or data source types by prefix"""
+    index = get_type_index(schemas, kind)
+    providers = (
+        schemas.resource_types if kind == "resource" else schemas.data_source_types
+    )
+    completion_kind = KIND_RESOURCE if kind == "resource" else KIND_DATA_SOURCE
+
+    start, end = index.find(prefix)
+    complete = end - start <= MAX_COMPLETIONS
+    end = min(end, start + MAX_COMPLETIONS)
+
+    items = []
+    for i in range(start, end):
+        if deadline and i % BUDGET_CHECK_INTERVAL == 0 and i > start:
+            if time.perf_counter() > deadline:
+                return items, False
+        name = index.names[i]
+        items.append(
+            sublime.CompletionItem(
+                name,
+                annotation=providers[name].rpartition("/")[2],
+                completion=name,
+                kind=completion_kind,
+            )
+        )
+    return items, complete
+
+
+def build_block_completions(block):
+    """Complete the attributes and nested blocks of a block schema"""
+    items = []
+    attributes = block.get("attributes") or {}
+    # Required attributes first, computed-only attributes can't be set
+    for name, attribute in sorted(
+        attributes.items(), key=lambda item: (not item[1].get("required"), item[0])
+    ):
+        if attribute.get("computed") and not attribute.get("optional"):
+            continue
+        if attribute.get("deprecated"):
+            continue
+        annotation = attribute["type"]
+        if attribute.get("required"):
+            annotation = f"{annotation}, required"
+        items.append(
+            sublime.CompletionItem(
+                name,
+                annotation=annotation,
+                completion=f"{name} = ",
+                kind=KIND_ATTRIBUTE,
+                details=get_details(attribute),
+            )
+        )
+
+    for name, nested in sorted((block.get("blocks") or {}).items()):
+        if nested["block"].get("deprecated"):
+            continue
+        items.append(
+            sublime.CompletionItem.snippet_completion(
+                name,
+                f"{name} {{\n\t$0\n}}",
+                annotation=nested["nesting"],
+                kind=KIND_BLOCK,
+                details=get_details(nested["block"]),
+            )
+        )
+    return items
+
+
+class TerraformSchemaCompletionListener(sublime_plugin.EventListener):
+    """Complete types, attributes and blocks from the cached provider schemas"""
+
+    def on_query_completions(self, view, prefix, locations):
+        if not view.match_selector(locations[0], "source.terraform"):
+            return None
+
+        start = time.perf_counter()
+        settings = get_settings_snapshot()
+        schemas = get_view_schemas(view)
+        if schemas is None:
+            return None
+
+        with span("completions.schema"):
+            context = get_completion_context(view, locations[0])
+            if context is None:
+                return None
+
+            budget = settings.get("completion.latency_budget_ms", 10) / 1000
+            result = build_completions(schemas, context, start + budget, load=False)
+
+        if result is not None:
+            items, complete = result
+            flags = 0 if complete else sublime.DYNAMIC_COMPLETIONS
+            return sublime.CompletionList(items, flags)
+
+        # Reading the provider's schema takes longer than the budget, so it
+        # is done in the background and the list is filled in afterwards
+        completion_list = sublime.CompletionList()
+
+        def complete_async():
+            with span("completions.schema_load"):
+                items, _ = build_completions(schemas, context) or ([], True)
+            completion_list.set_completions(items)
+
+        sublime.set_timeout_async(complete_async)
+        return completion_list
+
+    def on_post_save_async(self, view):
+        file_name = view.file_name() or ""
+        if os.path.basename(file_name) == LOCK_FILE:
+            forget_view_schemas(root_path=os.path.dirname(file_name))
+        elif view.id() in _view_schemas:
+            lookup_view_schemas(view)
+
+    def on_close(self, view):
+        forget_view_schemas(view.id())
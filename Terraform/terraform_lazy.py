@@ -0,0 +1,77 @@
+"""
+Lazy loading of plugin modules
+Commands that import their implementation the first time they are used
+"""
+
+import importlib
+import sys
+
+from .terraform_perf import span
+
+
+def import_plugin_module(name):
+    """Import a module of the plugin package, e.g. "cloud.terraform_cloud" """
+    module_name = f"{__package__}.{name}"
+    module = sys.modules.get(module_name)
+    if module is None:
+        with span("plugin.import", module=name):
+            module = importlib.import_module(module_name)
+    return module
+
+
+def get_loaded_module(name):
+    """Get a module of the plugin package if it has been imported"""
+    return sys.modules.get(f"{__package__}.{name}")
+
+
+def unload_plugin_modules(package):
+    """Forget the imported modules of a subpackage so a reload imports them again"""
+    prefix = f"{__package__}.{package}"
+    for module_name in list(sys.modules):
+        if module_name == prefix or module_name.startswith(prefix + "."):
+            del sys.modules[module_name]
+
+
+class TerraformLazyCommand:
+    """Mixin for a window command that forwards to a command imported on demand
+
+    class TerraformCloudLoginCommand(TerraformLazyCommand, WindowCommand):
+        IMPLEMENTATION = "cloud.terraform_cloud.TerraformCloudLoginCommand"
+
+    Until the implementation's module is imported, is_enabled() answers
+    ENABLED_BEFORE_LOAD instead of importing it just to draw a menu.
+    """
+
+    # "module.ClassName" of the command to forward to
+    IMPLEMENTATION = None
+
+    # is_enabled() result while the implementation is not imported
+    ENABLED_BEFORE_LOAD = True
+
+    def __init__(self, window):
+        super().__init__(window)
+        self._command = None
+
+    def get_module_name(self):
+        """Get the module of the implementation"""
+        return self.IMPLEMENTATION.rpartition(".")[0]
+
+    def get_command(self):
+        """Get the implementation, importing it on first use"""
+        if self._command is None:
+            module_name, _, class_name = self.IMPLEMENTATION.rpartition(".")
+            command_class = getattr(import_plugin_module(module_name), class_name)
+            self._command = command_class(self.window)
+        return self._command
+
+    def is_implementation_loaded(self):
+        """Check if the implementation's module has been imported"""
+        return get_loaded_module(self.get_module_name()) is not None
+
+    def run(self, **kwargs):
+        return self.get_command().run(**kwargs)
+
+    def is_enabled(self, **kwargs):
+        if self._command is None and not self.is_implementation_loaded():
+            return self.ENABLED_BEFORE_LOAD
+        return self.get_command().is_enabled(**kwargs)
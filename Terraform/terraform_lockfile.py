@@ -0,0 +1,136 @@
+"""
+Parser for .terraform.lock.hcl
+Reads the provider versions and hashes terraform init selected, without
+running terraform providers
+"""
+
+import os
+import re
+import threading
+
+from .terraform_blocks import get_attribute_values, scan_blocks
+from .terraform_perf import span
+from .terraform_project import LOCK_FILE
+from .terraform_references import get_string
+
+# Quoted strings of a list expression, like the hashes
+LIST_STRING = re.compile(r'"([^"\n]*)"')
+
+# Registry host of provider addresses without one
+DEFAULT_REGISTRY = "registry.terraform.io"
+
+
+class TerraformLockedProvider:
+    """A provider version selected in a lock file"""
+
+    __slots__ = ("address", "version", "constraints", "hashes", "line")
+
+    def __init__(self, address, version, constraints, hashes, line):
+        self.address = address
+        self.version = version
+        self.constraints = constraints
+        self.hashes = hashes
+        self.line = line
+
+    @property
+    def source(self):
+        """Get the address without the default registry, like hashicorp/aws"""
+        host, _, source = self.address.partition("/")
+        return source if host == DEFAULT_REGISTRY else self.address
+
+    @property
+    def name(self):
+        """Get the provider type, like aws"""
+        return self.address.rpartition("/")[2]
+
+
+def get_provider_address(source):
+    """Get the full address of a provider source like hashicorp/aws"""
+    return source if source.count("/") >= 2 else f"{DEFAULT_REGISTRY}/{source}"
+
+
+def parse_lock_file(content):
+    """Get the locked providers of a lock file, by address"""
+    providers = {}
+    for block in scan_blocks(content):
+        if block.kind != "provider" or len(block.labels) != 1:
+            continue
+        values = get_attribute_values(content, block)
+        address = block.labels[0]
+        providers[address] = TerraformLockedProvider(
+            address,
+            get_string(values.get("version")),
+            get_string(values.get("constraints")),
+            tuple(LIST_STRING.findall(values.get("hashes") or "")),
+            block.line,
+        )
+    return providers
+
+
+class TerraformLockFileCache:
+    """Parsed lock files of root modules, read again when they change"""
+
+    def __init__(self):
+        # root path -> ((mtime, size), providers)
+        self._lock_files = {}
+        self._lock = threading.Lock()
+
+    def get_providers(self, root_path):
+        """Get the locked providers of a root module, or None without a lock file"""
+        path = os.path.join(root_path, LOCK_FILE)
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._lock_files.pop(root_path, None)
+            return None
+
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._lock_files.get(root_path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except (IOError, OSError):
+            return None
+        with span("lockfile.parse", len(content)):
+            providers = parse_lock_file(content)
+        with self._lock:
+            self._lock_files[root_path] = (key, providers)
+        return providers
+
+    def close(self):
+        """Forget every parsed lock file"""
+        with self._lock:
+            self._lock_files.clear()
+
+
+# Shared lock file cache, created on first use
+_lock_file_cache = None
+_lock_file_cache_lock = threading.Lock()
+
+
+def get_lock_file_cache():
+    """Get the shared lock file cache"""
+    global _lock_file_cache
+    with _lock_file_cache_lock:
+        if _lock_file_cache is None:
+            _lock_file_cache = TerraformLockFileCache()
+        return _lock_file_cache
+
+
+def close_lock_file_cache():
+    """Release the shared lock file cache"""
+    global _lock_file_cache
+    with _lock_file_cache_lock:
+        cache, _lock_file_cache = _lock_file_cache, None
+
+    if cache:
+        cache.close()
+
+
+def get_locked_providers(root_path):
+    """Get the locked providers of a root module, by address"""
+    return get_lock_file_cache().get_providers(root_path)
@@ -3,16 +3,67 @@ Terraform Language Server Protocol (LSP) integration
 Configures terraform-ls for use with the LSP package
 """
 
+import itertools
 import os
+from typing import Any, Dict, List, Optional, Tuple
 
 import sublime
-from LSP.plugin import AbstractPlugin, register_plugin, unregister_plugin
-from LSP.plugin.core.typing import Any, Dict, List, Optional, Tuple
+
+from .terraform_lsp_trace import get_lsp_tracer
+from .terraform_project import TerraformProjectDetector
+from .terraform_settings import get_settings_snapshot
+
+try:
+    from LSP.plugin import (
+        AbstractPlugin,
+        Notification,
+        register_plugin,
+        unregister_plugin,
+    )
+except ImportError:
+    # The LSP package is missing, which check_dependencies() in plugin.py
+    # reports. Load anyway so the commands keep working.
+    AbstractPlugin = object
+    Notification = register_plugin = unregister_plugin = None
+
+
+def get_indexing_scope(folders):
+    """Get the root modules and the paths terraform-ls should skip in folders
+
+    Plain directory names are passed on as names; directories pruned by
+    globs, exclude_root_modules or ignore files are passed as paths.
+    """
+    settings = get_settings_snapshot()
+    names = [
+        name.rstrip("/")
+        for name in settings.get("ignore_directory_names") or ()
+        if not any(c in name.rstrip("/") for c in "/*?[")
+    ]
+    roots, ignored = TerraformProjectDetector.get_indexing_scope(folders)
+    return {
+        "root_modules": roots,
+        "ignore_paths": [
+            path for path in ignored if os.path.basename(path) not in names
+        ],
+        "ignore_directory_names": names,
+    }
 
 
 class TerraformLSPPlugin(AbstractPlugin):
     """LSP plugin configuration for terraform-ls"""
 
+    # Numbers telling the sessions of different windows apart in traces
+    _session_ids = itertools.count(1)
+
+    def __init__(self, weaksession):
+        super().__init__(weaksession)
+        self._scope = None
+        self._session_id = next(self._session_ids)
+        self._on_change_key = f"terraform_lsp_{id(self)}"
+        TerraformProjectDetector.add_on_change(
+            self._on_change_key, self.on_projects_changed
+        )
+
     @classmethod
     def name(cls) -> str:
         """The name of the plugin"""
@@ -94,6 +145,91 @@ class TerraformLSPPlugin(AbstractPlugin):
 
         return shutil.which("terraform-ls")
 
+    @classmethod
+    def on_pre_start(
+        cls,
+        window: sublime.Window,
+        initiating_view: sublime.View,
+        workspace_folders: List[Any],
+        configuration: Any,
+    ) -> Optional[str]:
+        """Keep terraform-ls from indexing what the plugin skips"""
+        folders = [folder.path for folder in workspace_folders]
+        # Only folders no language server or command has walked yet
+        unwalked = [
+            f for f in folders if not TerraformProjectDetector.has_refreshed([f])
+        ]
+        if unwalked:
+            TerraformProjectDetector.refresh_projects(window, unwalked)
+
+        scope = get_indexing_scope(folders)
+        configuration.init_options.set("indexing.ignorePaths", scope["ignore_paths"])
+        configuration.init_options.set(
+            "indexing.ignoreDirectoryNames", scope["ignore_directory_names"]
+        )
+        return None
+
+    def on_settings_changed(self, settings: Any) -> None:
+        """Scope the server settings to the detected root modules"""
+        session = self.weaksession()
+        if not session:
+            return
+
+        folders = [folder.path for folder in session.get_workspace_folders()]
+        self._scope = get_indexing_scope(folders)
+        settings.set("terraform-ls.rootModulePaths", self._scope["root_modules"])
+        settings.set("terraform-ls.excludeModulePaths", self._scope["ignore_paths"])
+
+    def on_projects_changed(self):
+        """Send the new scope to the server once projects change"""
+        sublime.set_timeout_async(self.update_configuration)
+
+    def update_configuration(self):
+        """Send workspace/didChangeConfiguration if the scope changed"""
+        session = self.weaksession()
+        if not session:
+            TerraformProjectDetector.clear_on_change(self._on_change_key)
+            return
+
+        previous = self._scope
+        self.on_settings_changed(session.config.settings)
+        if self._scope != previous:
+            session.send_notification(
+                Notification(
+                    "workspace/didChangeConfiguration",
+                    {"settings": session.config.settings.get()},
+                )
+            )
+
+    def on_session_end_async(self, exit_code, exception) -> None:
+        """Stop following project changes and tracing the session's requests"""
+        TerraformProjectDetector.clear_on_change(self._on_change_key)
+        get_lsp_tracer().on_session_end(self._session_id)
+
+    def on_pre_send_request_async(self, request_id: int, request: Any) -> None:
+        """Trace requests sent to the server"""
+        get_lsp_tracer().on_request(
+            self._session_id, request_id, request.method, request.params
+        )
+
+    def on_server_response_async(self, method: str, response: Any) -> None:
+        """Trace the server's responses"""
+        get_lsp_tracer().on_response(
+            self._session_id, response.request_id, response.result
+        )
+
+    def on_pre_send_notification_async(self, notification: Any) -> None:
+        """Trace notifications sent to the server, like didChange"""
+        get_lsp_tracer().on_notification(
+            self._session_id, "send", notification.method, notification.params
+        )
+
+    def on_server_notification_async(self, notification: Any) -> None:
+        """Trace notifications from the server, like publishDiagnostics"""
+        get_lsp_tracer().on_notification(
+            self._session_id, "recv", notification.method, notification.params
+        )
+
     def on_pre_server_command(self, command: Dict[str, Any], done_callback) -> bool:
         """Hook to modify server commands before execution"""
         # We can intercept and modify commands here if needed
@@ -114,10 +250,14 @@ class TerraformLSPPlugin(AbstractPlugin):
         cls, configuration: dict, workspace_folders: List[str]
     ) -> dict:
         """Get additional initialization parameters"""
+        settings = get_settings_snapshot()
         params = {
             "processId": os.getpid(),
             "clientInfo": {"name": "Sublime Text Terraform", "version": "1.0.0"},
-            "trace": "off",
+            # Have the server log its side of traced messages too
+            "trace": (
+                "messages" if settings.get("language_server.trace.enabled") else "off"
+            ),
             "workspaceFolders": [
                 {"uri": f"file://{folder}", "name": os.path.basename(folder)}
                 for folder in workspace_folders
@@ -125,7 +265,6 @@ class TerraformLSPPlugin(AbstractPlugin):
         }
 
         # Add experimental capabilities if enabled
-        settings = sublime.load_settings("Terraform.sublime-settings")
         if settings.get("experimental_features.prefill_required_fields"):
             params["initializationOptions"] = {
                 "experimentalFeatures": {"prefillRequiredFields": True}
@@ -136,12 +275,14 @@ class TerraformLSPPlugin(AbstractPlugin):
 
 def plugin_loaded():
     """Register the plugin when loaded"""
-    register_plugin(TerraformLSPPlugin)
+    if register_plugin is not None:
+        register_plugin(TerraformLSPPlugin)
 
 
 def plugin_unloaded():
     """Unregister the plugin when unloaded"""
-    unregister_plugin(TerraformLSPPlugin)
+    if unregister_plugin is not None:
+        unregister_plugin(TerraformLSPPlugin)
 
 
 # Create the LSP configuration file content
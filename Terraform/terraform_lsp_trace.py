@@ -0,0 +1,309 @@
+"""
+Tracing of the messages exchanged with terraform-ls
+Records per-method latency, payload sizes and in-flight requests
+"""
+
+import json
+import os
+import threading
+import time
+
+import sublime
+import sublime_plugin
+
+from .terraform_perf import (
+    TerraformPerfStat,
+    format_bytes,
+    format_duration,
+    get_perf_recorder,
+)
+from .terraform_settings import get_settings_snapshot
+
+# Name of the logger writing the message log
+LOGGER_NAME = "Terraform.lsp_trace"
+
+
+class TerraformLspMethodStat:
+    """Traffic of one LSP method"""
+
+    __slots__ = (
+        "latency",
+        "messages",
+        "sent",
+        "received",
+        "in_flight",
+        "max_in_flight",
+    )
+
+    def __init__(self):
+        self.latency = TerraformPerfStat()
+        self.messages = 0
+        self.sent = 0
+        self.received = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def to_dict(self):
+        """Get the stat as a dict of seconds and bytes"""
+        latency = self.latency.to_dict()
+        return {
+            "messages": self.messages,
+            "requests": latency["count"],
+            "p50": latency["p50"],
+            "p95": latency["p95"],
+            "max": latency["max"],
+            "sent": self.sent,
+            "received": self.received,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+class TerraformLspTracer:
+    """Traces the messages of the terraform-ls sessions
+
+    Off unless "language_server.trace.enabled" is set. While it is off, the
+    hooks only read the settings snapshot. Every session numbers its requests
+    on its own, so requests are told apart by (session id, request id).
+    """
+
+    # Requests without a response after this many seconds are dropped
+    PENDING_TIMEOUT = 300
+
+    def __init__(self):
+        self._stats = {}
+        self._pending = {}
+        self._logger = None
+        self._log_failed = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(get_settings_snapshot().get("language_server.trace.enabled"))
+
+    def _get_stat(self, method):
+        stat = self._stats.get(method)
+        if stat is None:
+            stat = self._stats[method] = TerraformLspMethodStat()
+        return stat
+
+    def on_request(self, session_id, request_id, method, params):
+        """Record a request a session sent to its server"""
+        if not self.enabled:
+            return
+
+        nbytes = get_payload_size(params)
+        now = time.perf_counter()
+        with self._lock:
+            stat = self._get_stat(method)
+            stat.messages += 1
+            stat.sent += nbytes
+            stat.in_flight += 1
+            stat.max_in_flight = max(stat.max_in_flight, stat.in_flight)
+            self._pending[(session_id, request_id)] = (method, now)
+            self._drop_stale(now)
+        self.log("send", method, session_id, request_id, nbytes)
+
+    def on_response(self, session_id, request_id, result):
+        """Record a server's response to a request of its session"""
+        if not self.enabled:
+            return
+
+        nbytes = get_payload_size(result)
+        now = time.perf_counter()
+        with self._lock:
+            pending = self._pending.pop((session_id, request_id), None)
+            if pending is None:
+                return
+            method, start = pending
+            stat = self._get_stat(method)
+            stat.latency.add(now - start, nbytes)
+            stat.received += nbytes
+            stat.in_flight -= 1
+
+        recorder = get_perf_recorder()
+        if recorder.enabled:
+            recorder.record(f"lsp.{method}", start, now - start, nbytes)
+        self.log("recv", method, session_id, request_id, nbytes, now - start)
+
+    def on_notification(self, session_id, direction, method, params):
+        """Record a notification, direction being "send" or "recv" """
+        if not self.enabled:
+            return
+
+        nbytes = get_payload_size(params)
+        with self._lock:
+            stat = self._get_stat(method)
+            stat.messages += 1
+            if direction == "send":
+                stat.sent += nbytes
+            else:
+                stat.received += nbytes
+        self.log(direction, method, session_id, None, nbytes)
+
+    def on_session_end(self, session_id):
+        """Forget the requests of a session that ended without a response"""
+        with self._lock:
+            for key, (method, _) in list(self._pending.items()):
+                if key[0] == session_id:
+                    del self._pending[key]
+                    self._get_stat(method).in_flight -= 1
+
+    def _drop_stale(self, now):
+        """Forget requests that never got a response, like cancelled ones"""
+        deadline = now - self.PENDING_TIMEOUT
+        for key, (method, start) in list(self._pending.items()):
+            if start < deadline:
+                del self._pending[key]
+                self._get_stat(method).in_flight -= 1
+
+    def log(self, direction, method, session_id, request_id, nbytes, duration=None):
+        """Append a message to the rotating log"""
+        logger = self._logger or self._open_log()
+        if logger is None:
+            return
+
+        entry = {
+            "time": time.time(),
+            "session": session_id,
+            "dir": direction,
+            "method": method,
+        }
+        if request_id is not None:
+            entry["id"] = request_id
+        entry["bytes"] = nbytes
+        if duration is not None:
+            entry["ms"] = round(duration * 1000, 3)
+        logger.info(json.dumps(entry))
+
+    def _open_log(self):
+        """Start the rotating log in the cache directory"""
+        import logging
+        import logging.handlers
+
+        settings = get_settings_snapshot()
+        max_size = settings.get("language_server.trace.log_size_mb", 5)
+        if not max_size or self._log_failed:
+            return None
+
+        log_dir = os.path.join(sublime.cache_path(), "Terraform")
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(log_dir, "lsp-trace.log"),
+                maxBytes=int(max_size * 1024 * 1024),
+                backupCount=settings.get("language_server.trace.log_files", 3),
+                encoding="utf-8",
+            )
+        except (IOError, OSError) as e:
+            print(f"Terraform: cannot write the LSP trace log: {e}")
+            self._log_failed = True
+            return None
+
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        self._logger = logger
+        return logger
+
+    def get_log_path(self):
+        """Get the path of the current log, if it was started"""
+        if self._logger is None:
+            return None
+        return self._logger.handlers[0].baseFilename
+
+    def close_log(self):
+        """Close the rotating log"""
+        logger, self._logger = self._logger, None
+        self._log_failed = False
+        if logger is not None:
+            for handler in list(logger.handlers):
+                handler.close()
+                logger.removeHandler(handler)
+
+    def get_stats(self):
+        """Get (method, stat dict) pairs, slowest p95 first"""
+        with self._lock:
+            stats = [(method, stat.to_dict()) for method, stat in self._stats.items()]
+        return sorted(stats, key=lambda item: (-item[1]["p95"], item[0]))
+
+    def reset(self):
+        """Forget the recorded traffic"""
+        with self._lock:
+            self._stats.clear()
+            self._pending.clear()
+
+
+def get_payload_size(payload):
+    """Get the size of a message payload as JSON"""
+    if payload is None:
+        return 0
+    try:
+        return len(json.dumps(payload, separators=(",", ":"), ensure_ascii=False))
+    except (TypeError, ValueError):
+        return 0
+
+
+# Global tracer instance
+_lsp_tracer = TerraformLspTracer()
+
+
+def get_lsp_tracer():
+    """Get the shared tracer"""
+    return _lsp_tracer
+
+
+def close_lsp_tracer():
+    """Close the tracer's log"""
+    _lsp_tracer.close_log()
+
+
+class TerraformShowLspStatsCommand(sublime_plugin.WindowCommand):
+    """Show the latency and payload sizes of terraform-ls messages"""
+
+    def run(self):
+        panel = self.window.create_output_panel("terraform_lsp")
+        panel.run_command("append", {"characters": self.format_stats(), "force": True})
+        self.window.run_command("show_panel", {"panel": "output.terraform_lsp"})
+
+    def format_stats(self):
+        """Format the stats as a table"""
+        stats = _lsp_tracer.get_stats()
+        if not stats:
+            if not _lsp_tracer.enabled:
+                return (
+                    "Language server tracing is off.\n"
+                    'Set "language_server": {"trace": {"enabled": true}} in the '
+                    "Terraform settings to record messages.\n"
+                )
+            return "No messages recorded yet.\n"
+
+        width = max(len("Method"), max(len(method) for method, _ in stats))
+        columns = ("Msgs", "p50", "p95", "Max", "Sent", "Recv", "In flight")
+        lines = [
+            "Method".ljust(width) + "".join(column.rjust(10) for column in columns),
+            "-" * (width + 10 * len(columns)),
+        ]
+        for method, stat in stats:
+            values = [str(stat["messages"])]
+            if stat["requests"]:
+                values += [format_duration(stat[key]) for key in ("p50", "p95", "max")]
+            else:
+                values += ["-"] * 3
+            values += [format_bytes(stat["sent"]), format_bytes(stat["received"])]
+            values.append(f"{stat['in_flight']}/{stat['max_in_flight']}")
+            lines.append(method.ljust(width) + "".join(v.rjust(10) for v in values))
+
+        log_path = _lsp_tracer.get_log_path()
+        if log_path:
+            lines += ["", f"Message log: {log_path}"]
+        return "\n".join(lines) + "\n"
+
+
+class TerraformResetLspStatsCommand(sublime_plugin.WindowCommand):
+    """Forget the recorded terraform-ls messages"""
+
+    def run(self):
+        _lsp_tracer.reset()
+        sublime.status_message("Language server stats reset")
@@ -3,6 +3,7 @@ Module and Provider Explorer for Terraform files
 Shows modules and providers used in the current file
 """
 
+import html
 import json
 import os
 import re
@@ -10,6 +11,18 @@ import re
 import sublime
 import sublime_plugin
 
+from .terraform_blocks import TerraformLineIndex, scan_blocks
+from .terraform_lockfile import get_locked_providers, get_provider_address
+from .terraform_modules import (
+    find_module_call,
+    find_module_code,
+    format_interface_html,
+    get_module_index,
+    open_module_dir,
+)
+from .terraform_perf import span
+from .terraform_project import TerraformProjectDetector
+from .terraform_references import find_required_providers
 from .terraform_settings import get_settings
 
 
@@ -21,9 +34,10 @@ class TerraformModuleParser:
         """Parse a view for modules and providers"""
         content = view.substr(sublime.Region(0, view.size()))
 
-        modules = TerraformModuleParser.find_modules(content)
-        providers = TerraformModuleParser.find_providers(content)
-        resources = TerraformModuleParser.find_resources(content)
+        with span("modules.parse_file", len(content)):
+            modules = TerraformModuleParser.find_modules(content)
+            providers = TerraformModuleParser.find_providers(content)
+            resources = TerraformModuleParser.find_resources(content)
 
         return {"modules": modules, "providers": providers, "resources": resources}
 
@@ -66,35 +80,29 @@ class TerraformModuleParser:
     def find_providers(content):
         """Find all provider configurations"""
         providers = []
-
-        # Find required_providers block
-        req_providers_pattern = r"required_providers\s*\{([^}]*)\}"
-        req_match = re.search(req_providers_pattern, content, re.DOTALL)
-
-        if req_match:
-            providers_block = req_match.group(1)
-
-            # Parse each provider
-            provider_pattern = r"(\w+)\s*=\s*\{([^}]*)\}"
-
-            for match in re.finditer(provider_pattern, providers_block):
-                name = match.group(1)
-                config = match.group(2)
-
-                # Extract source
-                source_match = re.search(r'source\s*=\s*"([^"]+)"', config)
-                source = source_match.group(1) if source_match else f"hashicorp/{name}"
-
-                # Extract version
-                version_match = re.search(r'version\s*=\s*"([^"]+)"', config)
-                version = version_match.group(1) if version_match else "latest"
-
-                providers.append({"name": name, "source": source, "version": version})
+        lines = TerraformLineIndex(content)
+        blocks = scan_blocks(content, lines)
+
+        # Find required_providers blocks, whose entries can hold nested braces
+        for block in blocks:
+            if block.kind != "terraform":
+                continue
+            for _, name, source, version in find_required_providers(
+                content, block, lines
+            ):
+                providers.append(
+                    {
+                        "name": name,
+                        "source": source or f"hashicorp/{name}",
+                        "version": version or "latest",
+                    }
+                )
 
         # Also find provider blocks
-        provider_pattern = r'provider\s+"([^"]+)"'
-        for match in re.finditer(provider_pattern, content):
-            name = match.group(1)
+        for block in blocks:
+            if block.kind != "provider" or len(block.labels) != 1:
+                continue
+            name = block.labels[0]
             if not any(p["name"] == name for p in providers):
                 providers.append(
                     {"name": name, "source": f"hashicorp/{name}", "version": "latest"}
@@ -224,6 +232,7 @@ class TerraformShowProvidersCommand(sublime_plugin.WindowCommand):
         # Parse the file
         parsed = TerraformModuleParser.parse_file(view)
         providers = parsed["providers"]
+        self.add_locked_versions(view, providers)
 
         if not providers:
             sublime.status_message("No providers found in current file")
@@ -232,11 +241,16 @@ class TerraformShowProvidersCommand(sublime_plugin.WindowCommand):
         # Create quick panel items
         items = []
         for provider in providers:
+            version = f"Version: {provider['version']}"
+            if provider.get("locked"):
+                version += (
+                    f", locked {provider['locked']} ({provider['hashes']} hashes)"
+                )
             items.append(
                 [
                     f"🔌 {provider['name']}",
                     f"Source: {provider['source']}",
-                    f"Version: {provider['version']}",
+                    version,
                 ]
             )
 
@@ -247,6 +261,35 @@ class TerraformShowProvidersCommand(sublime_plugin.WindowCommand):
             placeholder="Select a provider to view documentation",
         )
 
+    def add_locked_versions(self, view, providers):
+        """Add the versions the root module's lock file selected
+
+        Providers only in the lock file are added too, since they are often
+        required in another file of the root module.
+        """
+        project = TerraformProjectDetector.detect_project(view)
+        locked = get_locked_providers(project.root_path) if project else None
+        if not locked:
+            return
+
+        locked = dict(locked)
+        for provider in providers:
+            locked_provider = locked.pop(get_provider_address(provider["source"]), None)
+            if locked_provider:
+                provider["locked"] = locked_provider.version
+                provider["hashes"] = len(locked_provider.hashes)
+
+        for locked_provider in locked.values():
+            providers.append(
+                {
+                    "name": locked_provider.name,
+                    "source": locked_provider.source,
+                    "version": locked_provider.constraints or "latest",
+                    "locked": locked_provider.version,
+                    "hashes": len(locked_provider.hashes),
+                }
+            )
+
     def on_select(self, index, providers):
         """Handle provider selection"""
         if index < 0:
@@ -262,12 +305,46 @@ class TerraformShowProvidersCommand(sublime_plugin.WindowCommand):
 
             # Construct documentation URL
             if provider["source"].startswith("hashicorp/"):
-                url = f"https://registry.terraform.io/providers/{provider['source']}/latest/docs"
+                version = provider.get("locked") or "latest"
+                url = f"https://registry.terraform.io/providers/{provider['source']}/{version}/docs"
             else:
                 url = f"https://registry.terraform.io/providers/{provider['source']}"
             webbrowser.open(url)
 
 
+def format_module_hover_html(source, module=None, interface=None):
+    """Format the popup of a module source"""
+    source_type = TerraformModuleParser.get_source_type(source)
+    content = f"""
+    <div style="padding: 10px;">
+        <h3>Module Source</h3>
+        <p><strong>Type:</strong> {html.escape(source_type)}</p>
+        <p><strong>Source:</strong> <code>{html.escape(source)}</code></p>
+    """
+
+    if module is not None and module.version:
+        content += f"""
+        <p><strong>Version:</strong> {html.escape(module.version)}</p>
+        """
+    if interface is not None:
+        content += format_interface_html(interface)
+        content += """
+        <p><a href="open">Go to module code</a></p>
+        """
+    elif source_type != "local":
+        content += """
+        <p>Not installed, run terraform init</p>
+        """
+
+    if source_type == "registry":
+        url = html.escape(f"https://registry.terraform.io/modules/{source}")
+        content += f"""
+        <p><a href="{url}">View on Terraform Registry</a></p>
+        """
+
+    return content + "</div>"
+
+
 class TerraformModuleExplorerListener(sublime_plugin.EventListener):
     """Event listener for module explorer features"""
 
@@ -278,41 +355,40 @@ class TerraformModuleExplorerListener(sublime_plugin.EventListener):
 
         # Check if we're hovering over a module source
         if view.match_selector(point, "string.quoted.double.terraform"):
-            line = view.line(point)
-            line_text = view.substr(line)
-
-            # Check if this is a module source line
-            if "source" in line_text and "module" in view.substr(
-                view.line(line.begin() - 100)
-            ):
-                source_match = re.search(r'source\s*=\s*"([^"]+)"', line_text)
-                if source_match:
-                    source = source_match.group(1)
-                    self.show_module_hover(view, point, source)
-
-    def show_module_hover(self, view, point, source):
+            # Resolving the module reads the manifest and the module's files
+            sublime.set_timeout_async(lambda: self.on_hover_async(view, point))
+
+    def on_hover_async(self, view, point):
+        """Show the module popup if point is in the source of a module block"""
+        line_text = view.substr(view.line(point))
+        source_match = re.search(r'source\s*=\s*"([^"]+)"', line_text)
+        if source_match:
+            name = find_module_call(view, point)
+            if name:
+                self.show_module_hover(view, point, source_match.group(1), name)
+
+    def show_module_hover(self, view, point, source, name):
         """Show hover popup for module source"""
-        source_type = TerraformModuleParser.get_source_type(source)
-
-        content = f"""
-        <div style="padding: 10px;">
-            <h3>Module Source</h3>
-            <p><strong>Type:</strong> {source_type}</p>
-            <p><strong>Source:</strong> <code>{source}</code></p>
-        """
-
-        if source_type == "registry":
-            content += f"""
-            <p><a href="https://registry.terraform.io/modules/{source}">View on Terraform Registry</a></p>
-            """
+        module, directory, _ = find_module_code(view, name)
+        interface = get_module_index().get_interface(directory) if directory else None
+        content = format_module_hover_html(source, module, interface)
+
+        def on_navigate(href):
+            if href == "open":
+                view.hide_popup()
+                open_module_dir(view.window(), directory)
+            else:
+                import webbrowser
 
-        content += "</div>"
+                webbrowser.open(href)
 
         view.show_popup(
             content,
             flags=sublime.HIDE_ON_MOUSE_MOVE_AWAY,
             location=point,
             max_width=600,
+            max_height=600,
+            on_navigate=on_navigate,
         )
 
 
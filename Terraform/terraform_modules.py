@@ -0,0 +1,515 @@
+"""
+Index of the modules installed by terraform init
+Resolves module calls like module.a.module.b to their installed code using
+.terraform/modules/modules.json
+"""
+
+import html
+import json
+import os
+import re
+import textwrap
+import threading
+
+import sublime
+import sublime_plugin
+
+from .terraform_blocks import get_attribute_values, scan_blocks
+from .terraform_perf import span
+from .terraform_project import TerraformProjectDetector
+from .terraform_references import REFERENCE, is_terraform_view
+
+# Manifest written by terraform init, relative to the root module
+MODULES_MANIFEST = os.path.join(".terraform", "modules", "modules.json")
+
+# source = "..." attribute of a module block
+MODULE_SOURCE = re.compile(r'^[ \t]*source[ \t]*=[ \t]*"([^"\n]*)"', re.MULTILINE)
+
+# Comment to the end of a line
+LINE_COMMENT = re.compile(r"(?:#|//)[^\n]*")
+
+# Characters of a type or default shown before it is cut
+MAX_VALUE_LENGTH = 60
+
+# File opened first when jumping into a module
+MAIN_FILE = "main.tf"
+
+
+def get_module_address(key):
+    """Get the address of a module call key, like module.a.module.b for a.b"""
+    if not key:
+        return ""
+    return ".".join(f"module.{name}" for name in key.split("."))
+
+
+def is_local_source(source):
+    """Check if a module source is a path relative to the calling module"""
+    return source.startswith(("./", "../"))
+
+
+class TerraformInstalledModule:
+    """A module call installed by terraform init"""
+
+    __slots__ = ("key", "address", "source", "version", "dir")
+
+    def __init__(self, key, source, version, dir):
+        self.key = key
+        self.address = get_module_address(key)
+        self.source = source
+        self.version = version
+        self.dir = dir
+
+
+class TerraformModuleManifest:
+    """The installed modules of one root module, from its modules.json"""
+
+    __slots__ = ("root_path", "stat", "modules", "dirs")
+
+    def __init__(self, root_path, stat, entries):
+        self.root_path = root_path
+        # (mtime, size) of modules.json when it was read
+        self.stat = stat
+        # Installed modules by address
+        self.modules = {}
+        # Installed modules by directory, to find the call a file belongs to
+        self.dirs = {}
+        for entry in entries:
+            key = entry.get("Key") or ""
+            if not key:
+                continue
+            module = TerraformInstalledModule(
+                key,
+                entry.get("Source") or "",
+                entry.get("Version") or None,
+                os.path.normpath(os.path.join(root_path, entry.get("Dir") or "")),
+            )
+            self.modules[module.address] = module
+            self.dirs.setdefault(module.dir, module)
+
+    def find_module_of(self, path):
+        """Get the installed module a file belongs to, or None for the root"""
+        directory = os.path.dirname(path)
+        while directory.startswith(self.root_path) and directory != self.root_path:
+            module = self.dirs.get(directory)
+            if module is not None:
+                return module
+            directory = os.path.dirname(directory)
+        return None
+
+
+class TerraformModuleVariable:
+    """An input variable of a module"""
+
+    __slots__ = ("name", "type", "default", "description", "path", "line")
+
+    def __init__(self, name, type, default, description, path, line):
+        self.name = name
+        self.type = type
+        # Expression of the default value, None when the variable is required
+        self.default = default
+        self.description = description
+        self.path = path
+        self.line = line
+
+    @property
+    def required(self):
+        return self.default is None
+
+
+class TerraformModuleOutput:
+    """An output of a module"""
+
+    __slots__ = ("name", "description", "sensitive", "path", "line")
+
+    def __init__(self, name, description, sensitive, path, line):
+        self.name = name
+        self.description = description
+        self.sensitive = sensitive
+        self.path = path
+        self.line = line
+
+
+class TerraformModuleInterface:
+    """Variables and outputs of a module's code"""
+
+    __slots__ = ("signature", "variables", "outputs")
+
+    def __init__(self, signature, variables, outputs):
+        # Directory and file mtimes the interface was read from
+        self.signature = signature
+        # Variables and outputs by name, in file order
+        self.variables = variables
+        self.outputs = outputs
+
+
+def get_string_value(expression):
+    """Get the text of a quoted string or heredoc expression"""
+    if not expression:
+        return ""
+    if expression.startswith('"'):
+        try:
+            return json.loads(expression)
+        except ValueError:
+            return expression.strip('"')
+    if expression.startswith("<<"):
+        lines = expression.split("\n")[1:-1]
+        return textwrap.dedent("\n".join(lines)).strip()
+    return expression
+
+
+def format_expression(expression):
+    """Put an expression on one line"""
+    return " ".join(LINE_COMMENT.sub("", expression).split())
+
+
+def get_directory_signature(directory):
+    """Get the mtimes of a directory and its .tf files, or None if missing"""
+    try:
+        with os.scandir(directory) as entries:
+            files = sorted(
+                (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                for entry in entries
+                if entry.name.endswith(".tf") and entry.is_file()
+            )
+        return os.stat(directory).st_mtime_ns, tuple(files)
+    except OSError:
+        return None
+
+
+def scan_module_interface(directory, signature):
+    """Read the variables and outputs declared in a module directory"""
+    variables = {}
+    outputs = {}
+    for name, _, _ in signature[1]:
+        path = os.path.join(directory, name)
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                content = f.read()
+        except (IOError, OSError):
+            continue
+
+        for block in scan_blocks(content):
+            if len(block.labels) != 1 or block.kind not in ("variable", "output"):
+                continue
+            values = get_attribute_values(content, block)
+            description = get_string_value(values.get("description"))
+            if block.kind == "variable":
+                variables[block.labels[0]] = TerraformModuleVariable(
+                    block.labels[0],
+                    format_expression(values.get("type") or "any"),
+                    values.get("default"),
+                    description,
+                    path,
+                    block.line,
+                )
+            else:
+                outputs[block.labels[0]] = TerraformModuleOutput(
+                    block.labels[0],
+                    description,
+                    values.get("sensitive") == "true",
+                    path,
+                    block.line,
+                )
+    return TerraformModuleInterface(signature, variables, outputs)
+
+
+class TerraformModuleIndex:
+    """Resolution index of the installed modules of every root module
+
+    Manifests are read once and kept until modules.json changes, so
+    resolving a call is a stat and a dict lookup. The interface of a module
+    is read the first time it is asked for and kept until its files change.
+    """
+
+    def __init__(self):
+        self._manifests = {}
+        # Interfaces by module directory
+        self._interfaces = {}
+        self._lock = threading.Lock()
+
+    def get_manifest(self, root_path):
+        """Get the installed modules of a root module, or None if not installed"""
+        manifest_path = os.path.join(root_path, MODULES_MANIFEST)
+        try:
+            st = os.stat(manifest_path)
+        except OSError:
+            self._forget(root_path)
+            return None
+
+        stat = (st.st_mtime_ns, st.st_size)
+        manifest = self._manifests.get(root_path)
+        if manifest is not None and manifest.stat == stat:
+            return manifest
+
+        with span("modules.load_manifest", root=root_path):
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    entries = json.load(f).get("Modules") or []
+            except (IOError, OSError, ValueError, AttributeError) as e:
+                print(f"Terraform: failed to read {manifest_path}: {e}")
+                entries = []
+            manifest = TerraformModuleManifest(root_path, stat, entries)
+
+        self._forget(root_path)
+        with self._lock:
+            self._manifests[root_path] = manifest
+        return manifest
+
+    def _forget(self, root_path):
+        """Drop the manifest of a root module and its modules' interfaces"""
+        with self._lock:
+            manifest = self._manifests.pop(root_path, None)
+            if manifest is not None:
+                for directory in manifest.dirs:
+                    self._interfaces.pop(directory, None)
+
+    def resolve(self, root_path, address):
+        """Get the installed module of a call like module.a.module.b"""
+        manifest = self.get_manifest(root_path)
+        return manifest.modules.get(address) if manifest else None
+
+    def get_caller_address(self, root_path, path):
+        """Get the address of the module a file is part of, "" for the root"""
+        manifest = self.get_manifest(root_path)
+        module = manifest.find_module_of(path) if manifest else None
+        return module.address if module else ""
+
+    def get_interface(self, directory):
+        """Get the variables and outputs of a module directory
+
+        The directory is read again only when it or one of its .tf files
+        changed. Returns None if it doesn't exist.
+        """
+        signature = get_directory_signature(directory)
+        if signature is None:
+            with self._lock:
+                self._interfaces.pop(directory, None)
+            return None
+
+        interface = self._interfaces.get(directory)
+        if interface is None or interface.signature != signature:
+            with span("modules.scan_interface", directory=directory):
+                interface = scan_module_interface(directory, signature)
+            with self._lock:
+                self._interfaces[directory] = interface
+        return interface
+
+    def close(self):
+        """Forget every manifest and interface"""
+        with self._lock:
+            self._manifests.clear()
+            self._interfaces.clear()
+
+
+# Shared module index, created on first use
+_module_index = None
+_module_index_lock = threading.Lock()
+
+
+def get_module_index():
+    """Get the shared module resolution index"""
+    global _module_index
+    with _module_index_lock:
+        if _module_index is None:
+            _module_index = TerraformModuleIndex()
+        return _module_index
+
+
+def close_module_index():
+    """Release the shared module resolution index"""
+    global _module_index
+    with _module_index_lock:
+        index, _module_index = _module_index, None
+
+    if index:
+        index.close()
+
+
+def find_module_call(view, point):
+    """Get the name of the module called by the block or reference at point"""
+    line_region = view.line(point)
+    column = point - line_region.begin()
+    for match in REFERENCE.finditer(view.substr(line_region)):
+        if match.start() <= column <= match.end() and match.group("root") == "module":
+            return match.group("name")
+
+    content = view.substr(sublime.Region(0, view.size()))
+    for block in scan_blocks(content):
+        if block.start <= point < block.end:
+            if block.kind == "module" and len(block.labels) == 1:
+                return block.labels[0]
+            return None
+    return None
+
+
+def find_module_source(view, name):
+    """Get the source of a module block in a view"""
+    content = view.substr(sublime.Region(0, view.size()))
+    for block in scan_blocks(content):
+        if block.kind == "module" and block.labels == (name,):
+            match = MODULE_SOURCE.search(content, block.body_start, block.end)
+            return match.group(1) if match else None
+    return None
+
+
+def resolve_module_call(view, name):
+    """Get (installed module or None, address) of a module called in a view"""
+    project = TerraformProjectDetector.detect_project(view)
+    if not project:
+        return None, f"module.{name}"
+
+    index = get_module_index()
+    caller = index.get_caller_address(project.root_path, view.file_name())
+    address = f"{caller}.module.{name}" if caller else f"module.{name}"
+    return index.resolve(project.root_path, address), address
+
+
+def find_module_code(view, name):
+    """Get (installed module, directory, address) of a module called in a view
+
+    The module and directory are None when they are not found. Local
+    sources are found before terraform init; other sources only once they
+    are installed.
+    """
+    module, address = resolve_module_call(view, name)
+    if module is not None:
+        return module, module.dir, address
+
+    source = find_module_source(view, name)
+    if source and is_local_source(source):
+        directory = os.path.dirname(view.file_name())
+        return None, os.path.normpath(os.path.join(directory, source)), address
+    return None, None, address
+
+
+def get_module_dir(view, name):
+    """Get (directory or None, address) of the code of a module called in a view"""
+    _, directory, address = find_module_code(view, name)
+    return directory, address
+
+
+def open_module_dir(window, directory):
+    """Open the main file of a module directory, or its first .tf file"""
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith(".tf"))
+    except OSError:
+        names = []
+    if not names:
+        sublime.status_message(f"No Terraform files in {directory}")
+        return
+    name = MAIN_FILE if MAIN_FILE in names else names[0]
+    window.open_file(os.path.join(directory, name))
+
+
+def shorten(text, length=MAX_VALUE_LENGTH):
+    """Cut a text to a length, marking the cut"""
+    return text if len(text) <= length else text[: length - 3] + "..."
+
+
+def format_interface_html(interface):
+    """Format the variables and outputs of a module for a popup"""
+    lines = [f"<h4>Variables ({len(interface.variables)})</h4>"]
+    for variable in interface.variables.values():
+        value = (
+            "<em>required</em>"
+            if variable.required
+            else f"= {html.escape(shorten(format_expression(variable.default)))}"
+        )
+        lines.append(
+            f"<div><code>{html.escape(variable.name)}</code> "
+            f"{html.escape(shorten(variable.type))} {value}</div>"
+        )
+
+    lines.append(f"<h4>Outputs ({len(interface.outputs)})</h4>")
+    for output in interface.outputs.values():
+        description = html.escape(shorten(output.description))
+        lines.append(
+            f"<div><code>{html.escape(output.name)}</code> {description}</div>"
+        )
+    return "\n".join(lines)
+
+
+class TerraformGotoModuleSourceCommand(sublime_plugin.TextCommand):
+    """Open the code of the module called under the cursor"""
+
+    def run(self, edit):
+        name = find_module_call(self.view, self.view.sel()[0].begin())
+        if not name:
+            sublime.status_message("No module call under the cursor")
+            return
+
+        directory, address = get_module_dir(self.view, name)
+        if directory:
+            open_module_dir(self.view.window(), directory)
+        else:
+            sublime.status_message(f"{address} is not installed, run terraform init")
+
+    def is_enabled(self):
+        return is_terraform_view(self.view)
+
+
+class TerraformShowModuleInterfaceCommand(sublime_plugin.TextCommand):
+    """List the variables and outputs of the module called under the cursor
+
+    Outside a module call, the module of the current file is listed.
+    """
+
+    def run(self, edit):
+        name = find_module_call(self.view, self.view.sel()[0].begin())
+        if name:
+            directory, address = get_module_dir(self.view, name)
+            if not directory:
+                sublime.status_message(
+                    f"{address} is not installed, run terraform init"
+                )
+                return
+        else:
+            directory = os.path.dirname(self.view.file_name())
+            address = os.path.basename(directory)
+
+        interface = get_module_index().get_interface(directory)
+        if interface is None or not (interface.variables or interface.outputs):
+            sublime.status_message(f"{address} has no variables or outputs")
+            return
+
+        items = []
+        locations = []
+        for variable in interface.variables.values():
+            value = (
+                "required"
+                if variable.required
+                else f"= {shorten(format_expression(variable.default))}"
+            )
+            items.append(
+                [
+                    f"var.{variable.name}",
+                    f"{shorten(variable.type)} {value}",
+                    shorten(variable.description, 120),
+                ]
+            )
+            locations.append((variable.path, variable.line))
+        for output in interface.outputs.values():
+            sensitive = "sensitive" if output.sensitive else ""
+            items.append(
+                [f"output.{output.name}", sensitive, shorten(output.description, 120)]
+            )
+            locations.append((output.path, output.line))
+
+        window = self.view.window()
+
+        def on_select(index):
+            if index >= 0:
+                path, line = locations[index]
+                window.open_file(f"{path}:{line}", sublime.ENCODED_POSITION)
+
+        window.show_quick_panel(
+            items,
+            on_select,
+            placeholder=(
+                f"{address}: {len(interface.variables)} variables, "
+                f"{len(interface.outputs)} outputs"
+            ),
+        )
+
+    def is_enabled(self):
+        return is_terraform_view(self.view)
@@ -0,0 +1,233 @@
+"""
+Path filters for walking Terraform workspaces
+Compiles gitignore-style patterns and prunes directories while walking
+"""
+
+import os
+import re
+
+# Ignore files honoured while walking, like .gitignore
+DEFAULT_IGNORE_FILES = (".gitignore", ".terraformignore")
+
+
+def translate_pattern(pattern):
+    """Translate the glob of a gitignore pattern to a regex
+
+    "*" and "?" never match a "/", "**" matches across directories and
+    "a/**" also matches "a" itself so walks prune it instead of visiting it.
+    """
+    if pattern.endswith("/**"):
+        return translate_pattern(pattern[:-3]) + "(?:/.*)?"
+
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            chars = pattern[i + 1 : end].replace("\\", "\\\\")
+            if chars[0] in "!^":
+                chars = "^" + chars[1:]
+            regex.append(f"[{chars}]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            regex.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(regex)
+
+
+class TerraformIgnoreRule:
+    """One parsed pattern of an ignore file or setting"""
+
+    __slots__ = ("pattern", "negate", "dir_only", "literal", "regex")
+
+    def __init__(self, pattern, anchored=True):
+        self.pattern = pattern
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        elif pattern.startswith("\\"):
+            pattern = pattern[1:]
+
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+
+        # Like git, a slash before the end ties the pattern to the base
+        # directory; without one it matches at any depth
+        if anchored:
+            rooted = pattern.startswith("/") or "/" in pattern
+        else:
+            rooted = pattern.startswith("/")
+        pattern = pattern.lstrip("/")
+
+        # Plain names are looked up in a set instead of the regex
+        self.literal = None
+        if not rooted and not any(c in pattern for c in "/*?[\\"):
+            self.literal = pattern
+
+        prefix = "" if rooted else "(?:.*/)?"
+        self.regex = f"{prefix}{translate_pattern(pattern)}"
+
+    def compile(self):
+        """Compile the rule on its own"""
+        return re.compile(self.regex + r"\Z", re.DOTALL)
+
+
+class TerraformPathFilter:
+    """Matches paths against gitignore-style patterns
+
+    Paths are relative to the directory of the ignore file, or absolute for
+    patterns from the settings, which are not anchored (anchored=False): a
+    pattern like "examples/*" then matches at any depth. The patterns are
+    compiled into one regex; negated patterns ("!keep") switch to checking
+    every rule, last match first, like git.
+    """
+
+    __slots__ = ("rules", "_names", "_dir_names", "_regex", "_dir_regex", "_ordered")
+
+    def __init__(self, patterns, anchored=True):
+        self.rules = []
+        for pattern in patterns:
+            pattern = pattern.rstrip() if pattern else ""
+            if pattern and not pattern.startswith("#"):
+                self.rules.append(TerraformIgnoreRule(pattern, anchored))
+
+        self._ordered = None
+        if any(rule.negate for rule in self.rules):
+            self._ordered = [
+                (rule.compile(), rule.negate, rule.dir_only)
+                for rule in reversed(self.rules)
+            ]
+
+        self._names = {r.literal for r in self.rules if r.literal and not r.dir_only}
+        self._dir_names = self._names | {
+            r.literal for r in self.rules if r.literal and r.dir_only
+        }
+        self._regex = self._combine(r for r in self.rules if not r.dir_only)
+        self._dir_regex = self._combine(self.rules)
+
+    @staticmethod
+    def _combine(rules):
+        """Compile the rules that are not plain names into one regex"""
+        regexes = [rule.regex for rule in rules if rule.literal is None]
+        if not regexes:
+            return None
+        return re.compile(f"(?:{'|'.join(regexes)})\\Z", re.DOTALL)
+
+    @classmethod
+    def from_file(cls, path):
+        """Load the patterns of an ignore file, or None if it has none"""
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                path_filter = cls(f.read().splitlines())
+        except (IOError, OSError):
+            return None
+        return path_filter if path_filter.rules else None
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def check(self, path, is_dir=False):
+        """Check a path: True if ignored, False if re-included, None if no match"""
+        path = path.replace(os.sep, "/").lstrip("/")
+
+        if self._ordered is not None:
+            for regex, negate, dir_only in self._ordered:
+                if (is_dir or not dir_only) and regex.match(path):
+                    return not negate
+            return None
+
+        names = self._dir_names if is_dir else self._names
+        if names and path.rpartition("/")[2] in names:
+            return True
+        regex = self._dir_regex if is_dir else self._regex
+        if regex is not None and regex.match(path):
+            return True
+        return None
+
+    def matches(self, path, is_dir=False):
+        """Check if a path is ignored"""
+        return self.check(path, is_dir) is True
+
+
+def load_ignore_files(root, files, ignore_files, ignores):
+    """Add the ignore files found in a directory to the (base, filter) it inherited
+
+    The directory's own ignore files come first, so they take precedence.
+    """
+    for name in ignore_files:
+        if name in files:
+            path_filter = TerraformPathFilter.from_file(os.path.join(root, name))
+            if path_filter:
+                ignores = ((root, path_filter),) + ignores
+    return ignores
+
+
+def is_ignored(root, name, is_dir, filters, prefixes):
+    """Check if an entry of a directory is ignored
+
+    prefixes holds (path filter, path of root relative to the filter's file).
+    """
+    path = os.path.join(root, name)
+    if any(f.matches(path, is_dir) for f in filters):
+        return True
+    for path_filter, prefix in prefixes:
+        decision = path_filter.check(f"{prefix}/{name}" if prefix else name, is_dir)
+        if decision is not None:
+            return decision
+    return False
+
+
+def prune_dirs(root, dirs, filters, prefixes, on_pruned=None):
+    """Get the subdirectories of a directory that are not ignored"""
+    kept = [d for d in dirs if not is_ignored(root, d, True, filters, prefixes)]
+    if on_pruned is not None and len(kept) < len(dirs):
+        for name in set(dirs).difference(kept):
+            on_pruned(os.path.join(root, name))
+    return kept
+
+
+def walk_folder(folder, filters=(), ignore_files=DEFAULT_IGNORE_FILES, on_pruned=None):
+    """os.walk() that skips ignored directories and files
+
+    filters match absolute paths; the patterns of ignore_files found along
+    the way match paths below their directory, deepest file first. Ignored
+    directories are pruned before they are entered and passed to on_pruned.
+    """
+    filters = [f for f in filters if f]
+    # Ignore files in effect for each directory still to be visited
+    inherited = {folder: ()}
+
+    for root, dirs, files in os.walk(folder):
+        ignores = load_ignore_files(root, files, ignore_files, inherited.pop(root, ()))
+
+        # Path of root relative to the directory of each ignore file
+        prefixes = [
+            (path_filter, root[len(base) + 1 :].replace(os.sep, "/"))
+            for base, path_filter in ignores
+        ]
+
+        if filters or prefixes:
+            dirs[:] = prune_dirs(root, dirs, filters, prefixes, on_pruned)
+            files[:] = [
+                f for f in files if not is_ignored(root, f, False, filters, prefixes)
+            ]
+
+        for name in dirs:
+            inherited[os.path.join(root, name)] = ignores
+
+        yield root, dirs, files
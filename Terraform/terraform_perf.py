@@ -0,0 +1,330 @@
+"""
+Performance instrumentation for the Terraform plugin
+Times plugin operations and reports them as stats or a Chrome trace
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import sublime
+import sublime_plugin
+
+from .terraform_settings import get_settings
+
+
+class TerraformPerfStat:
+    """Aggregated timings of one operation"""
+
+    # Most recent durations kept to compute percentiles
+    MAX_SAMPLES = 1000
+
+    __slots__ = ("count", "total", "max", "bytes", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+        self.samples = deque(maxlen=self.MAX_SAMPLES)
+
+    def add(self, duration, nbytes=0):
+        """Add one timing"""
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.bytes += nbytes
+        self.samples.append(duration)
+
+    def percentile(self, p):
+        """Get the p-th percentile of the recent durations"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def to_dict(self):
+        """Get the stat as a dict of seconds and bytes"""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max,
+            "bytes": self.bytes,
+        }
+
+
+class TerraformPerfRecorder:
+    """Collects operation timings and, when tracing, trace events
+
+    Recording is off by default. While it is off, span() and timed() only
+    check a flag, so instrumented code runs at full speed.
+    """
+
+    # Trace events kept before the oldest are dropped
+    MAX_TRACE_EVENTS = 100000
+
+    def __init__(self):
+        self.enabled = False
+        self.tracing = False
+        self._stats = {}
+        self._events = deque(maxlen=self.MAX_TRACE_EVENTS)
+        self._threads = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def configure(self, enabled, tracing=False):
+        """Turn recording and tracing on or off"""
+        self.enabled = bool(enabled)
+        self.tracing = self.enabled and bool(tracing)
+
+    def record(self, name, start, duration, nbytes=0, args=None):
+        """Record one timing of an operation"""
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = TerraformPerfStat()
+            stat.add(duration, nbytes)
+
+            if self.tracing:
+                thread = threading.current_thread()
+                self._threads.setdefault(thread.ident, thread.name)
+                event = {
+                    "name": name,
+                    "cat": name.split(".", 1)[0],
+                    "ph": "X",
+                    "ts": (start - self._origin) * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": os.getpid(),
+                    "tid": thread.ident,
+                }
+                if nbytes or args:
+                    event["args"] = dict(args or {}, bytes=nbytes)
+                self._events.append(event)
+
+    def get_stats(self):
+        """Get (name, stat dict) pairs sorted by total time"""
+        with self._lock:
+            stats = [(name, stat.to_dict()) for name, stat in self._stats.items()]
+        return sorted(stats, key=lambda item: -item[1]["total"])
+
+    def get_trace(self):
+        """Get the recorded events in Chrome trace event format"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": ident,
+                "args": {"name": name},
+            }
+            for ident, name in threads.items()
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._stats.clear()
+            self._events.clear()
+            self._threads.clear()
+
+
+class TerraformPerfSpan:
+    """Times a block of code; use through span()"""
+
+    __slots__ = ("name", "bytes", "args", "start")
+
+    def __init__(self, name, nbytes=0, args=None):
+        self.name = name
+        self.bytes = nbytes
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        _recorder.record(self.name, self.start, duration, self.bytes, self.args)
+        return False
+
+    def add_bytes(self, nbytes):
+        """Count bytes processed by the operation"""
+        self.bytes += nbytes
+
+
+class TerraformNullSpan:
+    """Span used while recording is off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def add_bytes(self, nbytes):
+        pass
+
+
+_null_span = TerraformNullSpan()
+
+# Global recorder instance
+_recorder = TerraformPerfRecorder()
+
+
+def get_perf_recorder():
+    """Get the shared recorder"""
+    return _recorder
+
+
+def span(name, nbytes=0, **args):
+    """Time a block of code
+
+    with span("project.refresh") as s:
+        s.add_bytes(len(content))
+    """
+    if not _recorder.enabled:
+        return _null_span
+    return TerraformPerfSpan(name, nbytes, args or None)
+
+
+def timed(name=None):
+    """Decorator that times every call of a function"""
+
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _recorder.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _recorder.record(label, start, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+def load_perf_settings():
+    """Apply the performance settings and follow their changes"""
+    settings = get_settings()
+
+    def apply():
+        perf_settings = settings.get("performance", {}) or {}
+        _recorder.configure(
+            perf_settings.get("enabled", False), perf_settings.get("trace", False)
+        )
+
+    apply()
+    settings.add_on_change("terraform_perf", apply)
+
+
+def unload_perf_settings():
+    """Stop following the performance settings"""
+    get_settings().clear_on_change("terraform_perf")
+
+
+def format_duration(seconds):
+    """Format a duration for the stats table"""
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    return f"{seconds * 1000:.1f}ms"
+
+
+def format_bytes(nbytes):
+    """Format a byte count for the stats table"""
+    for unit in ("B", "KB", "MB"):
+        if nbytes < 1024:
+            return f"{nbytes:.0f}{unit}" if unit == "B" else f"{nbytes:.1f}{unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f}GB"
+
+
+class TerraformShowPerformanceStatsCommand(sublime_plugin.WindowCommand):
+    """Show the recorded timings of plugin operations"""
+
+    def run(self):
+        panel = self.window.create_output_panel("terraform_perf")
+        panel.run_command("append", {"characters": self.format_stats(), "force": True})
+        self.window.run_command("show_panel", {"panel": "output.terraform_perf"})
+
+    def format_stats(self):
+        """Format the stats as a table"""
+        stats = _recorder.get_stats()
+        if not stats:
+            if not _recorder.enabled:
+                return (
+                    "Performance recording is off.\n"
+                    'Set "performance": {"enabled": true} in the Terraform '
+                    "settings to record timings.\n"
+                )
+            return "No operations recorded yet.\n"
+
+        width = max(len("Operation"), max(len(name) for name, _ in stats))
+        columns = ("Count", "Total", "p50", "p95", "Max", "Bytes")
+        lines = [
+            "Operation".ljust(width) + "".join(column.rjust(10) for column in columns),
+            "-" * (width + 10 * len(columns)),
+        ]
+        for name, stat in stats:
+            values = [str(stat["count"])]
+            values += [
+                format_duration(stat[key]) for key in ("total", "p50", "p95", "max")
+            ]
+            values.append(format_bytes(stat["bytes"]) if stat["bytes"] else "-")
+            lines.append(name.ljust(width) + "".join(v.rjust(10) for v in values))
+
+        return "\n".join(lines) + "\n"
+
+
+class TerraformExportPerformanceTraceCommand(sublime_plugin.WindowCommand):
+    """Save the recorded trace for chrome://tracing or Perfetto"""
+
+    def run(self):
+        if not _recorder.tracing:
+            sublime.error_message(
+                "Performance tracing is off.\n\n"
+                'Set "performance": {"enabled": true, "trace": true} in the '
+                "Terraform settings, then repeat the slow operation."
+            )
+            return
+
+        trace_dir = os.path.join(sublime.cache_path(), "Terraform")
+        path = os.path.join(
+            trace_dir, time.strftime("terraform-trace-%Y%m%d-%H%M%S.json")
+        )
+        try:
+            os.makedirs(trace_dir, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(_recorder.get_trace(), f)
+        except (IOError, OSError) as e:
+            sublime.error_message(f"Failed to save performance trace: {e}")
+            return
+
+        sublime.set_clipboard(path)
+        sublime.status_message(f"Performance trace saved to {path} (path copied)")
+
+
+class TerraformResetPerformanceStatsCommand(sublime_plugin.WindowCommand):
+    """Forget the recorded timings"""
+
+    def run(self):
+        _recorder.reset()
+        sublime.status_message("Performance stats reset")
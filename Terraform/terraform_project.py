@@ -10,7 +10,12 @@ import os
 import sublime
 import sublime_plugin
 
-from .terraform_settings import get_settings
+from .terraform_path_filter import walk_folder
+from .terraform_perf import timed
+from .terraform_settings import get_settings_snapshot
+
+# Dependency lock file terraform init writes next to a root module
+LOCK_FILE = ".terraform.lock.hcl"
 
 
 class TerraformProject:
@@ -26,6 +31,7 @@ class TerraformProject:
 
         self._analyze_project()
 
+    @timed("project.analyze")
     def _analyze_project(self):
         """Analyze the project structure"""
         # Check for terraform files
@@ -45,6 +51,7 @@ class TerraformProject:
         for tf_file in tf_files:
             self._parse_tf_file(tf_file)
 
+    @timed("project.parse_state")
     def _parse_state_file(self, state_file):
         """Parse terraform.tfstate for project info"""
         try:
@@ -115,6 +122,10 @@ class TerraformProjectDetector:
 
     _instance = None
     _projects = {}
+    # Directories the last refresh skipped, by window folder
+    _ignored_paths = {}
+    # Callbacks run when the detected projects change
+    _on_change = {}
 
     @classmethod
     def initialize(cls):
@@ -127,9 +138,31 @@ class TerraformProjectDetector:
     def cleanup(cls):
         """Cleanup resources"""
         cls._projects.clear()
+        cls._ignored_paths.clear()
+        cls._on_change.clear()
         cls._instance = None
 
     @classmethod
+    def add_on_change(cls, key, callback):
+        """Call callback() whenever projects are detected or refreshed"""
+        cls._on_change[key] = callback
+
+    @classmethod
+    def clear_on_change(cls, key):
+        """Remove a callback added with add_on_change()"""
+        cls._on_change.pop(key, None)
+
+    @classmethod
+    def _notify_change(cls):
+        """Run the change callbacks"""
+        for callback in list(cls._on_change.values()):
+            try:
+                callback()
+            except Exception as e:
+                print(f"Terraform: project change callback failed: {e}")
+
+    @classmethod
+    @timed("project.detect")
     def detect_project(cls, view):
         """Detect project for a given view"""
         if not view or not view.file_name():
@@ -148,6 +181,7 @@ class TerraformProjectDetector:
             # Create project instance
             project = TerraformProject(root_path)
             cls._projects[root_path] = project
+            cls._notify_change()
             return project
 
         return None
@@ -158,31 +192,30 @@ class TerraformProjectDetector:
         current_dir = os.path.dirname(file_path)
 
         # Check configured root modules first
-        settings = get_settings()
-        root_modules = settings.get("root_modules", [])
+        settings = get_settings_snapshot()
 
-        for root_module in root_modules:
+        for root_module in settings.root_modules:
             if file_path.startswith(root_module):
                 return root_module
 
         # Walk up directory tree looking for indicators
         while current_dir != os.path.dirname(current_dir):  # Not at root
-            # Check for root module indicators
-            if cls._is_root_module(current_dir):
-                return current_dir
-
             # Check exclusions
-            exclude_patterns = settings.get("exclude_root_modules", [])
-            if any(current_dir.endswith(pattern) for pattern in exclude_patterns):
+            if settings.exclude_root_modules.matches(current_dir, is_dir=True):
                 current_dir = os.path.dirname(current_dir)
                 continue
 
+            # Check for root module indicators
+            if cls._is_root_module(current_dir):
+                return current_dir
+
             current_dir = os.path.dirname(current_dir)
 
         # Default to file directory
         return os.path.dirname(file_path)
 
     @classmethod
+    @timed("project.is_root_module")
     def _is_root_module(cls, directory):
         """Check if directory is a root module"""
         indicators = [
@@ -215,24 +248,59 @@ class TerraformProjectDetector:
         return list(cls._projects.values())
 
     @classmethod
-    def refresh_projects(cls, window):
-        """Refresh all projects in window folders"""
-        cls._projects.clear()
-
-        for folder in window.folders():
-            # Walk directory tree
-            for root, dirs, files in os.walk(folder):
-                # Skip ignored directories
-                settings = get_settings()
-                ignore_dirs = settings.get("ignore_directory_names", [])
-                dirs[:] = [d for d in dirs if d not in ignore_dirs]
-
+    @timed("project.refresh_projects")
+    def refresh_projects(cls, window, folders=None):
+        """Refresh the projects in window folders, or in some of them
+
+        Projects of other windows' folders are kept.
+        """
+        if folders is None:
+            folders = window.folders()
+        prefixes = tuple(os.path.join(folder, "") for folder in folders)
+        for root in list(cls._projects):
+            if root in folders or root.startswith(prefixes):
+                del cls._projects[root]
+
+        settings = get_settings_snapshot()
+        filters = (settings.ignore_directories, settings.exclude_root_modules)
+
+        for folder in folders:
+            ignored = cls._ignored_paths[folder] = []
+
+            # Walk directory tree, skipping ignored and excluded directories
+            for root, dirs, files in walk_folder(
+                folder, filters, settings.ignore_files, ignored.append
+            ):
                 # Check if this is a root module
                 if any(f.endswith(".tf") for f in files):
                     if cls._is_root_module(root):
                         project = TerraformProject(root)
                         cls._projects[root] = project
 
+        cls._notify_change()
+
+    @classmethod
+    def has_refreshed(cls, folders):
+        """Check if refresh_projects() has walked all folders"""
+        return all(folder in cls._ignored_paths for folder in folders)
+
+    @classmethod
+    def get_indexing_scope(cls, folders):
+        """Get the root modules and skipped directories found in folders
+
+        Returns (root module paths, ignored directory paths), both sorted.
+        """
+        prefixes = tuple(os.path.join(folder, "") for folder in folders)
+        roots = [
+            root
+            for root in list(cls._projects)
+            if root in folders or root.startswith(prefixes)
+        ]
+        ignored = [
+            path for folder in folders for path in cls._ignored_paths.get(folder, ())
+        ]
+        return sorted(roots), sorted(ignored)
+
 
 class TerraformProjectStatusCommand(sublime_plugin.WindowCommand):
     """Show current project status"""
@@ -0,0 +1,595 @@
+"""
+Reference graph of Terraform root modules
+Indexes which blocks reference which, for Find References and dependency lookups
+"""
+
+import os
+import re
+import sys
+import threading
+
+import sublime
+import sublime_plugin
+
+from .terraform_blocks import (
+    TerraformLineIndex,
+    find_attributes,
+    find_nested_blocks,
+    get_attribute_values,
+    get_object_strings,
+    scan_blocks,
+)
+from .terraform_perf import span, timed
+from .terraform_project import TerraformProjectDetector
+
+# Reference in an expression, like aws_vpc.main.id or data.aws_region.this.name;
+# index brackets are matched so attributes after them stay part of the path
+REFERENCE = re.compile(
+    r"(?<![\w.\-])(?P<root>[A-Za-z_][\w-]*)\.(?P<name>[A-Za-z_][\w-]*)"
+    r"(?P<rest>(?:\.[A-Za-z_][\w-]*|\[[^\]\n]*\])*)"
+)
+
+# Strings, heredocs and comments, matched before references so references in
+# comments and plain string text are skipped
+EXPRESSION_TOKENS = re.compile(
+    r'(?P<string>"(?:[^"\\\n$%]|\\.|[$%]\{[^}\n]*\}|[$%])*"'
+    r"|<<-?(?P<tag>\w+)\n.*?^[ \t]*(?P=tag)[ \t]*$)"
+    r"|#[^\n]*|//[^\n]*|/\*.*?\*/"
+    r"|(?P<reference>" + REFERENCE.pattern + ")",
+    re.DOTALL | re.MULTILINE,
+)
+
+# Interpolation or directive in a string
+INTERPOLATION = re.compile(r"[$%]\{([^}]*)\}")
+
+# Index brackets dropped from reference paths
+INDEX = re.compile(r"\[[^\]\n]*\]")
+
+# Names before a dot that never refer to another block
+IGNORED_ROOTS = frozenset(("each", "count", "path", "self", "terraform", "provider"))
+
+# Milliseconds to wait after the last edit before indexing a view again
+UPDATE_DELAY = 500
+
+
+def get_base_address(path):
+    """Get the address of the block a reference path points into"""
+    parts = path.split(".")
+    if parts[0] == "data":
+        return ".".join(parts[:3]) if len(parts) >= 3 else None
+    return ".".join(parts[:2])
+
+
+def find_references(content, start, end):
+    """Yield (path, offset) of the references between two offsets"""
+    for token in EXPRESSION_TOKENS.finditer(content, start, end):
+        if token.group("root") is not None:
+            yield from _reference_paths(token)
+        elif token.group("string") is not None:
+            if "{" not in token.group("string"):
+                continue
+            for interpolation in INTERPOLATION.finditer(
+                content, token.start(), token.end()
+            ):
+                for match in REFERENCE.finditer(
+                    content, interpolation.start(1), interpolation.end(1)
+                ):
+                    yield from _reference_paths(match)
+
+
+def _reference_paths(match):
+    """Yield the path of a reference match unless it is not a block"""
+    root, name, rest = match.group("root", "name", "rest")
+    if root in IGNORED_ROOTS:
+        return
+    path = f"{root}.{name}{INDEX.sub('', rest) if '[' in rest else rest}"
+    if path.startswith("data.") and path.count(".") < 2:
+        return
+    yield path, match.start()
+
+
+def get_string(expression):
+    """Get the text of a quoted string expression, or None"""
+    if expression and len(expression) > 1 and expression[0] == expression[-1] == '"':
+        return expression[1:-1]
+    return None
+
+
+def find_required_providers(content, block, lines):
+    """Get (line, name, source, version) of a terraform block's providers"""
+    providers = []
+    for nested in find_nested_blocks(content, block, lines):
+        if nested.kind != "required_providers":
+            continue
+        for name, expression in get_attribute_values(content, nested).items():
+            # Terraform 0.12 style: aws = "~> 2.0"
+            version = get_string(expression)
+            source = None
+            if version is None:
+                values = get_object_strings(expression)
+                source, version = values.get("source"), values.get("version")
+            providers.append((nested.line, name, source, version))
+    return providers
+
+
+def get_module_call(content, block):
+    """Get (line, name, source, version) of a module block"""
+    values = get_attribute_values(content, block)
+    return (
+        block.line,
+        block.labels[0],
+        get_string(values.get("source")),
+        get_string(values.get("version")),
+    )
+
+
+def find_local_spans(content, block, lines):
+    """Get (start, end, line, end line, address) of the locals of a block
+
+    Each local spans the text up to the next one, or to the end of the block.
+    """
+    attributes = find_attributes(content, block)
+    spans = []
+    for i, (name, offset) in enumerate(attributes):
+        if i + 1 < len(attributes):
+            end = attributes[i + 1][1]
+            end_line = lines.line(end) - 1
+        else:
+            end, end_line = block.end, block.end_line
+        address = sys.intern(f"local.{name}")
+        spans.append((offset, end, lines.line(offset), end_line, address))
+    return spans
+
+
+def find_block_spans(content, lines):
+    """Get (spans, modules, providers) of the blocks of a file
+
+    Spans are (start, end, line, end line, address) of the text each block or
+    local spans, in file order.
+    """
+    spans = []
+    modules = []
+    providers = []
+    for block in scan_blocks(content, lines):
+        if block.kind == "locals":
+            spans.extend(find_local_spans(content, block, lines))
+            continue
+        if block.kind == "module" and len(block.labels) == 1:
+            modules.append(get_module_call(content, block))
+        elif block.kind == "terraform":
+            providers.extend(find_required_providers(content, block, lines))
+
+        if block.address is not None:
+            address = sys.intern(block.address)
+            spans.append(
+                (block.body_start, block.end, block.line, block.end_line, address)
+            )
+    return spans, modules, providers
+
+
+def count_span_references(content, lines, spans):
+    """Get (dependencies, sites) of the references in each span of a file
+
+    Dependencies are {source: {target: count}}, sites are
+    {target: [(path, source, line, column)]}.
+    """
+    dependencies = {source: {} for *_, source in spans}
+    sites = {}
+    i = 0
+    # One pass over the file, handing each reference to its span
+    for ref_path, offset in find_references(content, 0, len(content)):
+        while i < len(spans) and spans[i][1] <= offset:
+            i += 1
+        if i == len(spans):
+            break
+        start, *_, source = spans[i]
+        target = sys.intern(get_base_address(ref_path))
+        if offset < start or target == source:
+            continue
+        targets = dependencies[source]
+        targets[target] = targets.get(target, 0) + 1
+        line, column = lines.position(offset)
+        sites.setdefault(target, []).append((ref_path, source, line, column))
+    return dependencies, sites
+
+
+class TerraformFileSymbols:
+    """What one file adds to a reference graph"""
+
+    __slots__ = ("mtime", "blocks", "targets", "modules", "providers")
+
+    def __init__(self, mtime, blocks, targets, modules=(), providers=()):
+        self.mtime = mtime
+        # (line, end line, address) of the file's blocks, by line
+        self.blocks = blocks
+        # Addresses the file references
+        self.targets = targets
+        # (line, name, source, version) of the module calls
+        self.modules = modules
+        # (line, name, source, version) of the required providers
+        self.providers = providers
+
+
+class TerraformReferenceGraph:
+    """References between the blocks of one root module
+
+    Files are indexed one at a time, so an edit only re-indexes its file.
+    Dependencies and dependents are kept as adjacency dicts, so every hop
+    is a dict lookup. Locals are nodes of their own, like local.name.
+    """
+
+    def __init__(self, root_path):
+        self.root_path = root_path
+        # Definition of every block: address -> (file, line)
+        self.blocks = {}
+        # source -> {target: number of references}
+        self.dependencies = {}
+        # target -> {source: number of references}
+        self.dependents = {}
+        # target -> {file: [(path, source, line, column)]}
+        self._sites = {}
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Index new and changed files of the root module, forget deleted ones"""
+        seen = set()
+        try:
+            entries = list(os.scandir(self.root_path))
+        except OSError:
+            entries = []
+        # Views and report threads update files while the folder is read
+        with self._lock:
+            files = dict(self._files)
+
+        for entry in entries:
+            if not entry.name.endswith(".tf") or not entry.is_file():
+                continue
+            seen.add(entry.path)
+            indexed = files.get(entry.path)
+            mtime = entry.stat().st_mtime
+            if indexed is None or indexed.mtime != mtime:
+                self.update_file(entry.path, mtime=mtime)
+
+        for path in [path for path in files if path not in seen]:
+            self.remove_file(path)
+
+    @timed("references.update_file")
+    def update_file(self, path, content=None, mtime=None):
+        """Index a file from disk, or from the content of its view"""
+        if content is None:
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    content = f.read()
+                mtime = mtime or os.path.getmtime(path)
+            except (IOError, OSError):
+                self.remove_file(path)
+                return
+
+        lines = TerraformLineIndex(content)
+        spans, modules, providers = find_block_spans(content, lines)
+        symbols = [(line, end_line, source) for _, _, line, end_line, source in spans]
+        dependencies, sites = count_span_references(content, lines, spans)
+
+        with self._lock:
+            self._remove_file(path)
+            for line, _, source in symbols:
+                self.blocks[source] = (path, line)
+            for source, targets in dependencies.items():
+                self.dependencies[source] = targets
+                for target, count in targets.items():
+                    self.dependents.setdefault(target, {})[source] = count
+            for target, target_sites in sites.items():
+                self._sites.setdefault(target, {})[path] = target_sites
+            self._files[path] = TerraformFileSymbols(
+                mtime, sorted(symbols), tuple(sites), tuple(modules), tuple(providers)
+            )
+
+    def remove_file(self, path):
+        """Forget what a file added to the graph"""
+        with self._lock:
+            self._remove_file(path)
+
+    def _remove_file(self, path):
+        """Forget a file; the lock must be held"""
+        symbols = self._files.pop(path, None)
+        if symbols is None:
+            return
+
+        for _, _, source in symbols.blocks:
+            if self.blocks.get(source, (None,))[0] == path:
+                del self.blocks[source]
+            for target in self.dependencies.pop(source, ()):
+                dependents = self.dependents.get(target)
+                if dependents is not None:
+                    dependents.pop(source, None)
+                    if not dependents:
+                        del self.dependents[target]
+
+        for target in symbols.targets:
+            by_file = self._sites.get(target)
+            if by_file is not None:
+                by_file.pop(path, None)
+                if not by_file:
+                    del self._sites[target]
+
+    def get_symbol_at(self, path, line):
+        """Get the address of the block defined around a line of a file"""
+        for start, end, address in self.get_file_symbols(path):
+            if start > line:
+                break
+            if line <= end:
+                return address
+        return None
+
+    def find_references(self, path):
+        """Get (file, line, column, source, path) of the references to a path
+
+        A block address like module.network matches every reference into it;
+        a longer path like module.network.vpc_id only matches that output.
+        """
+        address = get_base_address(path)
+        with self._lock:
+            by_file = dict(self._sites.get(address) or {})
+        references = []
+        for file_path, sites in by_file.items():
+            for ref_path, source, line, column in sites:
+                if (
+                    path == address
+                    or ref_path == path
+                    or ref_path.startswith(path + ".")
+                ):
+                    references.append((file_path, line, column, source, ref_path))
+        return sorted(references)
+
+    def get_definition(self, address):
+        """Get (file, line) of the definition of a block, or None"""
+        with self._lock:
+            return self.blocks.get(address)
+
+    def get_dependents(self, address):
+        """Get the blocks that reference a block"""
+        with self._lock:
+            dependents = list(self.dependents.get(address) or ())
+        return sorted(dependents)
+
+    def get_dependencies(self, address):
+        """Get the blocks of the root module a block references"""
+        with self._lock:
+            targets = self.dependencies.get(address) or ()
+            dependencies = [target for target in targets if target in self.blocks]
+        return sorted(dependencies)
+
+    def count_dependents(self, address):
+        """Get the number of blocks that reference a block"""
+        with self._lock:
+            return len(self.dependents.get(address) or ())
+
+    def count_references(self, address):
+        """Get the number of references to a block from other blocks"""
+        with self._lock:
+            return sum((self.dependents.get(address) or {}).values())
+
+    def get_module_calls(self):
+        """Get (file, line, name, source, version) of the module calls"""
+        with self._lock:
+            files = list(self._files.items())
+        return [(path, *call) for path, symbols in files for call in symbols.modules]
+
+    def get_required_providers(self):
+        """Get (file, line, name, source, version) of the required providers"""
+        with self._lock:
+            files = list(self._files.items())
+        return [
+            (path, *provider)
+            for path, symbols in files
+            for provider in symbols.providers
+        ]
+
+    def get_file_symbols(self, path):
+        """Get (line, end line, address) of the blocks of a file, by line
+
+        Symbols of a file are replaced, never changed, when it is indexed
+        again, so the list can be read without the lock.
+        """
+        with self._lock:
+            symbols = self._files.get(path)
+        return symbols.blocks if symbols is not None else []
+
+
+# Reference graphs by root module path
+_graphs = {}
+_graphs_lock = threading.Lock()
+
+
+def get_reference_graph(root_path, refresh=True):
+    """Get the reference graph of a root module, indexing changed files"""
+    with _graphs_lock:
+        graph = _graphs.get(root_path)
+        if graph is None:
+            graph = _graphs[root_path] = TerraformReferenceGraph(root_path)
+    if refresh:
+        with span("references.refresh", root=root_path):
+            graph.refresh()
+    return graph
+
+
+def get_indexed_graph(root_path):
+    """Get the reference graph of a root module if it was built"""
+    return _graphs.get(root_path)
+
+
+def close_reference_graphs():
+    """Forget every reference graph"""
+    with _graphs_lock:
+        _graphs.clear()
+
+
+def is_terraform_view(view):
+    """Check if a view shows a .tf file"""
+    file_name = view.file_name() if view else None
+    return bool(file_name and file_name.endswith(".tf"))
+
+
+class TerraformReferenceListener(sublime_plugin.EventListener):
+    """Keep built reference graphs up to date as files are edited"""
+
+    def on_modified_async(self, view):
+        if not is_terraform_view(view):
+            return
+        change_count = view.change_count()
+        sublime.set_timeout_async(
+            lambda: self.update_view(view, change_count), UPDATE_DELAY
+        )
+
+    def on_post_save_async(self, view):
+        if is_terraform_view(view):
+            self.update_view(view)
+
+    def update_view(self, view, change_count=None):
+        """Index the content of a view if its root module has a graph"""
+        if change_count is not None and view.change_count() != change_count:
+            return
+        project = TerraformProjectDetector.detect_project(view)
+        graph = get_indexed_graph(project.root_path) if project else None
+        if graph is None:
+            return
+        if view.is_dirty():
+            content = view.substr(sublime.Region(0, view.size()))
+            graph.update_file(view.file_name(), content)
+        else:
+            graph.update_file(view.file_name())
+        view.run_command("terraform_update_reference_counts")
+
+
+class TerraformReferenceCommand:
+    """Mixin for a text command answering from the reference graph
+
+    class TerraformFindReferencesCommand(TerraformReferenceCommand, TextCommand):
+        def answer(self, graph, symbol): ...
+
+    Building the graph of a large root module takes a while, so commands
+    answer from the async thread.
+    """
+
+    def run(self, edit):
+        point = self.view.sel()[0].begin()
+        sublime.set_timeout_async(lambda: self.run_async(point))
+
+    def run_async(self, point):
+        """Find the symbol at point and answer for it"""
+        project = TerraformProjectDetector.detect_project(self.view)
+        if not project:
+            return
+        if get_indexed_graph(project.root_path) is None:
+            sublime.status_message(f"Indexing references of {project.name}...")
+
+        graph = get_reference_graph(project.root_path)
+        if self.view.is_dirty():
+            content = self.view.substr(sublime.Region(0, self.view.size()))
+            graph.update_file(self.view.file_name(), content)
+
+        symbol = self.get_symbol(graph, point)
+        if not symbol:
+            sublime.status_message("No Terraform block under the cursor")
+            return
+        self.answer(graph, symbol)
+
+    def get_symbol(self, graph, point):
+        """Get the reference path at point, or the enclosing block"""
+        line_region = self.view.line(point)
+        column = point - line_region.begin()
+        for match in REFERENCE.finditer(self.view.substr(line_region)):
+            if match.start() <= column <= match.end():
+                for path, _ in _reference_paths(match):
+                    return path
+
+        row = self.view.rowcol(point)[0]
+        return graph.get_symbol_at(self.view.file_name(), row + 1)
+
+    def show_locations(self, items, locations, placeholder):
+        """Show locations in a quick panel, previewing the selected one"""
+        window = self.view.window()
+
+        def open_location(index, flags=0):
+            if index >= 0:
+                file_path, line, column = locations[index]
+                window.open_file(
+                    f"{file_path}:{line}:{column}", sublime.ENCODED_POSITION | flags
+                )
+
+        window.show_quick_panel(
+            items,
+            open_location,
+            on_highlight=lambda index: open_location(index, sublime.TRANSIENT),
+            placeholder=placeholder,
+        )
+
+    def show_blocks(self, graph, addresses, placeholder):
+        """Show block definitions in a quick panel"""
+        locations = []
+        items = []
+        for address in addresses:
+            definition = graph.get_definition(address)
+            if definition is None:
+                continue
+            file_path, line = definition
+            locations.append((file_path, line, 1))
+            items.append([address, f"{os.path.basename(file_path)}:{line}"])
+        self.show_locations(items, locations, placeholder)
+
+    def is_enabled(self):
+        return is_terraform_view(self.view)
+
+
+class TerraformFindReferencesCommand(
+    TerraformReferenceCommand, sublime_plugin.TextCommand
+):
+    """Find the references to the block or output under the cursor"""
+
+    def answer(self, graph, symbol):
+        references = graph.find_references(symbol)
+        if not references:
+            sublime.status_message(f"No references to {symbol}")
+            return
+
+        items = [
+            [f"{source}: {path}", f"{os.path.basename(file_path)}:{line}"]
+            for file_path, line, _, source, path in references
+        ]
+        locations = [
+            (file_path, line, column) for file_path, line, column, *_ in references
+        ]
+        self.show_locations(
+            items, locations, f"{len(references)} references to {symbol}"
+        )
+
+
+class TerraformShowDependentsCommand(
+    TerraformReferenceCommand, sublime_plugin.TextCommand
+):
+    """Show the blocks that reference the block under the cursor"""
+
+    def answer(self, graph, symbol):
+        address = get_base_address(symbol)
+        dependents = [
+            a for a in graph.get_dependents(address) if graph.get_definition(a)
+        ]
+        if not dependents:
+            sublime.status_message(f"Nothing depends on {address}")
+            return
+        self.show_blocks(graph, dependents, f"Blocks depending on {address}")
+
+
+class TerraformShowDependenciesCommand(
+    TerraformReferenceCommand, sublime_plugin.TextCommand
+):
+    """Show the blocks the block under the cursor references"""
+
+    def answer(self, graph, symbol):
+        address = get_base_address(symbol)
+        dependencies = graph.get_dependencies(address)
+        if not dependencies:
+            sublime.status_message(f"{address} references no other blocks")
+            return
+        self.show_blocks(graph, dependencies, f"Blocks {address} depends on")
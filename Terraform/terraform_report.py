@@ -0,0 +1,310 @@
+"""
+Workspace report of module and provider usage
+Lists every module source and provider of a window's root modules with
+their call sites and versions, read from the reference graphs and lock files
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import sublime
+import sublime_plugin
+
+from .terraform_lockfile import get_lock_file_cache
+from .terraform_modules import is_local_source
+from .terraform_perf import span
+from .terraform_project import LOCK_FILE, TerraformProjectDetector
+from .terraform_references import get_reference_graph
+
+# Threads indexing root modules for a report
+REPORT_WORKERS = 8
+
+# Orders a report can be sorted in, with their quick panel captions
+SORT_ORDERS = (
+    ("source", "Sort by source"),
+    ("calls", "Sort by number of call sites"),
+    ("drift", "Sort by number of versions"),
+)
+
+# Call sites in the report, for double-click navigation
+RESULT_FILE_REGEX = r"^\s+(\S.*?):(\d+) "
+
+
+def get_base_dir(folders):
+    """Get the directory report paths are relative to
+
+    Folders on different Windows drives have no common path, paths are then
+    relative to the first folder.
+    """
+    try:
+        return os.path.commonpath(folders)
+    except ValueError:
+        return folders[0]
+
+
+def get_report_path(path, base_dir):
+    """Get the path shown for a file, absolute if it's on another drive"""
+    try:
+        return os.path.relpath(path, base_dir)
+    except ValueError:
+        return path
+
+
+def split_source_ref(source):
+    """Split a module source into (source, ref) for git sources like ?ref=v1"""
+    base, separator, query = source.partition("?")
+    if separator:
+        for parameter in query.split("&"):
+            key, _, value = parameter.partition("=")
+            if key == "ref":
+                return base, value
+    return source, None
+
+
+class TerraformUsage:
+    """Call sites of one module source or provider, grouped by version"""
+
+    __slots__ = ("source", "versions")
+
+    def __init__(self, source):
+        self.source = source
+        # version -> [(file, line, name)]
+        self.versions = {}
+
+    def add(self, version, path, line, name):
+        """Record a call site"""
+        self.versions.setdefault(version, []).append((path, line, name))
+
+    @property
+    def calls(self):
+        return sum(len(sites) for sites in self.versions.values())
+
+    @property
+    def roots(self):
+        """Number of directories the calls are in"""
+        return len(
+            {
+                os.path.dirname(path)
+                for sites in self.versions.values()
+                for path, _, _ in sites
+            }
+        )
+
+
+def index_roots(root_paths, workers=REPORT_WORKERS):
+    """Get the reference graphs of root modules, indexing them in parallel
+
+    Graphs that were built before only index their changed files.
+    """
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="terraform-report"
+    ) as executor:
+        return list(executor.map(get_reference_graph, root_paths))
+
+
+def collect_usage(graphs):
+    """Get (module usages, provider usages) of reference graphs, by source"""
+    modules = {}
+    providers = {}
+    for graph in graphs:
+        for path, line, name, source, version in graph.get_module_calls():
+            if not source:
+                continue
+            if version is None:
+                source, version = split_source_ref(source)
+            if version is None and is_local_source(source):
+                version = "local"
+            usage = modules.get(source)
+            if usage is None:
+                usage = modules[source] = TerraformUsage(source)
+            usage.add(version, path, line, f"module.{name}")
+
+        for path, line, name, source, version in graph.get_required_providers():
+            source = source or f"hashicorp/{name}"
+            usage = providers.get(source)
+            if usage is None:
+                usage = providers[source] = TerraformUsage(source)
+            usage.add(version, path, line, name)
+    return modules, providers
+
+
+def sort_usages(usages, order):
+    """Sort usages by source, by number of calls or by number of versions"""
+    usages = sorted(usages.values(), key=lambda usage: usage.source)
+    if order == "calls":
+        usages.sort(key=lambda usage: -usage.calls)
+    elif order == "drift":
+        usages.sort(key=lambda usage: (-len(usage.versions), -usage.calls))
+    return usages
+
+
+def read_lock_files(root_paths, workers=REPORT_WORKERS):
+    """Get (root path, locked providers) of root modules, read in parallel
+
+    Lock files that didn't change since they were last read are not parsed
+    again.
+    """
+    cache = get_lock_file_cache()
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="terraform-report"
+    ) as executor:
+        return list(zip(root_paths, executor.map(cache.get_providers, root_paths)))
+
+
+def collect_locked_providers(lock_files):
+    """Get the usages of the locked providers of lock files, by source"""
+    providers = {}
+    for root_path, locked in lock_files:
+        path = os.path.join(root_path, LOCK_FILE)
+        for provider in (locked or {}).values():
+            usage = providers.get(provider.source)
+            if usage is None:
+                usage = providers[provider.source] = TerraformUsage(provider.source)
+            constraints = provider.constraints or "no constraints"
+            usage.add(
+                provider.version,
+                path,
+                provider.line,
+                f"{constraints}, {len(provider.hashes)} hashes",
+            )
+    return providers
+
+
+def format_usages(title, usages, base_dir, unpinned, noun="call"):
+    """Format usages grouped by source and version"""
+    lines = [title, "=" * len(title), ""]
+    if not usages:
+        lines += ["None found", ""]
+    for usage in usages:
+        versions = len(usage.versions)
+        lines.append(
+            f"{usage.source}: {versions} version{'s' if versions != 1 else ''}, "
+            f"{usage.calls} {noun}{'s' if usage.calls != 1 else ''} "
+            f"in {usage.roots} root{'s' if usage.roots != 1 else ''}"
+        )
+        for version, sites in sorted(
+            usage.versions.items(), key=lambda item: (-len(item[1]), item[0] or "")
+        ):
+            lines.append(f"  {version or unpinned}: {len(sites)}")
+            for path, line, name in sorted(sites):
+                lines.append(f"    {get_report_path(path, base_dir)}:{line} {name}")
+        lines.append("")
+    return lines
+
+
+def format_report(modules, providers, order, base_dir, root_count, locked=None):
+    """Format the module and provider report"""
+    calls = sum(usage.calls for usage in modules.values())
+    lines = [
+        f"Terraform workspace report: {len(modules)} module sources, {calls} "
+        f"module calls and {len(providers)} providers in {root_count} root "
+        "modules",
+        "",
+    ]
+    lines += format_usages(
+        "Modules", sort_usages(modules, order), base_dir, "(no version)"
+    )
+    lines += format_usages(
+        "Provider constraints",
+        sort_usages(providers, order),
+        base_dir,
+        "(no constraint)",
+    )
+    if locked is not None:
+        lines += format_usages(
+            "Locked providers",
+            sort_usages(locked, order),
+            base_dir,
+            "(no version)",
+            "lock file",
+        )
+    return "\n".join(lines)
+
+
+def format_inventory(locked, order, base_dir, root_count):
+    """Format the provider versions locked across root modules"""
+    lock_files = len(
+        {
+            path
+            for usage in locked.values()
+            for sites in usage.versions.values()
+            for path, _, _ in sites
+        }
+    )
+    lines = [
+        f"Terraform provider inventory: {len(locked)} providers in {lock_files} "
+        f"lock files of {root_count} root modules",
+        "",
+    ]
+    lines += format_usages(
+        "Locked providers",
+        sort_usages(locked, order),
+        base_dir,
+        "(no version)",
+        "lock file",
+    )
+    return "\n".join(lines)
+
+
+class TerraformModuleReportCommand(sublime_plugin.WindowCommand):
+    """Report module and provider versions across the window's root modules"""
+
+    # Name of the view showing the report
+    report_name = "Terraform Workspace Report"
+
+    def run(self, sort=None):
+        if sort is None:
+            self.window.show_quick_panel(
+                [caption for _, caption in SORT_ORDERS],
+                self.on_select,
+                placeholder=self.report_name,
+            )
+            return
+        sublime.set_timeout_async(lambda: self.build_report(sort))
+
+    def on_select(self, index):
+        """Build the report in the chosen order"""
+        if index >= 0:
+            self.run(SORT_ORDERS[index][0])
+
+    def build_report(self, sort):
+        """Index the root modules and show the report"""
+        folders = self.window.folders()
+        if not folders:
+            sublime.status_message("No folders open")
+            return
+        if not TerraformProjectDetector.has_refreshed(folders):
+            TerraformProjectDetector.refresh_projects(self.window)
+        roots, _ = TerraformProjectDetector.get_indexing_scope(folders)
+
+        sublime.status_message(f"Indexing {len(roots)} root modules...")
+        with span("report.build", roots=len(roots)):
+            base_dir = get_base_dir(folders)
+            text = self.make_report(roots, sort, base_dir)
+        sublime.set_timeout(lambda: self.show_report(text, base_dir))
+
+    def make_report(self, roots, sort, base_dir):
+        """Collect and format the report of root modules"""
+        modules, providers = collect_usage(index_roots(roots))
+        locked = collect_locked_providers(read_lock_files(roots))
+        return format_report(modules, providers, sort, base_dir, len(roots), locked)
+
+    def show_report(self, text, base_dir):
+        """Show the report in a new scratch view"""
+        view = self.window.new_file()
+        view.set_name(self.report_name)
+        view.set_scratch(True)
+        view.settings().set("result_file_regex", RESULT_FILE_REGEX)
+        view.settings().set("result_base_dir", base_dir)
+        view.run_command("append", {"characters": text, "force": True})
+        view.set_read_only(True)
+
+
+class TerraformProviderInventoryCommand(TerraformModuleReportCommand):
+    """List the provider versions locked by the window's root modules"""
+
+    report_name = "Terraform Provider Inventory"
+
+    def make_report(self, roots, sort, base_dir):
+        locked = collect_locked_providers(read_lock_files(roots))
+        return format_inventory(locked, sort, base_dir, len(roots))
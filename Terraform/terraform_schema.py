@@ -0,0 +1,585 @@
+"""
+Provider schema cache
+Keeps a compact copy of `terraform providers schema -json` on disk, shared by
+every root module that locks the same provider versions
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import sublime
+import sublime_plugin
+
+from .terraform_perf import span
+from .terraform_project import LOCK_FILE, TerraformProjectDetector
+from .terraform_settings import get_settings_snapshot
+
+# Version of the compact format, bumped when it changes
+SCHEMA_FORMAT = 1
+
+# Index of the providers stored in a schema directory
+INDEX_FILE = "index.json"
+
+# Characters of terraform's output read at a time while splitting it
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Whitespace between JSON tokens
+JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Characters that can follow a JSON value
+JSON_DELIMITERS = frozenset(",:]} \t\n\r")
+
+
+def format_type(type_spec):
+    """Format a cty type from the JSON schema the way Terraform writes it"""
+    if isinstance(type_spec, str):
+        return "any" if type_spec == "dynamic" else type_spec
+    if not isinstance(type_spec, list) or len(type_spec) != 2:
+        return "any"
+
+    kind, inner = type_spec
+    if kind == "object":
+        fields = ", ".join(f"{k} = {format_type(v)}" for k, v in inner.items())
+        return f"object({{{fields}}})"
+    if kind == "tuple":
+        return f"tuple([{', '.join(format_type(v) for v in inner)}])"
+    return f"{kind}({format_type(inner)})"
+
+
+def compact_attribute(attribute):
+    """Keep what completions and hover need from an attribute schema"""
+    if "nested_type" in attribute:
+        nested = attribute["nested_type"]
+        compact = {
+            "type": f"{nested.get('nesting_mode', 'single')}(object)",
+            "nested": compact_block(nested),
+        }
+    else:
+        compact = {"type": format_type(attribute.get("type", "dynamic"))}
+
+    for flag in ("required", "optional", "computed", "sensitive", "deprecated"):
+        if attribute.get(flag):
+            compact[flag] = True
+    if attribute.get("description"):
+        compact["description"] = attribute["description"]
+    return compact
+
+
+def compact_block(block):
+    """Keep what completions and hover need from a block schema
+
+    Description kinds, versions and empty values are dropped, and attribute
+    types are stored as strings like "list(string)".
+    """
+    compact = {}
+    attributes = block.get("attributes") or {}
+    if attributes:
+        compact["attributes"] = {
+            name: compact_attribute(attribute) for name, attribute in attributes.items()
+        }
+
+    blocks = {}
+    for name, block_type in (block.get("block_types") or {}).items():
+        nested = {"nesting": block_type.get("nesting_mode", "single")}
+        for key in ("min_items", "max_items"):
+            if block_type.get(key):
+                nested[key] = block_type[key]
+        nested["block"] = compact_block(block_type.get("block") or {})
+        blocks[name] = nested
+    if blocks:
+        compact["blocks"] = blocks
+
+    if block.get("description"):
+        compact["description"] = block["description"]
+    if block.get("deprecated"):
+        compact["deprecated"] = True
+    return compact
+
+
+def compact_provider(schema):
+    """Compact the schema of one provider"""
+    return {
+        "provider": compact_block((schema.get("provider") or {}).get("block") or {}),
+        "resources": {
+            name: compact_block(resource.get("block") or {})
+            for name, resource in (schema.get("resource_schemas") or {}).items()
+        },
+        "data_sources": {
+            name: compact_block(data_source.get("block") or {})
+            for name, data_source in (schema.get("data_source_schemas") or {}).items()
+        },
+    }
+
+
+class TerraformJSONReader:
+    """Reads a large JSON document from a file one value at a time
+
+    Objects can be walked key by key, so only the value being decoded and
+    the unread rest of the last chunk are held in memory.
+    """
+
+    def __init__(self, f, chunk_size=READ_CHUNK_SIZE):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+
+    def _read(self, size):
+        """Read more of the file into the buffer, returning False at its end"""
+        chunk = self._file.read(size)
+        if not chunk:
+            return False
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and get the next character, or "" at the end"""
+        while True:
+            self._pos = JSON_WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read(self._chunk_size):
+                return ""
+
+    def _expect(self, characters):
+        """Consume the next character, which must be one of characters"""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"expected one of {characters!r}, got {character!r}")
+        self._pos += 1
+        return character
+
+    def decode(self):
+        """Decode the next value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                value, end = None, None
+            # Numbers and literals are only complete once followed by a
+            # delimiter, they may go on in the next chunk
+            complete = end is not None and (
+                isinstance(value, (dict, list, str))
+                or self._buffer[end : end + 1] in JSON_DELIMITERS
+            )
+            if complete:
+                self._pos = end
+                return value
+            # Read as much again as is buffered, so a large value is not
+            # decoded from the start once per chunk
+            size = max(self._chunk_size, len(self._buffer) - self._pos)
+            if not self._read(size):
+                if end is None:
+                    raise ValueError("truncated JSON document")
+                self._pos = end
+                return value
+
+    def iter_keys(self):
+        """Iterate the keys of the object at the current position
+
+        The value of every key must be read with decode() or iter_keys()
+        before asking for the next key.
+        """
+        self._expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.decode()
+            if not isinstance(key, str):
+                raise ValueError("expected an object key")
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+
+def read_raw_provider(reader):
+    """Decode the raw schema of a provider, one resource at a time"""
+    provider = {}
+    for key in reader.iter_keys():
+        if key.endswith("_schemas") and reader.peek() == "{":
+            provider[key] = {name: reader.decode() for name in reader.iter_keys()}
+        else:
+            provider[key] = reader.decode()
+    return provider
+
+
+def iter_raw_providers(f, chunk_size=READ_CHUNK_SIZE):
+    """Yield (address, raw schema) of terraform providers schema -json output
+
+    Providers are decoded one at a time, the whole output is never in memory.
+    """
+    reader = TerraformJSONReader(f, chunk_size)
+    for key in reader.iter_keys():
+        if key == "provider_schemas":
+            for address in reader.iter_keys():
+                yield address, read_raw_provider(reader)
+        else:
+            reader.decode()
+
+
+def get_provider_file(address):
+    """Get the file name a provider's schema is stored under"""
+    return re.sub(r"[^\w.-]", "_", address) + ".json"
+
+
+class TerraformProviderSchemas:
+    """The provider schemas of one lock file
+
+    The index of resource and data source types is loaded up front; the
+    schema of each provider is read from disk the first time it is needed.
+    """
+
+    def __init__(self, cache, lock_hash, providers):
+        self.lock_hash = lock_hash
+        self.providers = providers
+        self._cache = cache
+        self.resource_types = {}
+        self.data_source_types = {}
+        for address, entry in providers.items():
+            for name in entry.get("resources", ()):
+                self.resource_types[name] = address
+            for name in entry.get("data_sources", ()):
+                self.data_source_types[name] = address
+
+    def find_provider(self, name):
+        """Get the address of a provider from its local name, like "aws" """
+        for address in self.providers:
+            if address.rpartition("/")[2] == name:
+                return address
+        return None
+
+    def get_provider(self, address, load=True):
+        """Get the compact schema of a provider, or None
+
+        Without load, only a schema already in memory is returned.
+        """
+        if address not in self.providers:
+            return None
+        return self._cache.load_provider(self, address, load)
+
+    def get_resource(self, resource_type, load=True):
+        """Get the block schema of a resource type, or None"""
+        address = self.resource_types.get(resource_type)
+        provider = self.get_provider(address, load) if address else None
+        return provider["resources"].get(resource_type) if provider else None
+
+    def get_data_source(self, data_source_type, load=True):
+        """Get the block schema of a data source type, or None"""
+        address = self.data_source_types.get(data_source_type)
+        provider = self.get_provider(address, load) if address else None
+        return provider["data_sources"].get(data_source_type) if provider else None
+
+
+class TerraformSchemaCache:
+    """On-disk cache of provider schemas keyed by the lock file's hash
+
+    Root modules that lock identical provider versions share one copy, so
+    terraform only runs again for a lock file it has not seen. Generating
+    runs on a single background thread; until it finishes, lookups return
+    None.
+    """
+
+    # Provider schemas kept in memory before the least recently used is dropped
+    MAX_LOADED_PROVIDERS = 8
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.path.join(
+            sublime.cache_path(), "Terraform", "schemas", f"v{SCHEMA_FORMAT}"
+        )
+        self._schemas = {}
+        self._providers = OrderedDict()
+        self._lock_hashes = {}
+        self._generating = set()
+        self._failed = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get_lock_hash(self, root_path):
+        """Get the hash of a root module's lock file, or None without one"""
+        import hashlib
+
+        path = os.path.join(root_path, LOCK_FILE)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._lock_hashes.pop(root_path, None)
+            return None
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._lock_hashes.get(root_path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        try:
+            with open(path, "rb") as f:
+                lock_hash = hashlib.sha256(f.read()).hexdigest()[:20]
+        except (IOError, OSError):
+            return None
+        self._lock_hashes[root_path] = (key, lock_hash)
+        return lock_hash
+
+    def get_schema_dir(self, lock_hash):
+        """Get the directory the schemas of a lock file are stored in"""
+        return os.path.join(self.cache_dir, lock_hash)
+
+    def get_schemas(self, root_path, generate=True):
+        """Get the provider schemas of a root module
+
+        Returns None until they are cached; with generate, a missing cache is
+        filled in the background when the root module is initialized.
+        """
+        lock_hash = self.get_lock_hash(root_path)
+        if lock_hash is None:
+            return None
+
+        schemas = self._schemas.get(lock_hash)
+        if schemas is None:
+            schemas = self._load_index(lock_hash)
+        if schemas is None and generate:
+            self.generate_async(root_path, lock_hash)
+        return schemas
+
+    def _load_index(self, lock_hash):
+        """Load the index of a cached schema directory"""
+        path = os.path.join(self.get_schema_dir(lock_hash), INDEX_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                providers = json.load(f)["providers"]
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return None
+
+        schemas = TerraformProviderSchemas(self, lock_hash, providers)
+        self._schemas[lock_hash] = schemas
+        return schemas
+
+    def load_provider(self, schemas, address, load=True):
+        """Get the schema of a provider, reading it from disk on first use"""
+        key = (schemas.lock_hash, address)
+        with self._lock:
+            provider = self._providers.get(key)
+            if provider is not None:
+                self._providers.move_to_end(key)
+                return provider
+        if not load:
+            return None
+
+        path = os.path.join(
+            self.get_schema_dir(schemas.lock_hash),
+            schemas.providers[address]["file"],
+        )
+        with span("schema.load_provider", provider=address) as timing:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    content = f.read()
+                timing.add_bytes(len(content))
+                provider = json.loads(content)
+            except (IOError, OSError, ValueError):
+                return None
+
+        with self._lock:
+            self._providers[key] = provider
+            while len(self._providers) > self.MAX_LOADED_PROVIDERS:
+                self._providers.popitem(last=False)
+        return provider
+
+    def generate_async(self, root_path, lock_hash=None):
+        """Generate the schemas of a root module in the background"""
+        lock_hash = lock_hash or self.get_lock_hash(root_path)
+        if lock_hash is None or lock_hash in self._failed:
+            return
+        # terraform needs the providers installed by terraform init
+        if not os.path.isdir(os.path.join(root_path, ".terraform")):
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with self._lock:
+            if lock_hash in self._generating:
+                return
+            self._generating.add(lock_hash)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="terraform-schema"
+                )
+            executor = self._executor
+
+        def run():
+            try:
+                self.generate(root_path, lock_hash)
+            finally:
+                with self._lock:
+                    self._generating.discard(lock_hash)
+
+        executor.submit(run)
+
+    def generate(self, root_path, lock_hash):
+        """Run terraform and cache the compacted schemas, returning them"""
+        import shutil
+        import subprocess
+        import tempfile
+
+        settings = get_settings_snapshot()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=f".{lock_hash}-", dir=self.cache_dir)
+        try:
+            with span("schema.generate", root=root_path) as timing:
+                raw_path = os.path.join(tmp_dir, "schema.raw.json")
+                self._run_terraform(settings, root_path, raw_path)
+                timing.add_bytes(os.path.getsize(raw_path))
+                providers = self._write_providers(raw_path, tmp_dir)
+
+            schema_dir = self.get_schema_dir(lock_hash)
+            try:
+                os.replace(tmp_dir, schema_dir)
+            except OSError:
+                # Another window generated the same lock file's schemas first
+                if not os.path.isdir(schema_dir):
+                    raise
+        except (IOError, OSError, ValueError, subprocess.SubprocessError) as e:
+            self._failed[lock_hash] = str(e)
+            print(f"Terraform: failed to read provider schemas in {root_path}: {e}")
+            return None
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        sublime.status_message(f"Cached schemas of {len(providers)} provider(s)")
+        return self._load_index(lock_hash)
+
+    def _run_terraform(self, settings, root_path, output_path):
+        """Write the output of terraform providers schema -json to a file"""
+        import subprocess
+
+        env = os.environ.copy()
+        env["TF_IN_AUTOMATION"] = "1"
+
+        # The output can be hundreds of MB, so it goes straight to disk
+        # rather than through a pipe into memory
+        with open(output_path, "wb") as output:
+            result = subprocess.run(
+                [settings.terraform_path, "providers", "schema", "-json"],
+                cwd=root_path,
+                stdout=output,
+                stderr=subprocess.PIPE,
+                env=env,
+                timeout=settings.get("provider_schema.timeout", 300),
+            )
+        if result.returncode != 0:
+            error = result.stderr.decode("utf-8", "replace").strip()
+            raise subprocess.SubprocessError(error or f"exit code {result.returncode}")
+
+    def _write_providers(self, raw_path, schema_dir):
+        """Split the raw schemas into one compact file per provider"""
+        providers = {}
+        with open(raw_path, "r", encoding="utf-8") as raw:
+            for address, raw_provider in iter_raw_providers(raw):
+                compact = compact_provider(raw_provider)
+                file_name = get_provider_file(address)
+                path = os.path.join(schema_dir, file_name)
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(compact, f, separators=(",", ":"))
+                providers[address] = {
+                    "file": file_name,
+                    "resources": sorted(compact["resources"]),
+                    "data_sources": sorted(compact["data_sources"]),
+                }
+        os.remove(raw_path)
+
+        with open(os.path.join(schema_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {"format": SCHEMA_FORMAT, "providers": providers},
+                f,
+                separators=(",", ":"),
+            )
+        return providers
+
+    def invalidate(self, root_path):
+        """Forget a root module's cached schemas so they are generated again"""
+        import shutil
+
+        lock_hash = self.get_lock_hash(root_path)
+        if lock_hash is None:
+            return None
+
+        with self._lock:
+            self._schemas.pop(lock_hash, None)
+            self._failed.pop(lock_hash, None)
+            for key in [key for key in self._providers if key[0] == lock_hash]:
+                del self._providers[key]
+        shutil.rmtree(self.get_schema_dir(lock_hash), ignore_errors=True)
+        return lock_hash
+
+    def get_error(self, root_path):
+        """Get why generating a root module's schemas failed, if it did"""
+        lock_hash = self.get_lock_hash(root_path)
+        return self._failed.get(lock_hash) if lock_hash else None
+
+    def close(self):
+        """Stop generating schemas"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False)
+
+
+# Global cache instance
+_schema_cache = None
+_schema_cache_lock = threading.Lock()
+
+
+def get_schema_cache():
+    """Get the shared provider schema cache"""
+    global _schema_cache
+    with _schema_cache_lock:
+        if _schema_cache is None:
+            _schema_cache = TerraformSchemaCache()
+        return _schema_cache
+
+
+def close_schema_cache():
+    """Release the shared provider schema cache"""
+    global _schema_cache
+    with _schema_cache_lock:
+        cache, _schema_cache = _schema_cache, None
+
+    if cache:
+        cache.close()
+
+
+def get_provider_schemas(root_path):
+    """Get the provider schemas of a root module if enabled and cached"""
+    if not get_settings_snapshot().get("provider_schema.enabled", True):
+        return None
+    return get_schema_cache().get_schemas(root_path)
+
+
+class TerraformRefreshProviderSchemaCommand(sublime_plugin.WindowCommand):
+    """Read the provider schemas of the current root module again"""
+
+    def run(self):
+        project = TerraformProjectDetector.detect_project(self.window.active_view())
+        if not project:
+            sublime.status_message("No Terraform project detected")
+            return
+
+        cache = get_schema_cache()
+        lock_hash = cache.invalidate(project.root_path)
+        if lock_hash is None:
+            sublime.status_message(f"No {LOCK_FILE} in {project.name}, run init first")
+            return
+        if not project.is_initialized():
+            sublime.status_message(f"{project.name} is not initialized, run init first")
+            return
+
+        sublime.status_message(f"Reading provider schemas of {project.name}...")
+        cache.generate_async(project.root_path, lock_hash)
+
+    def is_enabled(self):
+        return bool(get_settings_snapshot().get("provider_schema.enabled", True))
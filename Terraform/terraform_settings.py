@@ -2,10 +2,15 @@
 Settings management for Terraform plugin
 """
 
+import copy
 import os
+import threading
+from types import MappingProxyType
 
 import sublime
 
+from .terraform_path_filter import TerraformPathFilter
+
 
 class TerraformSettings:
     """Manages Terraform plugin settings"""
@@ -21,15 +26,29 @@ class TerraformSettings:
         self.settings = sublime.load_settings(self.SETTINGS_FILE)
 
     def get(self, key, default=None):
-        """Get a setting value"""
-        if self.settings:
-            return self.settings.get(key, default)
-        return default
+        """Get a setting value, nested ones by a dotted key like language_server.path"""
+        if not self.settings:
+            return default
+
+        name, _, path = key.partition(".")
+        value = self.settings.get(name)
+        if value is None:
+            return default
+        return resolve_setting(value, path, default) if path else value
 
     def set(self, key, value):
-        """Set a setting value"""
+        """Set a setting value, nested ones by a dotted key"""
         if self.settings:
-            self.settings.set(key, value)
+            name, *path = key.split(".")
+            if path:
+                root = copy.deepcopy(self.settings.get(name) or {})
+                parent = root
+                for part in path[:-1]:
+                    parent = parent.setdefault(part, {})
+                parent[path[-1]] = value
+                value = root
+
+            self.settings.set(name, value)
             sublime.save_settings(self.SETTINGS_FILE)
 
     def add_on_change(self, key, callback):
@@ -55,6 +74,110 @@ def get_settings():
     return _settings
 
 
+def resolve_setting(value, path, default=None):
+    """Get the value at a dotted path like "cache.ttl" inside a settings dict"""
+    for part in path.split("."):
+        if not hasattr(value, "get") or part not in value:
+            return default
+        value = value[part]
+    return value
+
+
+def freeze_setting(value):
+    """Make a read-only copy of a settings value"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze_setting(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze_setting(v) for v in value)
+    return value
+
+
+class TerraformSettingsSnapshot:
+    """Read-only copy of the plugin settings
+
+    Built once per settings change so hot paths, like walking every directory
+    of a monorepo, read plain attributes instead of the settings object.
+    """
+
+    __slots__ = (
+        "_values",
+        "terraform_path",
+        "format_on_save",
+        "root_modules",
+        "exclude_root_modules",
+        "ignore_directories",
+        "ignore_files",
+    )
+
+    def __init__(self, values):
+        set_field = super().__setattr__
+        set_field("_values", freeze_setting(values))
+        set_field("terraform_path", self.get("terraform_path") or "terraform")
+        set_field("format_on_save", bool(self.get("format_on_save", False)))
+        set_field("root_modules", tuple(self.get("root_modules") or ()))
+        set_field(
+            "exclude_root_modules",
+            TerraformPathFilter(self.get("exclude_root_modules") or (), anchored=False),
+        )
+        # Directory names only match directories
+        names = self.get("ignore_directory_names") or ()
+        set_field(
+            "ignore_directories",
+            TerraformPathFilter(
+                [name if name.endswith("/") else name + "/" for name in names],
+                anchored=False,
+            ),
+        )
+        set_field("ignore_files", tuple(self.get("ignore_files") or ()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("settings snapshots are read-only")
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Take a snapshot of the plugin settings"""
+        return cls(
+            {
+                key: settings.get(key, default)
+                for key, default in DEFAULT_SETTINGS.items()
+            }
+        )
+
+    def get(self, key, default=None):
+        """Get a setting value, nested ones by a dotted key like language_server.path"""
+        return resolve_setting(self._values, key, default)
+
+
+# Current snapshot, rebuilt when the settings change
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_settings_snapshot():
+    """Get a read-only snapshot of the current settings"""
+    global _snapshot
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                settings = get_settings()
+                settings.add_on_change("terraform_snapshot", rebuild_settings_snapshot)
+                _snapshot = TerraformSettingsSnapshot.from_settings(settings)
+    return _snapshot
+
+
+def rebuild_settings_snapshot():
+    """Replace the snapshot after the settings changed"""
+    global _snapshot
+    _snapshot = TerraformSettingsSnapshot.from_settings(get_settings())
+
+
+def unload_settings_snapshot():
+    """Stop following the settings and forget the snapshot"""
+    global _snapshot
+    get_settings().clear_on_change("terraform_snapshot")
+    _snapshot = None
+
+
 # Default settings content
 DEFAULT_SETTINGS = {
     "terraform_path": "terraform",
@@ -64,6 +187,7 @@ DEFAULT_SETTINGS = {
         "args": ["serve"],
         "log_file": "",
         "log_level": "info",
+        "trace": {"enabled": False, "log_size_mb": 5, "log_files": 3},
     },
     "format_on_save": True,
     "validate_on_save": False,
@@ -78,11 +202,26 @@ DEFAULT_SETTINGS = {
         "terraform.tfstate.d",
         ".terragrunt-cache",
     ],
+    "ignore_files": [".gitignore", ".terraformignore"],
     "terraform_cloud": {
         "organization": "",
+        "hostname": "app.terraform.io",
         "token": "",  # Store in secure storage instead
+        "connect_timeout": 10,
+        "read_timeout": 30,
+        "requests_per_second": 25,
+        "max_retries": 4,
+        "cache": {
+            "enabled": True,
+            "ttl": {"organizations": 3600, "workspaces": 300, "runs": 15},
+            "stale_ttl": 86400,
+            "max_entries": 1000,
+            "max_size_mb": 32,
+            "persist": False,
+        },
     },
-    "code_lens": {"reference_count": False},  # Can impact performance
+    "provider_schema": {"enabled": True, "timeout": 300},
+    "code_lens": {"reference_count": False},
     "module_explorer": {
         "show_providers": True,
         "show_modules": True,
@@ -91,12 +230,14 @@ DEFAULT_SETTINGS = {
     "completion": {
         "trigger_characters": [".", "[", "(", ",", " "],
         "complete_required_fields": True,
+        "latency_budget_ms": 10,
     },
     "diagnostics": {
         "enable_terraform_validate": True,
         "validate_on_open": False,
         "validate_on_change": True,
     },
+    "performance": {"enabled": False, "trace": False},
 }
 
 
@@ -0,0 +1,134 @@
+"""
+Measurement helpers for the performance tests
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Metrics compared against the baseline, besides timings (keys ending in _s)
+COUNT_METRICS = ("requests", "bytes", "connections")
+
+# Timings too noisy to compare; the median is compared instead
+NOISY_METRICS = ("min_s", "max_s")
+
+# Timing differences below this many seconds are never regressions
+MIN_TIME_DELTA = 0.005
+
+
+class BenchmarkRecorder:
+    """Collects the measurements of a benchmark run"""
+
+    def __init__(self):
+        self.results = {}
+
+    def record(self, name, **metrics):
+        """Record the metrics of a benchmark"""
+        self.results.setdefault(name, {}).update(metrics)
+
+    def report(self, stream=None):
+        """Print the recorded metrics as a table"""
+        stream = stream or sys.stdout
+        if not self.results:
+            return
+
+        width = max(len(name) for name in self.results)
+        stream.write("\nBenchmark results\n")
+        stream.write("=" * (width + 50) + "\n")
+        for name in sorted(self.results):
+            metrics = ", ".join(
+                f"{key}={format_metric(key, value)}"
+                for key, value in sorted(self.results[name].items())
+            )
+            stream.write(f"{name.ljust(width)}  {metrics}\n")
+
+    def save(self, path):
+        """Write the results and the environment they were measured in"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "results": self.results,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+
+    def compare(self, baseline, tolerance=0.2):
+        """Get the metrics that regressed by more than tolerance
+
+        Returns (name, metric, baseline value, current value) tuples.
+        """
+        regressions = []
+        for name, metrics in sorted(self.results.items()):
+            previous = baseline.get(name, {})
+            for key, value in sorted(metrics.items()):
+                old = previous.get(key)
+                if not isinstance(value, (int, float)) or not isinstance(
+                    old, (int, float)
+                ):
+                    continue
+                if key in NOISY_METRICS:
+                    continue
+                if key.endswith("_s"):
+                    regressed = (
+                        value > old * (1 + tolerance) and value - old > MIN_TIME_DELTA
+                    )
+                elif key in COUNT_METRICS:
+                    regressed = value > old * (1 + tolerance)
+                else:
+                    continue
+                if regressed:
+                    regressions.append((name, key, old, value))
+        return regressions
+
+
+def format_metric(key, value):
+    """Format a metric for display"""
+    if isinstance(value, float) and key.endswith("_s"):
+        return f"{value * 1000:.1f}ms"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def load_results(path):
+    """Read the results saved by BenchmarkRecorder.save()"""
+    with open(path, "r") as f:
+        return json.load(f).get("results", {})
+
+
+def measure(fn, repeat=5, warmup=1):
+    """Time fn() and return min/median/max seconds"""
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "max_s": max(timings),
+    }
+
+
+# Global recorder instance
+_recorder = BenchmarkRecorder()
+
+
+def get_recorder():
+    """Get the recorder shared by all benchmarks of a run"""
+    return _recorder
@@ -0,0 +1,471 @@
+"""
+Local stand-in for the Terraform Cloud API
+Serves the JSON:API endpoints used by the plugin from generated data
+"""
+
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RUN_STATUSES = (
+    "applied",
+    "planned_and_finished",
+    "errored",
+    "planning",
+    "applying",
+    "discarded",
+    "pending",
+    "policy_checked",
+)
+
+ENVIRONMENTS = ("default", "staging", "production")
+
+TAGS = (("network",), ("app", "prod"), (), ("app", "staging"), ("data",))
+
+ROUTES = (
+    ("organizations", re.compile(r"^/api/v2/organizations$")),
+    ("workspaces", re.compile(r"^/api/v2/organizations/([^/]+)/workspaces$")),
+    ("organization_runs", re.compile(r"^/api/v2/organizations/([^/]+)/runs$")),
+    ("workspace_runs", re.compile(r"^/api/v2/workspaces/([^/]+)/runs$")),
+    ("run", re.compile(r"^/api/v2/runs/([^/]+)$")),
+    ("plan", re.compile(r"^/api/v2/plans/([^/]+)$")),
+    ("apply", re.compile(r"^/api/v2/applies/([^/]+)$")),
+    ("log", re.compile(r"^/archivist/([^/]+)$")),
+)
+
+
+class MockTerraformCloudServer:
+    """Terraform Cloud stand-in running on a local port
+
+    Data is generated from the constructor arguments: every organization
+    has the same number of workspaces, and every workspace the same number
+    of runs. latency delays every response, max_page_size caps page[size]
+    like the real API does, and fail_next() or rate_limit make the server
+    answer with errors such as 429 Too Many Requests.
+
+    Use as a context manager, or call start() and stop().
+    """
+
+    def __init__(
+        self,
+        organizations=("example-org",),
+        workspaces=100,
+        runs_per_workspace=5,
+        log_lines=500,
+        latency=0.0,
+        max_page_size=100,
+        page_counts=True,
+        rate_limit=None,
+        compress=True,
+        token="test-token",
+    ):
+        self.latency = latency
+        self.max_page_size = max_page_size
+        self.page_counts = page_counts
+        self.rate_limit = rate_limit
+        self.compress = compress
+        self.token = token
+        self.log_lines = log_lines
+
+        self.organizations = [
+            {
+                "id": name,
+                "type": "organizations",
+                "attributes": {"name": name, "email": f"admin@{name}.example.com"},
+            }
+            for name in organizations
+        ]
+        self.workspaces = {}
+        self.runs = {}
+        self.workspace_runs = {}
+        for org_index, org in enumerate(organizations):
+            self.workspaces[org] = [
+                self._make_workspace(
+                    org, org_index * workspaces + i, runs_per_workspace
+                )
+                for i in range(workspaces)
+            ]
+
+        self._failures = []
+        self._lock = threading.Lock()
+        self._rate_window = (0, 0)
+        self._logs = {}
+        self.reset_stats()
+
+        self._server = None
+        self._thread = None
+
+    def _make_workspace(self, org, index, run_count):
+        """Generate a workspace and its runs"""
+        ws_id = f"ws-{index:08d}"
+        runs = []
+        for n in range(run_count):
+            run_id = f"run-{index:08d}-{n:03d}"
+            run = {
+                "id": run_id,
+                "type": "runs",
+                "attributes": {
+                    "status": RUN_STATUSES[(index + n) % len(RUN_STATUSES)],
+                    "message": f"Triggered by commit {index * 31 + n:07x}",
+                    "source": "tfe-api",
+                    "created-at": f"2024-01-{1 + n % 28:02d}T12:00:00.000Z",
+                    "has-changes": n % 2 == 0,
+                    "is-destroy": False,
+                },
+                "relationships": {
+                    "workspace": {"data": {"id": ws_id, "type": "workspaces"}},
+                    "plan": {
+                        "data": {"id": f"plan-{index:08d}-{n:03d}", "type": "plans"}
+                    },
+                    "apply": {
+                        "data": {"id": f"apply-{index:08d}-{n:03d}", "type": "applies"}
+                    },
+                },
+            }
+            self.runs[run_id] = run
+            runs.append(run)
+        self.workspace_runs[ws_id] = runs
+
+        # Every tenth workspace has never run
+        current_run = None
+        if runs and index % 10:
+            current_run = {"id": runs[0]["id"], "type": "runs"}
+
+        return {
+            "id": ws_id,
+            "type": "workspaces",
+            "attributes": {
+                "name": f"workspace-{index:05d}",
+                "environment": ENVIRONMENTS[index % len(ENVIRONMENTS)],
+                "updated-at": f"2024-02-{1 + index % 28:02d}T08:30:00.000Z",
+                "tag-names": list(TAGS[index % len(TAGS)]),
+                "locked": index % 7 == 0,
+                "terraform-version": "1.6.0",
+                "description": f"Workspace {index} of {org}",
+                "working-directory": f"stacks/stack-{index % 50}",
+            },
+            "relationships": {
+                "organization": {"data": {"id": org, "type": "organizations"}},
+                "current-run": {"data": current_run},
+            },
+        }
+
+    @property
+    def base_url(self):
+        """URL of the API, to pass as TerraformCloudAPI(base_url=...)"""
+        return f"http://127.0.0.1:{self.port}/api/v2"
+
+    @property
+    def port(self):
+        return self._server.server_port
+
+    def start(self):
+        """Start serving on a free local port"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _MockRequestHandler)
+        server.daemon_threads = True
+        server.mock = self
+        self._server = server
+        self._thread = threading.Thread(
+            target=server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="mock-terraform-cloud",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_stats(self):
+        """Reset the request counters"""
+        with self._lock:
+            self.requests = 0
+            self.connections = 0
+            self.bytes_sent = 0
+            self.routes = Counter()
+            self.statuses = Counter()
+            # Proxy-Authorization headers received, for requests sent as if
+            # the server was a plain HTTP proxy
+            self.proxy_authorizations = []
+
+    def fail_next(self, status=429, count=1, retry_after=None):
+        """Answer the next count requests with an error status"""
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def get_log(self, log_id):
+        """Get the full log served for a plan or apply"""
+        log = self._logs.get(log_id)
+        if log is None:
+            lines = ["Terraform v1.6.0", "on linux_amd64"]
+            for i in range(self.log_lines):
+                if i % 5 == 0:
+                    lines.append(
+                        f"module.stack_{i}.aws_instance.web: Refreshing state..."
+                    )
+                else:
+                    lines.append(
+                        json.dumps(
+                            {
+                                "@level": "info",
+                                "@message": f"aws_s3_bucket.bucket_{i}: Plan to create",
+                                "@module": "terraform.ui",
+                                "type": "planned_change",
+                            }
+                        )
+                    )
+            log = ("\x02" + "\n".join(lines) + "\n\x03").encode("utf-8")
+            self._logs[log_id] = log
+        return log
+
+    # Request handling
+
+    def handle(self, handler):
+        """Answer a request, returning (status, headers, body)"""
+        parsed = urllib.parse.urlsplit(handler.path)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+
+        with self._lock:
+            self.requests += 1
+            if parsed.scheme:
+                self.proxy_authorizations.append(
+                    handler.headers.get("Proxy-Authorization")
+                )
+            failure = self._failures.pop(0) if self._failures else None
+            limited = self._is_rate_limited()
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if failure:
+            status, retry_after = failure
+            return self._error(status, "Injected failure", retry_after)
+        if limited:
+            return self._error(
+                429, "Too many requests", retry_after=1 / self.rate_limit
+            )
+
+        for name, pattern in ROUTES:
+            match = pattern.match(parsed.path)
+            if match:
+                with self._lock:
+                    self.routes[name] += 1
+                if name == "log":
+                    return self._log(match.group(1), query)
+                if handler.headers.get("Authorization") != f"Bearer {self.token}":
+                    return self._error(401, "Unauthorized")
+                document = getattr(self, f"_{name}")(*match.groups(), query=query)
+                if document is None:
+                    return self._error(404, "Not found")
+                return self._json(handler, 200, document)
+
+        return self._error(404, "Not found")
+
+    def _is_rate_limited(self):
+        """Check the request against rate_limit; the lock must be held"""
+        if not self.rate_limit:
+            return False
+        second = int(time.monotonic())
+        window, count = self._rate_window
+        if window != second:
+            window, count = second, 0
+        self._rate_window = (window, count + 1)
+        return count >= self.rate_limit
+
+    def _json(self, handler, status, document):
+        """Encode a JSON:API document, honoring If-None-Match"""
+        body = json.dumps(document, separators=(",", ":")).encode("utf-8")
+        etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+        headers = {"Content-Type": "application/vnd.api+json", "ETag": etag}
+
+        if handler.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+
+        if self.compress and "gzip" in handler.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return status, headers, body
+
+    def _error(self, status, title, retry_after=None):
+        """Encode a JSON:API error"""
+        body = json.dumps({"errors": [{"status": str(status), "title": title}]})
+        headers = {"Content-Type": "application/vnd.api+json"}
+        if retry_after is not None:
+            headers["Retry-After"] = f"{retry_after:g}"
+        if status == 429:
+            headers["X-RateLimit-Limit"] = str(self.rate_limit or 30)
+            headers["X-RateLimit-Remaining"] = "0"
+        return status, headers, body.encode("utf-8")
+
+    def _paginate(self, path, items, query, included=None):
+        """Build a page of a collection"""
+        size = min(int(query.get("page[size]", 20)), self.max_page_size)
+        number = max(int(query.get("page[number]", 1)), 1)
+        total_pages = max((len(items) + size - 1) // size, 1)
+        page = items[(number - 1) * size : number * size]
+
+        def link(n):
+            if n is None:
+                return None
+            params = dict(query, **{"page[number]": n, "page[size]": size})
+            return f"{self.base_url}{path}?{urllib.parse.urlencode(params)}"
+
+        next_page = number + 1 if number < total_pages else None
+        prev_page = number - 1 if number > 1 else None
+        document = {
+            "data": page,
+            "links": {
+                "self": link(number),
+                "first": link(1),
+                "prev": link(prev_page),
+                "next": link(next_page),
+                "last": link(total_pages),
+            },
+        }
+        if self.page_counts:
+            document["meta"] = {
+                "pagination": {
+                    "current-page": number,
+                    "page-size": size,
+                    "prev-page": prev_page,
+                    "next-page": next_page,
+                    "total-pages": total_pages,
+                    "total-count": len(items),
+                }
+            }
+        if included is not None:
+            document["included"] = included(page)
+        return document
+
+    @staticmethod
+    def _sparse(resource, query):
+        """Apply a fields[type] sparse fieldset to a resource"""
+        fields = query.get(f"fields[{resource['type'][:-1]}]")
+        if not fields:
+            return resource
+        names = fields.split(",")
+        resource = dict(resource)
+        resource["attributes"] = {
+            k: v for k, v in resource["attributes"].items() if k in names
+        }
+        resource["relationships"] = {
+            k: v for k, v in resource.get("relationships", {}).items() if k in names
+        }
+        return resource
+
+    def _organizations(self, query):
+        return self._paginate("/organizations", self.organizations, query)
+
+    def _workspaces(self, org, query):
+        if org not in self.workspaces:
+            return None
+
+        workspaces = [self._sparse(ws, query) for ws in self.workspaces[org]]
+        included = None
+        if "current_run" in query.get("include", ""):
+
+            def included(page):
+                return [
+                    self._sparse(self.runs[run["id"]], query)
+                    for ws in page
+                    for run in [ws["relationships"].get("current-run", {}).get("data")]
+                    if run
+                ]
+
+        return self._paginate(
+            f"/organizations/{org}/workspaces", workspaces, query, included
+        )
+
+    def _organization_runs(self, org, query):
+        if org not in self.workspaces:
+            return None
+
+        names = query.get("filter[workspace_names]")
+        workspaces = self.workspaces[org]
+        if names:
+            names = set(names.split(","))
+            workspaces = [ws for ws in workspaces if ws["attributes"]["name"] in names]
+        runs = [run for ws in workspaces for run in self.workspace_runs[ws["id"]]]
+        return self._paginate(f"/organizations/{org}/runs", runs, query)
+
+    def _workspace_runs(self, workspace_id, query):
+        runs = self.workspace_runs.get(workspace_id)
+        if runs is None:
+            return None
+        return self._paginate(f"/workspaces/{workspace_id}/runs", runs, query)
+
+    def _run(self, run_id, query):
+        run = self.runs.get(run_id)
+        return {"data": run} if run else None
+
+    def _plan(self, plan_id, query):
+        return self._phase(plan_id, "plans")
+
+    def _apply(self, apply_id, query):
+        return self._phase(apply_id, "applies")
+
+    def _phase(self, phase_id, phase_type):
+        return {
+            "data": {
+                "id": phase_id,
+                "type": phase_type,
+                "attributes": {
+                    "status": "finished",
+                    "log-read-url": f"http://127.0.0.1:{self.port}/archivist/{phase_id}",
+                },
+            }
+        }
+
+    def _log(self, log_id, query):
+        """Serve a slice of a log, like the archivist does"""
+        log = self.get_log(log_id)
+        offset = int(query.get("offset", 0))
+        limit = int(query.get("limit", len(log)))
+        return 200, {"Content-Type": "text/plain"}, log[offset : offset + limit]
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    """Hands requests over to the MockTerraformCloudServer"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        mock = self.server.mock
+        with mock._lock:
+            mock.connections += 1
+
+    def do_GET(self):
+        mock = self.server.mock
+        status, headers, body = mock.handle(self)
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        with mock._lock:
+            mock.bytes_sent += len(body)
+            mock.statuses[status] += 1
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,288 @@
+"""
+Generator for synthetic Terraform monorepos used by the benchmarks
+
+    python monorepo_generator.py OUTPUT_DIR --root-modules 50 --state-resources 500
+"""
+
+import argparse
+import json
+import os
+
+PROVIDERS = (
+    ("aws", "hashicorp/aws", "5.31.0"),
+    ("google", "hashicorp/google", "5.10.0"),
+    ("random", "hashicorp/random", "3.6.0"),
+)
+
+RESOURCE_TYPES = (
+    "aws_instance",
+    "aws_s3_bucket",
+    "aws_security_group",
+    "google_compute_instance",
+    "random_id",
+)
+
+REGISTRY_MODULES = (
+    ("terraform-aws-modules/vpc/aws", "5.4.0"),
+    ("terraform-aws-modules/eks/aws", "19.21.0"),
+    ("terraform-google-modules/network/google", "9.0.0"),
+)
+
+
+class MonorepoSpec:
+    """Shape of a generated monorepo"""
+
+    def __init__(
+        self,
+        root_modules=20,
+        files_per_module=5,
+        blocks_per_file=20,
+        nesting_depth=2,
+        state_resources=100,
+        shared_modules=10,
+    ):
+        self.root_modules = root_modules
+        self.files_per_module = files_per_module
+        self.blocks_per_file = blocks_per_file
+        self.nesting_depth = nesting_depth
+        self.state_resources = state_resources
+        self.shared_modules = shared_modules
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def nested_block(name, depth, indent):
+    """Render a block with depth levels of nested blocks"""
+    pad = "  " * indent
+    lines = [f"{pad}{name} {{", f'{pad}  description = "{name} at depth {depth}"']
+    if depth > 0:
+        lines.append(f'{pad}  dynamic "rule" {{')
+        lines.append(f"{pad}    for_each = var.rules")
+        lines.append(f"{pad}    content {{")
+        lines.append(f"{pad}      port = rule.value.port")
+        lines.append(f"{pad}    }}")
+        lines.append(f"{pad}  }}")
+        lines.extend(nested_block(f"{name}_child", depth - 1, indent + 1))
+    lines.append(f"{pad}}}")
+    return lines
+
+
+def render_block(index, spec, module_index):
+    """Render the index-th block of a file"""
+    kind = index % 6
+    if kind == 0:
+        source = f"../../modules/shared-{(index + module_index) % spec.shared_modules}"
+        return "\n".join(
+            [
+                f'module "component_{index}" {{',
+                f'  source = "{source}"',
+                f'  name   = "component-{index}"',
+                "}",
+            ]
+        )
+    if kind == 1:
+        source, version = REGISTRY_MODULES[index % len(REGISTRY_MODULES)]
+        return "\n".join(
+            [
+                f'module "registry_{index}" {{',
+                f'  source  = "{source}"',
+                f'  version = "{version}"',
+                f"  cidr    = cidrsubnet(var.cidr, 8, {index})",
+                "}",
+            ]
+        )
+    if kind == 2:
+        return "\n".join(
+            [
+                f'variable "setting_{index}" {{',
+                "  type    = string",
+                f'  default = "value-{index}"',
+                "}",
+            ]
+        )
+    if kind == 3:
+        return "\n".join(
+            [
+                f'output "id_{index}" {{',
+                f"  value = {RESOURCE_TYPES[index % len(RESOURCE_TYPES)]}.r_{index - 1}.id",
+                "}",
+            ]
+        )
+
+    resource_type = RESOURCE_TYPES[index % len(RESOURCE_TYPES)]
+    lines = [
+        f'resource "{resource_type}" "r_{index}" {{',
+        f'  name = "${{var.prefix}}-{index}"',
+        "  tags = {",
+        f'    Component = "component-{index}"',
+        "  }",
+    ]
+    lines.extend(nested_block("settings", spec.nesting_depth, 1))
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def render_main(module_index):
+    """Render the terraform, backend and provider blocks of a root module"""
+    lines = [
+        "terraform {",
+        '  required_version = ">= 1.5.0"',
+        '  backend "s3" {',
+        '    bucket = "terraform-state"',
+        f'    key    = "stacks/stack-{module_index:03d}/terraform.tfstate"',
+        "  }",
+        "  required_providers {",
+    ]
+    for name, source, version in PROVIDERS:
+        lines.append(f"    {name} = {{")
+        lines.append(f'      source  = "{source}"')
+        lines.append(f'      version = "~> {version.rsplit(".", 1)[0]}"')
+        lines.append("    }")
+    lines.extend(["  }", "}", ""])
+    lines.extend(['provider "aws" {', '  region = "us-east-1"', "}", ""])
+    lines.extend(['variable "prefix" {', "  type = string", "}"])
+    return "\n".join(lines) + "\n"
+
+
+def render_lock_file():
+    """Render a .terraform.lock.hcl for the generated providers"""
+    blocks = []
+    for _, source, version in PROVIDERS:
+        blocks.append(
+            "\n".join(
+                [
+                    f'provider "registry.terraform.io/{source}" {{',
+                    f'  version     = "{version}"',
+                    f'  constraints = "~> {version.rsplit(".", 1)[0]}"',
+                    "  hashes = [",
+                    f'    "h1:{source.replace("/", "")}{version}=",',
+                    "  ]",
+                    "}",
+                ]
+            )
+        )
+    return '# This file is maintained automatically by "terraform init".\n\n' + (
+        "\n\n".join(blocks) + "\n"
+    )
+
+
+def render_state(module_index, resources):
+    """Render a terraform.tfstate with the given number of resources"""
+    return {
+        "version": 4,
+        "terraform_version": "1.6.0",
+        "serial": module_index,
+        "lineage": f"00000000-0000-0000-0000-{module_index:012d}",
+        "outputs": {},
+        "resources": [
+            {
+                "mode": "managed",
+                "type": RESOURCE_TYPES[i % len(RESOURCE_TYPES)],
+                "name": f"r_{i}",
+                "provider": 'provider["registry.terraform.io/hashicorp/aws"]',
+                "instances": [
+                    {
+                        "schema_version": 1,
+                        "attributes": {
+                            "id": f"id-{module_index}-{i}",
+                            "arn": f"arn:aws:service:us-east-1:123456789012:r/{i}",
+                            "tags": {"Component": f"component-{i}"},
+                            "settings": [{"port": p} for p in range(5)],
+                        },
+                    }
+                ],
+            }
+            for i in range(resources)
+        ],
+    }
+
+
+def render_modules_json(module_index, spec):
+    """Render .terraform/modules/modules.json"""
+    modules = [{"Key": "", "Source": "", "Dir": "."}]
+    for i in range(spec.shared_modules):
+        modules.append(
+            {
+                "Key": f"component_{i}",
+                "Source": f"../../modules/shared-{i}",
+                "Dir": f"../../modules/shared-{i}",
+            }
+        )
+    return {"Modules": modules}
+
+
+def write(path, content):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return len(content.encode("utf-8"))
+
+
+def generate_monorepo(path, spec=None):
+    """Write a synthetic monorepo to path and return a summary"""
+    spec = spec or MonorepoSpec()
+    summary = {"root_modules": [], "files": 0, "bytes": 0}
+
+    def add(file_path, content):
+        summary["files"] += 1
+        summary["bytes"] += write(file_path, content)
+
+    for i in range(spec.shared_modules):
+        module_dir = os.path.join(path, "modules", f"shared-{i}")
+        os.makedirs(module_dir, exist_ok=True)
+        add(
+            os.path.join(module_dir, "variables.tf"),
+            'variable "name" {\n  type = string\n}\n',
+        )
+        add(
+            os.path.join(module_dir, "main.tf"),
+            "\n\n".join(render_block(b, spec, i) for b in range(2, 6)) + "\n",
+        )
+        add(
+            os.path.join(module_dir, "outputs.tf"),
+            'output "name" {\n  value = var.name\n}\n',
+        )
+
+    for m in range(spec.root_modules):
+        root = os.path.join(path, "stacks", f"stack-{m:03d}")
+        os.makedirs(os.path.join(root, ".terraform", "modules"), exist_ok=True)
+        summary["root_modules"].append(root)
+
+        add(os.path.join(root, "main.tf"), render_main(m))
+        for f in range(spec.files_per_module):
+            blocks = [render_block(b, spec, m) for b in range(spec.blocks_per_file)]
+            add(os.path.join(root, f"resources_{f:02d}.tf"), "\n\n".join(blocks) + "\n")
+
+        add(os.path.join(root, ".terraform.lock.hcl"), render_lock_file())
+        add(
+            os.path.join(root, "terraform.tfstate"),
+            json.dumps(render_state(m, spec.state_resources), indent=2),
+        )
+        add(
+            os.path.join(root, ".terraform", "modules", "modules.json"),
+            json.dumps(render_modules_json(m, spec)),
+        )
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic Terraform monorepo"
+    )
+    parser.add_argument("output")
+    defaults = MonorepoSpec()
+    for name, value in defaults.to_dict().items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    args = parser.parse_args()
+
+    spec = MonorepoSpec(**{name: getattr(args, name) for name in defaults.to_dict()})
+    summary = generate_monorepo(args.output, spec)
+    print(
+        f"Generated {len(summary['root_modules'])} root modules, "
+        f"{summary['files']} files, {summary['bytes'] / 1024 / 1024:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Benchmarks for the Terraform Cloud client against the local mock server
+"""
+
+import threading
+import time
+import unittest
+
+from benchmark import get_recorder
+from mock_cloud_server import MockTerraformCloudServer
+from support import load_plugin_module, sublime
+
+terraform_cloud = load_plugin_module("cloud.terraform_cloud")
+terraform_cloud_cache = load_plugin_module("cloud.terraform_cloud_cache")
+
+# Hostname the mock server is registered under
+MOCK_HOSTNAME = "mock.terraform.local"
+
+# Seconds every mock response is delayed, about a round trip to the real API
+LATENCY = 0.05
+
+
+def make_api(test, server):
+    """Create a client for the mock server with its own pool and cache"""
+    api = terraform_cloud.TerraformCloudAPI(
+        server.token,
+        pool=terraform_cloud.TerraformCloudConnectionPool(),
+        cache=terraform_cloud_cache.TerraformCloudResponseCache(),
+        hostname=MOCK_HOSTNAME,
+        base_url=server.base_url,
+    )
+    test.addCleanup(api.pool.close)
+    return api
+
+
+def use_api(api, organization):
+    """Make the cloud commands use a client"""
+    state = terraform_cloud._cloud_state
+    state.hostname = api.hostname
+    state.token = api.token
+    state.organization = organization
+    terraform_cloud._api_clients[(api.hostname, api.token)] = api
+
+
+class CloudPanelBenchmark(unittest.TestCase):
+    """Time from running a command until its quick panel is complete"""
+
+    def populate(self, command_class):
+        """Run a command and time its quick panel renders"""
+        window = sublime.Window()
+        renders = []
+        complete = threading.Event()
+
+        def on_quick_panel(panel):
+            renders.append(time.perf_counter())
+            if "loading" not in panel["placeholder"]:
+                complete.set()
+
+        window.on_quick_panel = on_quick_panel
+        start = time.perf_counter()
+        command_class(window).run()
+        self.assertTrue(complete.wait(60), "panel was never completed")
+
+        return {
+            "first_render_s": renders[0] - start,
+            "complete_s": renders[-1] - start,
+            "renders": len(renders),
+            "items": len(window.quick_panels[-1]["items"]),
+        }
+
+    def test_workspaces_panel(self):
+        for count in (100, 2000):
+            with MockTerraformCloudServer(workspaces=count, latency=LATENCY) as server:
+                use_api(make_api(self, server), "example-org")
+                result = self.populate(
+                    terraform_cloud.TerraformCloudShowWorkspacesCommand
+                )
+
+                self.assertEqual(result["items"], count)
+                get_recorder().record(
+                    f"cloud.workspaces_panel.{count}",
+                    requests=server.requests,
+                    bytes=server.bytes_sent,
+                    connections=server.connections,
+                    **result,
+                )
+
+    def test_runs_panel(self):
+        with MockTerraformCloudServer(
+            workspaces=1, runs_per_workspace=500, latency=LATENCY
+        ) as server:
+            use_api(make_api(self, server), "example-org")
+            terraform_cloud._cloud_state.current_workspace = server.workspaces[
+                "example-org"
+            ][0]
+            result = self.populate(terraform_cloud.TerraformCloudShowRunsCommand)
+
+            self.assertEqual(result["items"], 500)
+            get_recorder().record(
+                "cloud.runs_panel.500",
+                requests=server.requests,
+                bytes=server.bytes_sent,
+                **result,
+            )
+
+
+class CloudCacheBenchmark(unittest.TestCase):
+    """Cold and warm cache fetches"""
+
+    def test_workspaces_cold_and_warm(self):
+        with MockTerraformCloudServer(workspaces=1000, latency=LATENCY) as server:
+            api = make_api(self, server)
+
+            start = time.perf_counter()
+            api.get_workspaces("example-org")
+            cold = time.perf_counter() - start
+            cold_requests = server.requests
+
+            start = time.perf_counter()
+            api.get_workspaces("example-org")
+            warm = time.perf_counter() - start
+
+            self.assertEqual(server.requests, cold_requests)
+            get_recorder().record(
+                "cloud.workspaces_cache.1000",
+                cold_s=cold,
+                warm_s=warm,
+                requests=cold_requests,
+                bytes=server.bytes_sent,
+            )
+
+
+class CloudLogBenchmark(unittest.TestCase):
+    """Streaming a large plan log"""
+
+    def test_plan_log(self):
+        with MockTerraformCloudServer(log_lines=50000) as server:
+            api = make_api(self, server)
+
+            start = time.perf_counter()
+            lines = sum(1 for _ in api.iter_plan_log("plan-00000000-000"))
+            elapsed = time.perf_counter() - start
+
+            self.assertEqual(lines, 50002)
+            get_recorder().record(
+                "cloud.plan_log.50000",
+                elapsed_s=elapsed,
+                lines_per_sec=lines / elapsed,
+                requests=server.requests,
+                bytes=server.bytes_sent,
+            )
+
+
+class CloudRateLimitBenchmark(unittest.TestCase):
+    """Fetching many pages from a server that rate limits"""
+
+    def test_rate_limited_workspaces(self):
+        with MockTerraformCloudServer(
+            workspaces=3000, rate_limit=10, latency=LATENCY
+        ) as server:
+            api = make_api(self, server)
+
+            start = time.perf_counter()
+            workspaces = api.get_workspaces("example-org")
+            elapsed = time.perf_counter() - start
+
+            self.assertEqual(len(workspaces), 3000)
+            get_recorder().record(
+                "cloud.rate_limited_workspaces.3000",
+                elapsed_s=elapsed,
+                pages=server.statuses[200],
+                rate_limited=server.statuses[429],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main(exit=False)
+    get_recorder().report()
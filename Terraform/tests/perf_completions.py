@@ -0,0 +1,58 @@
+"""
+Benchmarks for completions from a provider schema the size of AWS's
+"""
+
+import shutil
+import tempfile
+import unittest
+
+from benchmark import get_recorder, measure
+from support import load_plugin_module, sublime
+from test_completions import make_schemas
+
+terraform_completions = load_plugin_module("terraform_completions")
+
+# Resource types of the AWS provider, roughly
+RESOURCE_TYPES = 1400
+
+
+class SchemaCompletionBenchmark(unittest.TestCase):
+    """Completing types and attributes from the cached schema"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp()
+        cls.cache, cls.schemas = make_schemas(cls.folder, RESOURCE_TYPES)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder, ignore_errors=True)
+
+    def complete(self, text):
+        view = sublime.View(text=text)
+        context = terraform_completions.get_completion_context(view, len(text))
+        return terraform_completions.build_completions(self.schemas, context)
+
+    def test_resource_types(self):
+        for name, prefix in (("all", "aws_"), ("prefix", "aws_generated_01")):
+            items, _ = self.complete(f'resource "{prefix}')
+            get_recorder().record(
+                f"completions.types.{name}",
+                items=len(items),
+                **measure(lambda: self.complete(f'resource "{prefix}'), repeat=20),
+            )
+
+    def test_block_attributes(self):
+        text = 'resource "aws_s3_bucket" "this" {\n  bucket = "x"\n}\n' * 200
+        text += 'resource "aws_s3_bucket" "b" {\n  rule {\n    '
+        items, _ = self.complete(text)
+        get_recorder().record(
+            "completions.block",
+            items=len(items),
+            **measure(lambda: self.complete(text), repeat=20),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(exit=False)
+    get_recorder().report()
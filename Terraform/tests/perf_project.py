@@ -0,0 +1,156 @@
+"""
+Benchmarks for project detection and parsing on a synthetic monorepo
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmark import get_recorder, measure
+from monorepo_generator import MonorepoSpec, generate_monorepo, render_state
+from support import load_default_settings, load_plugin_module, sublime
+
+terraform_project = load_plugin_module("terraform_project")
+terraform_module_explorer = load_plugin_module("terraform_module_explorer")
+
+# Monorepo shapes, picked with the TERRAFORM_BENCHMARK_SCALE environment variable
+SCALES = {
+    "small": MonorepoSpec(
+        root_modules=10, files_per_module=3, blocks_per_file=20, state_resources=50
+    ),
+    "medium": MonorepoSpec(
+        root_modules=50, files_per_module=5, blocks_per_file=30, state_resources=200
+    ),
+    "large": MonorepoSpec(
+        root_modules=200,
+        files_per_module=8,
+        blocks_per_file=40,
+        nesting_depth=3,
+        state_resources=1000,
+    ),
+}
+
+SCALE = os.environ.get("TERRAFORM_BENCHMARK_SCALE", "medium")
+
+_repo = {}
+
+
+def setUpModule():
+    load_default_settings()
+    path = tempfile.mkdtemp(prefix="terraform-monorepo-")
+    _repo["path"] = path
+    _repo["summary"] = generate_monorepo(path, SCALES[SCALE])
+
+
+def tearDownModule():
+    shutil.rmtree(_repo.pop("path"), ignore_errors=True)
+
+
+class ModuleParserBenchmark(unittest.TestCase):
+    """TerraformModuleParser on a large file"""
+
+    def test_parse_file(self):
+        root = _repo["summary"]["root_modules"][0]
+        content = "\n".join(
+            open(os.path.join(root, name)).read()
+            for name in sorted(os.listdir(root))
+            if name.endswith(".tf")
+        )
+        content = content * max(1, 500_000 // len(content))
+        view = sublime.View(text=content, file_name=os.path.join(root, "main.tf"))
+
+        parser = terraform_module_explorer.TerraformModuleParser
+        result = parser.parse_file(view)
+        timings = measure(lambda: parser.parse_file(view))
+
+        self.assertTrue(result["modules"])
+        get_recorder().record(
+            f"project.parse_file.{SCALE}",
+            bytes=len(content),
+            modules=len(result["modules"]),
+            mb_per_sec=len(content) / timings["median_s"] / 1024 / 1024,
+            **timings,
+        )
+
+
+class ProjectDetectorBenchmark(unittest.TestCase):
+    """Finding every root module of a window"""
+
+    def tearDown(self):
+        terraform_project.TerraformProjectDetector.cleanup()
+
+    def test_refresh_projects(self):
+        window = sublime.Window([_repo["path"]])
+        detector = terraform_project.TerraformProjectDetector
+
+        timings = measure(lambda: detector.refresh_projects(window), repeat=3)
+
+        projects = detector.get_all_projects()
+        self.assertEqual(len(projects), len(_repo["summary"]["root_modules"]))
+        get_recorder().record(
+            f"project.refresh_projects.{SCALE}",
+            projects=len(projects),
+            files=_repo["summary"]["files"],
+            **timings,
+        )
+
+    def test_detect_project(self):
+        root = _repo["summary"]["root_modules"][-1]
+        view = sublime.View(file_name=os.path.join(root, "resources_00.tf"))
+        detector = terraform_project.TerraformProjectDetector
+
+        def detect():
+            detector.cleanup()
+            return detector.detect_project(view)
+
+        self.assertEqual(detect().root_path, root)
+        get_recorder().record(f"project.detect_project.{SCALE}", **measure(detect))
+
+
+class ProjectBenchmark(unittest.TestCase):
+    """Analyzing root modules"""
+
+    def test_project_construction(self):
+        roots = _repo["summary"]["root_modules"]
+
+        def construct():
+            return [terraform_project.TerraformProject(root) for root in roots]
+
+        projects = construct()
+        timings = measure(construct, repeat=3)
+
+        self.assertEqual(projects[0].backend, "s3")
+        get_recorder().record(
+            f"project.construct.{SCALE}",
+            projects=len(roots),
+            per_project_s=timings["median_s"] / len(roots),
+            **timings,
+        )
+
+    def test_state_parsing(self):
+        resources = SCALES[SCALE].state_resources * 10
+        state_file = os.path.join(_repo["path"], "large.tfstate")
+        with open(state_file, "w") as f:
+            json.dump(render_state(0, resources), f, indent=2)
+
+        project = terraform_project.TerraformProject(
+            _repo["summary"]["root_modules"][0]
+        )
+        timings = measure(lambda: project._parse_state_file(state_file), repeat=3)
+
+        self.assertEqual(project.terraform_version, "1.6.0")
+        size = os.path.getsize(state_file)
+        get_recorder().record(
+            f"project.parse_state.{SCALE}",
+            resources=resources,
+            bytes=size,
+            mb_per_sec=size / timings["median_s"] / 1024 / 1024,
+            **timings,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(exit=False)
+    get_recorder().report()
@@ -0,0 +1,98 @@
+"""
+Benchmarks for the reference graph of a very large root module
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+
+from benchmark import get_recorder, measure
+from support import load_plugin_module
+
+terraform_references = load_plugin_module("terraform_references")
+
+# Blocks of the generated root module, spread over FILES files
+BLOCKS = 40000
+FILES = 40
+
+
+def generate_root_module(path):
+    """Write a root module whose resources reference each other in chains"""
+    per_file = BLOCKS // FILES
+    for f in range(FILES):
+        lines = [f'variable "name_{f}" {{\n  type = string\n}}\n']
+        lines.append(f'locals {{\n  prefix_{f} = "${{var.name_{f}}}-x"\n}}\n')
+        for i in range(per_file - 2):
+            previous = f"null_resource.r_{f}_{i - 1}.id" if i else f"local.prefix_{f}"
+            lines.append(
+                f'resource "null_resource" "r_{f}_{i}" {{\n'
+                f"  triggers = {{\n"
+                f"    parent = {previous}\n"
+                f'    name   = "${{var.name_{f}}}-{i}"\n'
+                f"  }}\n"
+                f"}}\n"
+            )
+        with open(os.path.join(path, f"file_{f}.tf"), "w") as out:
+            out.write("\n".join(lines))
+
+
+class ReferenceGraphBenchmark(unittest.TestCase):
+    """Building and querying the graph of a 40k block root module"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp(prefix="terraform-references-")
+        generate_root_module(cls.root)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root, ignore_errors=True)
+
+    def test_build(self):
+        def build():
+            graph = terraform_references.TerraformReferenceGraph(self.root)
+            graph.refresh()
+            return graph
+
+        gc.collect()
+        tracemalloc.start()
+        graph = build()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        self.assertEqual(len(graph.blocks), BLOCKS)
+        get_recorder().record(
+            "references.build",
+            blocks=len(graph.blocks),
+            memory_mb=memory / 1024 / 1024,
+            **measure(build, repeat=3),
+        )
+
+    def test_queries(self):
+        graph = terraform_references.TerraformReferenceGraph(self.root)
+        graph.refresh()
+        path = os.path.join(self.root, "file_0.tf")
+        with open(path) as f:
+            content = f.read()
+
+        get_recorder().record(
+            "references.dependents",
+            **measure(lambda: graph.get_dependents("var.name_0"), repeat=20),
+        )
+        get_recorder().record(
+            "references.find",
+            **measure(lambda: graph.find_references("null_resource.r_0_5"), repeat=20),
+        )
+        get_recorder().record(
+            "references.update_file",
+            bytes=len(content),
+            **measure(lambda: graph.update_file(path, content), repeat=5),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(exit=False)
+    get_recorder().report()
@@ -0,0 +1,85 @@
+"""
+Benchmarks for the workspace report and provider inventory on a monorepo with 600 root modules
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from benchmark import get_recorder, measure
+from monorepo_generator import MonorepoSpec, generate_monorepo
+from support import load_plugin_module
+
+terraform_lockfile = load_plugin_module("terraform_lockfile")
+terraform_references = load_plugin_module("terraform_references")
+terraform_report = load_plugin_module("terraform_report")
+
+SPEC = MonorepoSpec(
+    root_modules=600, files_per_module=4, blocks_per_file=12, state_resources=0
+)
+
+
+class WorkspaceReportBenchmark(unittest.TestCase):
+    """Indexing every root module and collecting module usage"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.path = tempfile.mkdtemp(prefix="terraform-report-")
+        cls.roots = generate_monorepo(cls.path, SPEC)["root_modules"]
+
+    @classmethod
+    def tearDownClass(cls):
+        terraform_references.close_reference_graphs()
+        shutil.rmtree(cls.path, ignore_errors=True)
+
+    def test_cold_and_warm_index(self):
+        for workers in (1, terraform_report.REPORT_WORKERS):
+            terraform_references.close_reference_graphs()
+            start = time.perf_counter()
+            terraform_report.index_roots(self.roots, workers)
+            get_recorder().record(
+                f"report.index_cold.workers_{workers}",
+                roots=len(self.roots),
+                seconds=time.perf_counter() - start,
+            )
+
+        get_recorder().record(
+            "report.index_warm",
+            **measure(lambda: terraform_report.index_roots(self.roots), repeat=3),
+        )
+
+    def test_collect_and_format(self):
+        graphs = terraform_report.index_roots(self.roots)
+
+        def report():
+            modules, providers = terraform_report.collect_usage(graphs)
+            return terraform_report.format_report(
+                modules, providers, "drift", self.path, len(graphs)
+            )
+
+        text = report()
+        get_recorder().record(
+            "report.collect_and_format", lines=text.count("\n"), **measure(report)
+        )
+
+    def test_provider_inventory(self):
+        def inventory():
+            lock_files = terraform_report.read_lock_files(self.roots)
+            return terraform_report.collect_locked_providers(lock_files)
+
+        terraform_lockfile.close_lock_file_cache()
+        start = time.perf_counter()
+        inventory()
+        get_recorder().record(
+            "report.inventory_cold",
+            roots=len(self.roots),
+            seconds=time.perf_counter() - start,
+        )
+        get_recorder().record("report.inventory_warm", **measure(inventory))
+
+
+if __name__ == "__main__":
+    unittest.main(exit=False)
+    get_recorder().report()
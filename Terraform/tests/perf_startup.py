@@ -0,0 +1,82 @@
+"""
+Benchmarks for the time the plugin adds to Sublime Text's startup
+
+Every import runs in a fresh interpreter so modules cached by an earlier
+benchmark don't hide their cost.
+"""
+
+import glob
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from benchmark import get_recorder
+from support import PLUGIN_DIR, TESTS_DIR
+
+# Fresh interpreters started per module, the fastest one is recorded
+REPEAT = 5
+
+# Script that imports plugin modules and prints the seconds it took
+IMPORT_SCRIPT = """
+import json, sys, time
+import support
+names = json.loads(sys.argv[1])
+start = time.perf_counter()
+for name in names:
+    support.load_plugin_module(name)
+print(time.perf_counter() - start)
+"""
+
+
+def get_root_modules():
+    """Get the modules Sublime Text loads from the root of the package"""
+    return sorted(
+        os.path.splitext(os.path.basename(path))[0]
+        for path in glob.glob(os.path.join(PLUGIN_DIR, "*.py"))
+    )
+
+
+def time_import(names):
+    """Get the fastest time to import modules in a fresh interpreter"""
+    timings = []
+    for _ in range(REPEAT):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT, json.dumps(names)],
+            cwd=TESTS_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        timings.append(float(output))
+    return min(timings)
+
+
+class StartupBenchmark(unittest.TestCase):
+    """Time to import the plugin like Sublime Text does at startup"""
+
+    def test_plugin_load(self):
+        modules = get_root_modules()
+        get_recorder().record(
+            "startup.plugin_load", elapsed_s=time_import(modules), modules=len(modules)
+        )
+
+    def test_module_imports(self):
+        for name in get_root_modules():
+            get_recorder().record(
+                f"startup.import.{name}", elapsed_s=time_import([name])
+            )
+
+    def test_first_cloud_command(self):
+        get_recorder().record(
+            "startup.cloud_client",
+            elapsed_s=time_import(
+                ["cloud.terraform_cloud_dashboard", "cloud.terraform_cloud_watcher"]
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(exit=False)
+    get_recorder().report()
@@ -0,0 +1,193 @@
+"""
+Test runner for the Terraform plugin
+
+Runs outside Sublime Text with stand-ins for the sublime modules.
+
+    python run_tests.py                 Unit tests (test_*.py)
+    python run_tests.py --integration   Integration tests (integration_*.py)
+    python run_tests.py --performance   Benchmarks (perf_*.py)
+
+Benchmark results can be saved with --save-results and compared with
+--baseline, which fails the run when a timing or request count regressed
+by more than --tolerance.
+"""
+
+import argparse
+import html
+import json
+import os
+import sys
+import time
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TESTS_DIR)
+
+from benchmark import format_metric, get_recorder, load_results  # noqa: E402
+
+# File name pattern of every kind of test
+PATTERNS = {
+    "unit": "test_*.py",
+    "integration": "integration_*.py",
+    "performance": "perf_*.py",
+}
+
+
+class RecordingResult(unittest.TextTestResult):
+    """Test result that remembers the outcome and duration of every test"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.outcomes = []
+        self._started = {}
+
+    def startTest(self, test):
+        self._started[test.id()] = time.perf_counter()
+        super().startTest(test)
+
+    def _record(self, test, outcome, details=""):
+        started = self._started.pop(test.id(), time.perf_counter())
+        self.outcomes.append(
+            {
+                "test": test.id(),
+                "outcome": outcome,
+                "duration": round(time.perf_counter() - started, 4),
+                "details": details,
+            }
+        )
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self._record(test, "passed")
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._record(test, "failed", self.failures[-1][1])
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._record(test, "error", self.errors[-1][1])
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._record(test, "skipped", reason)
+
+
+def write_json_report(path, kind, result):
+    """Write the test outcomes and benchmark results as JSON"""
+    report = {
+        "kind": kind,
+        "tests_run": result.testsRun,
+        "failures": len(result.failures),
+        "errors": len(result.errors),
+        "skipped": len(result.skipped),
+        "tests": result.outcomes,
+        "benchmarks": get_recorder().results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def write_html_report(path, kind, result):
+    """Write the test outcomes as a simple HTML table"""
+    rows = "\n".join(
+        f"<tr class='{o['outcome']}'><td>{html.escape(o['test'])}</td>"
+        f"<td>{o['outcome']}</td><td>{o['duration']:.3f}s</td>"
+        f"<td><pre>{html.escape(o['details'])}</pre></td></tr>"
+        for o in result.outcomes
+    )
+    with open(path, "w") as f:
+        f.write(
+            "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+            f"<title>Terraform plugin {kind} tests</title><style>"
+            ".passed{color:green}.failed,.error{color:red}.skipped{color:gray}"
+            "</style></head><body>"
+            f"<h1>{kind.title()} tests: {result.testsRun} run, "
+            f"{len(result.failures)} failed, {len(result.errors)} errors</h1>"
+            f"<table>{rows}</table></body></html>"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Terraform plugin tests")
+    kind = parser.add_mutually_exclusive_group()
+    kind.add_argument("--integration", action="store_true", help="integration tests")
+    kind.add_argument("--performance", action="store_true", help="benchmarks")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    parser.add_argument("-k", dest="pattern", help="only run tests matching")
+    parser.add_argument("--json-report", help="write the results as JSON")
+    parser.add_argument("--html-report", help="write the results as HTML")
+    parser.add_argument("--save-results", help="save benchmark results as JSON")
+    parser.add_argument("--baseline", help="compare benchmarks to saved results")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed slowdown against the baseline (default: 0.2 = 20%%)",
+    )
+    parser.add_argument(
+        "--scale",
+        choices=("small", "medium", "large"),
+        help="size of the synthetic monorepo benchmarks",
+    )
+    args = parser.parse_args()
+
+    if args.scale:
+        os.environ["TERRAFORM_BENCHMARK_SCALE"] = args.scale
+
+    kind = "unit"
+    if args.integration:
+        kind = "integration"
+    elif args.performance:
+        kind = "performance"
+
+    loader = unittest.TestLoader()
+    if args.pattern:
+        loader.testNamePatterns = [f"*{args.pattern}*"]
+    suite = loader.discover(TESTS_DIR, pattern=PATTERNS[kind], top_level_dir=TESTS_DIR)
+
+    if not suite.countTestCases():
+        print(f"No {kind} tests found")
+        return 0
+
+    runner = unittest.TextTestRunner(
+        verbosity=2 if args.verbose else 1, resultclass=RecordingResult
+    )
+    result = runner.run(suite)
+    get_recorder().report()
+
+    if args.json_report:
+        write_json_report(args.json_report, kind, result)
+    if args.html_report:
+        write_html_report(args.html_report, kind, result)
+    if args.save_results:
+        get_recorder().save(args.save_results)
+        print(f"Benchmark results saved to {args.save_results}")
+
+    regressions = []
+    if args.baseline:
+        regressions = get_recorder().compare(
+            load_results(args.baseline), args.tolerance
+        )
+        report_regressions(regressions, args.baseline)
+
+    return 0 if result.wasSuccessful() and not regressions else 1
+
+
+def report_regressions(regressions, baseline):
+    """Print the benchmarks that regressed against the baseline"""
+    if not regressions:
+        print(f"No regressions against {baseline}")
+        return
+
+    print(f"\n{len(regressions)} regression(s) against {baseline}:")
+    for name, key, old, new in regressions:
+        change = (new - old) / old * 100 if old else float("inf")
+        print(
+            f"  {name} {key}: {format_metric(key, old)} -> "
+            f"{format_metric(key, new)} (+{change:.0f}%)"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""
+Stand-in for the sublime module so the plugin can run outside Sublime Text
+Callbacks passed to set_timeout run in order on a single "UI" thread
+"""
+
+import heapq
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+
+HOVER_TEXT = 1
+HIDE_ON_MOUSE_MOVE_AWAY = 2
+MONOSPACE_FONT = 1
+DYNAMIC_COMPLETIONS = 8
+COMPLETION_FORMAT_TEXT = 0
+COMPLETION_FORMAT_SNIPPET = 1
+KIND_ID_AMBIGUOUS = 0
+KIND_ID_NAMESPACE = 3
+KIND_ID_TYPE = 5
+KIND_ID_VARIABLE = 8
+KIND_ID_SNIPPET = 10
+KIND_AMBIGUOUS = (KIND_ID_AMBIGUOUS, "", "")
+KIND_SNIPPET = (KIND_ID_SNIPPET, "s", "Snippet")
+LAYOUT_INLINE = 0
+
+_settings = {}
+_windows = []
+_status_messages = []
+_cache_dir = os.path.join(tempfile.gettempdir(), "terraform-plugin-tests")
+
+
+class Settings:
+    """In-memory settings object"""
+
+    def __init__(self, values=None):
+        self._values = dict(values or {})
+        self._callbacks = {}
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def set(self, key, value):
+        self._values[key] = value
+        for callback in list(self._callbacks.values()):
+            callback()
+
+    def erase(self, key):
+        self._values.pop(key, None)
+
+    def has(self, key):
+        return key in self._values
+
+    def to_dict(self):
+        return dict(self._values)
+
+    def add_on_change(self, key, callback):
+        self._callbacks[key] = callback
+
+    def clear_on_change(self, key):
+        self._callbacks.pop(key, None)
+
+
+class Region:
+    """A region of a view"""
+
+    def __init__(self, a, b=None):
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+    def __eq__(self, other):
+        return (self.a, self.b) == (other.a, other.b)
+
+    def __repr__(self):
+        return f"Region({self.a}, {self.b})"
+
+
+class Phantom:
+    """HTML shown in a view"""
+
+    def __init__(self, region, content, layout, on_navigate=None):
+        self.region = region
+        self.content = content
+        self.layout = layout
+        self.on_navigate = on_navigate
+
+
+class PhantomSet:
+    """Phantoms of a view, recording every update"""
+
+    def __init__(self, view, key=""):
+        self.view = view
+        self.key = key
+        self.phantoms = []
+        self.updates = 0
+
+    def update(self, phantoms):
+        self.phantoms = list(phantoms)
+        self.updates += 1
+
+
+class CompletionItem:
+    """A completion"""
+
+    def __init__(
+        self,
+        trigger,
+        annotation="",
+        completion="",
+        completion_format=COMPLETION_FORMAT_TEXT,
+        kind=KIND_AMBIGUOUS,
+        details="",
+    ):
+        self.trigger = trigger
+        self.annotation = annotation
+        self.completion = completion
+        self.completion_format = completion_format
+        self.kind = kind
+        self.details = details
+
+    @classmethod
+    def snippet_completion(
+        cls, trigger, snippet, annotation="", kind=KIND_SNIPPET, details=""
+    ):
+        return cls(
+            trigger, annotation, snippet, COMPLETION_FORMAT_SNIPPET, kind, details
+        )
+
+
+class CompletionList:
+    """Completions that can be filled in after on_query_completions returns"""
+
+    def __init__(self, completions=None, flags=0):
+        self.completions = completions
+        self.flags = flags
+        self.done = threading.Event()
+        if completions is not None:
+            self.done.set()
+
+    def set_completions(self, completions, flags=0):
+        self.completions = completions
+        self.flags = flags
+        self.done.set()
+
+
+class View:
+    """View over a string that records what is written to it"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, window=None, name="", text="", file_name=None):
+        self._id = next(View._ids)
+        self._window = window
+        self._name = name
+        self._file_name = file_name
+        self._settings = Settings()
+        self.text = text
+        self.status = {}
+        self._viewport = (0.0, 0.0)
+        self._change_count = 0
+
+    def id(self):
+        return self._id
+
+    def is_valid(self):
+        return True
+
+    def window(self):
+        return self._window
+
+    def settings(self):
+        return self._settings
+
+    def set_name(self, name):
+        self._name = name
+
+    def name(self):
+        return self._name
+
+    def file_name(self):
+        return self._file_name
+
+    def size(self):
+        return len(self.text)
+
+    def substr(self, region):
+        if isinstance(region, int):
+            return self.text[region : region + 1]
+        return self.text[region.begin() : region.end()]
+
+    def run_command(self, command, args=None):
+        if command == "append":
+            self.text += (args or {}).get("characters", "")
+            self._change_count += 1
+
+    def line(self, point):
+        start = self.text.rfind("\n", 0, point) + 1
+        end = self.text.find("\n", point)
+        return Region(start, len(self.text) if end < 0 else end)
+
+    def text_point(self, row, col):
+        lines = self.text.split("\n")
+        return sum(len(line) + 1 for line in lines[:row]) + col
+
+    def rowcol(self, point):
+        row = self.text.count("\n", 0, point)
+        return row, point - (self.text.rfind("\n", 0, point) + 1)
+
+    def visible_region(self):
+        return Region(0, len(self.text))
+
+    def change_count(self):
+        return self._change_count
+
+    def viewport_position(self):
+        return self._viewport
+
+    def set_viewport_position(self, xy, animate=True):
+        self._viewport = tuple(xy)
+
+    def match_selector(self, point, selector):
+        return bool(self._file_name and self._file_name.endswith(".tf"))
+
+    def set_status(self, key, value):
+        self.status[key] = value
+
+    def erase_status(self, key):
+        self.status.pop(key, None)
+
+    def set_read_only(self, read_only):
+        pass
+
+    def set_scratch(self, scratch):
+        pass
+
+
+class Window:
+    """Window that records quick panels and commands instead of showing them"""
+
+    def __init__(self, folders=None):
+        self._folders = list(folders or [])
+        self.quick_panels = []
+        self.commands = []
+        self.panels = {}
+        self.on_quick_panel = None
+
+    def folders(self):
+        return list(self._folders)
+
+    def views(self):
+        return []
+
+    def active_view(self):
+        return None
+
+    def show_quick_panel(self, items, on_select, flags=0, selected_index=-1, **kwargs):
+        panel = dict(kwargs, items=items, on_select=on_select, time=time.monotonic())
+        self.quick_panels.append(panel)
+        if self.on_quick_panel:
+            self.on_quick_panel(panel)
+
+    def show_input_panel(self, caption, initial_text, on_done, on_change, on_cancel):
+        return View(self)
+
+    def create_output_panel(self, name):
+        panel = self.panels.setdefault(name, View(self, name))
+        return panel
+
+    def find_output_panel(self, name):
+        return self.panels.get(name)
+
+    def run_command(self, command, args=None):
+        self.commands.append((command, args))
+
+    def status_message(self, message):
+        status_message(message)
+
+
+class _UIThread:
+    """Runs set_timeout callbacks one at a time, in due order"""
+
+    def __init__(self):
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._busy = False
+        self._thread = threading.Thread(
+            target=self._run, name="sublime-ui", daemon=True
+        )
+        self._thread.start()
+
+    def schedule(self, callback, delay):
+        with self._condition:
+            due = time.monotonic() + delay / 1000
+            heapq.heappush(self._queue, (due, next(self._counter), callback))
+            self._condition.notify()
+
+    def wait_idle(self, timeout=10):
+        """Wait until no callback is due or running"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._busy or (self._queue and self._queue[0][0] <= time.monotonic()):
+                if time.monotonic() > deadline:
+                    return False
+                self._condition.wait(0.01)
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue or self._queue[0][0] > time.monotonic():
+                    timeout = (
+                        self._queue[0][0] - time.monotonic() if self._queue else None
+                    )
+                    self._condition.wait(timeout)
+                _, _, callback = heapq.heappop(self._queue)
+                self._busy = True
+            try:
+                callback()
+            except Exception as e:
+                print(f"Exception in set_timeout callback: {e!r}")
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+
+_ui_thread = _UIThread()
+
+
+def set_timeout(callback, delay=0):
+    _ui_thread.schedule(callback, delay)
+
+
+def set_timeout_async(callback, delay=0):
+    threading.Timer(delay / 1000, callback).start()
+
+
+def wait_for_ui(timeout=10):
+    """Test helper: wait for pending UI callbacks to run"""
+    return _ui_thread.wait_idle(timeout)
+
+
+def load_settings(name):
+    return _settings.setdefault(name, Settings())
+
+
+def save_settings(name):
+    pass
+
+
+def status_message(message):
+    _status_messages.append(message)
+
+
+def error_message(message):
+    _status_messages.append(f"error: {message}")
+
+
+def ok_cancel_dialog(message, ok_title=""):
+    return True
+
+
+def set_clipboard(text):
+    pass
+
+
+def windows():
+    return list(_windows)
+
+
+def active_window():
+    return _windows[0] if _windows else Window()
+
+
+def cache_path():
+    return _cache_dir
+
+
+def packages_path():
+    return os.path.join(_cache_dir, "Packages")
+
+
+def platform():
+    return {"win32": "windows", "darwin": "osx"}.get(sys.platform, "linux")
+
+
+def arch():
+    return "x64"
+
+
+def version():
+    return "4169"
@@ -0,0 +1,42 @@
+"""
+Stand-in for the sublime_plugin module so the plugin can run outside Sublime Text
+"""
+
+
+class Command:
+    def is_enabled(self, *args, **kwargs):
+        return True
+
+    def is_visible(self, *args, **kwargs):
+        return True
+
+
+class ApplicationCommand(Command):
+    pass
+
+
+class WindowCommand(Command):
+    def __init__(self, window=None):
+        self.window = window
+
+
+class TextCommand(Command):
+    def __init__(self, view=None):
+        self.view = view
+
+
+class EventListener:
+    pass
+
+
+class ViewEventListener:
+    def __init__(self, view=None):
+        self.view = view
+
+
+class TextInputHandler:
+    pass
+
+
+class ListInputHandler:
+    pass
@@ -0,0 +1,59 @@
+"""
+Helpers to load the plugin outside Sublime Text
+"""
+
+import importlib
+import os
+import sys
+import time
+import types
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_DIR = os.path.dirname(TESTS_DIR)
+STUBS_DIR = os.path.join(TESTS_DIR, "stubs")
+
+# Name the plugin package is imported as, like Sublime Text does
+PACKAGE_NAME = "Terraform"
+
+
+def install_stubs():
+    """Make the sublime and sublime_plugin stand-ins importable"""
+    if STUBS_DIR not in sys.path:
+        sys.path.insert(0, STUBS_DIR)
+
+
+install_stubs()
+
+import sublime  # noqa: E402
+
+
+def load_plugin_module(name):
+    """Import a plugin module, e.g. load_plugin_module("cloud.terraform_cloud")"""
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [PLUGIN_DIR]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+def load_default_settings():
+    """Fill the plugin settings with their defaults"""
+    terraform_settings = load_plugin_module("terraform_settings")
+    settings = sublime.load_settings(terraform_settings.TerraformSettings.SETTINGS_FILE)
+    for key, value in terraform_settings.DEFAULT_SETTINGS.items():
+        settings.set(key, value)
+
+
+def set_setting(key, value):
+    """Set a plugin setting"""
+    sublime.load_settings("Terraform.sublime-settings").set(key, value)
+
+
+def wait_until(predicate, timeout=10, interval=0.005):
+    """Wait until predicate() is true, returning whether it became true"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return predicate()
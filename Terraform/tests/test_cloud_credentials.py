@@ -0,0 +1,151 @@
+"""
+Tests for resolving Terraform Cloud / Enterprise API tokens
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from support import load_default_settings, load_plugin_module
+
+credentials = load_plugin_module("cloud.terraform_cloud_credentials")
+terraform_settings = load_plugin_module("terraform_settings")
+
+
+class CredentialsTestCase(unittest.TestCase):
+    """Start every test without TF_TOKEN_ variables or credentials"""
+
+    def setUp(self):
+        load_default_settings()
+        self.addCleanup(load_default_settings)
+        self.addCleanup(terraform_settings.unload_settings_snapshot)
+
+        environ = {
+            name: value
+            for name, value in os.environ.items()
+            if not name.startswith("TF_TOKEN_")
+        }
+        patcher = mock.patch.dict(os.environ, environ, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "credentials.tfrc.json")
+        self.resolver = credentials.TerraformCredentialsResolver(self.path)
+        patcher = mock.patch.object(credentials, "_credentials_resolver", self.resolver)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_credentials(self, tokens, mtime_ns=None):
+        with open(self.path, "w") as f:
+            json.dump(
+                {"credentials": {host: {"token": t} for host, t in tokens.items()}}, f
+            )
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def set_setting(self, key, value):
+        terraform_settings.get_settings().set(key, value)
+
+
+class TestTokenVariables(CredentialsTestCase):
+    """TF_TOKEN_<host> environment variables"""
+
+    def test_hostnames_are_encoded_like_the_cli(self):
+        self.assertEqual(
+            credentials.encode_token_variable("app.terraform.io"),
+            "TF_TOKEN_app_terraform_io",
+        )
+        self.assertEqual(
+            credentials.encode_token_variable("tfe.my-company.example"),
+            "TF_TOKEN_tfe_my__company_example",
+        )
+        self.assertEqual(
+            credentials.decode_token_variable("TF_TOKEN_TFE_my__company_example"),
+            "tfe.my-company.example",
+        )
+
+    def test_tokens_are_read_from_the_environment(self):
+        os.environ["TF_TOKEN_tfe_my__company_example"] = "encoded"
+        os.environ["TF_TOKEN_app_terraform_io"] = "cloud"
+
+        self.assertEqual(self.resolver.get_token("tfe.my-company.example"), "encoded")
+        self.assertEqual(self.resolver.get_token("APP.terraform.io"), "cloud")
+        self.assertIsNone(self.resolver.get_token("tfe.example.com"))
+
+    def test_hyphens_may_be_left_in_variable_names(self):
+        os.environ["TF_TOKEN_tfe_my-company_example"] = "hyphen"
+
+        self.assertEqual(self.resolver.get_token("tfe.my-company.example"), "hyphen")
+
+
+class TestCredentialsFile(CredentialsTestCase):
+    """The credentials.tfrc.json file written by terraform login"""
+
+    def test_tokens_are_read_from_the_file(self):
+        self.write_credentials({"App.Terraform.io": "from-file"})
+
+        self.assertEqual(self.resolver.get_token("app.terraform.io"), "from-file")
+        self.assertIsNone(self.resolver.get_token("tfe.example.com"))
+
+    def test_file_is_read_again_only_when_it_changes(self):
+        self.write_credentials({"app.terraform.io": "first"}, mtime_ns=10**18)
+        self.assertEqual(self.resolver.get_token(), "first")
+
+        with mock.patch("builtins.open", side_effect=AssertionError("read again")):
+            self.assertEqual(self.resolver.get_token(), "first")
+
+        self.write_credentials({"app.terraform.io": "second"}, mtime_ns=2 * 10**18)
+        self.assertEqual(self.resolver.get_token(), "second")
+
+        os.remove(self.path)
+        self.assertIsNone(self.resolver.get_token())
+
+    def test_broken_files_have_no_tokens(self):
+        with open(self.path, "w") as f:
+            f.write("{not json")
+
+        self.assertEqual(self.resolver.get_credentials(), {})
+
+
+class TestTokenPrecedence(CredentialsTestCase):
+    """Picking a token when several sources have one"""
+
+    def test_environment_then_file_then_settings(self):
+        self.set_setting("terraform_cloud.token", "from-settings")
+        self.assertEqual(credentials.resolve_token(), "from-settings")
+
+        self.write_credentials({"app.terraform.io": "from-file"})
+        self.assertEqual(credentials.resolve_token(), "from-file")
+
+        os.environ["TF_TOKEN_app_terraform_io"] = "from-env"
+        self.assertEqual(credentials.resolve_token(), "from-env")
+
+    def test_tokens_are_looked_up_for_the_configured_host(self):
+        self.write_credentials(
+            {"app.terraform.io": "cloud", "tfe.example.com": "enterprise"}
+        )
+        self.assertEqual(credentials.resolve_token(), "cloud")
+
+        self.set_setting("terraform_cloud.hostname", "tfe.example.com")
+
+        self.assertEqual(credentials.get_default_hostname(), "tfe.example.com")
+        self.assertEqual(credentials.resolve_token(), "enterprise")
+        self.assertEqual(credentials.resolve_token("app.terraform.io"), "cloud")
+
+    def test_hostnames_with_credentials(self):
+        self.write_credentials({"tfe.example.com": "enterprise"})
+        os.environ["TF_TOKEN_app_terraform_io"] = "cloud"
+        os.environ["TF_TOKEN_empty_example_com"] = ""
+
+        self.assertEqual(
+            self.resolver.get_hostnames(), ["app.terraform.io", "tfe.example.com"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
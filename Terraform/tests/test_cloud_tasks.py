@@ -0,0 +1,238 @@
+"""
+Tests for the background task layer of the Terraform Cloud commands
+"""
+
+import threading
+import unittest
+from unittest import mock
+
+from support import load_plugin_module, sublime, wait_until
+
+terraform_cloud = load_plugin_module("cloud.terraform_cloud")
+
+
+class Recorder:
+    """Callback recording its calls and the thread they ran on"""
+
+    def __init__(self):
+        self.calls = []
+        self.called = threading.Event()
+
+    def __call__(self, value):
+        self.calls.append((value, threading.current_thread().name))
+        self.called.set()
+
+
+class TestCloudTask(unittest.TestCase):
+    """Running API calls off the UI thread"""
+
+    def test_results_are_delivered_on_the_ui_thread(self):
+        on_done = Recorder()
+        terraform_cloud.run_cloud_task(
+            lambda task: threading.current_thread().name, on_done=on_done
+        )
+
+        self.assertTrue(on_done.called.wait(5))
+        [(worker, ui_thread)] = on_done.calls
+        self.assertTrue(worker.startswith("terraform-cloud"))
+        self.assertEqual(ui_thread, "sublime-ui")
+
+    def test_errors_are_delivered_on_the_ui_thread(self):
+        on_done = Recorder()
+        on_error = Recorder()
+
+        def fail(task):
+            raise terraform_cloud.TerraformCloudAPIError(500, "boom")
+
+        terraform_cloud.run_cloud_task(fail, on_done=on_done, on_error=on_error)
+
+        self.assertTrue(on_error.called.wait(5))
+        [(error, ui_thread)] = on_error.calls
+        self.assertEqual(error.status, 500)
+        self.assertEqual(ui_thread, "sublime-ui")
+        self.assertEqual(on_done.calls, [])
+
+    def test_cancelled_tasks_drop_their_result(self):
+        started = threading.Event()
+        release = threading.Event()
+        on_done = Recorder()
+
+        def fetch(task):
+            started.set()
+            release.wait(5)
+            return "result"
+
+        task = terraform_cloud.run_cloud_task(fetch, on_done=on_done, message="x")
+        self.assertTrue(started.wait(5))
+        task.cancel()
+        release.set()
+
+        self.assertTrue(wait_until(task.future.done))
+        self.assertTrue(sublime.wait_for_ui())
+        self.assertEqual(on_done.calls, [])
+        self.assertNotIn(task, terraform_cloud._loading_indicator.tasks)
+
+    def test_cancelled_tasks_stop_between_requests(self):
+        requests = []
+        started = threading.Event()
+
+        def fetch(task):
+            while not task.cancelled:
+                requests.append(len(requests))
+                started.set()
+                threading.Event().wait(0.01)
+            return requests
+
+        task = terraform_cloud.run_cloud_task(fetch)
+        self.assertTrue(started.wait(5))
+        task.cancel()
+
+        self.assertTrue(wait_until(task.future.done))
+        self.assertLess(len(requests), 100)
+
+    def test_streaming_a_run_log_supersedes_the_earlier_one(self):
+        class StreamingAPI:
+            def iter_plan_log(self, plan_id, task):
+                while not task.cancelled:
+                    yield plan_id
+                    threading.Event().wait(0.01)
+
+        run = {"relationships": {"plan": {"data": {"id": "plan-1"}}}}
+        command = terraform_cloud.TerraformCloudShowRunsCommand(sublime.Window())
+        panel = sublime.View()
+        self.addCleanup(setattr, terraform_cloud, "_log_task", None)
+
+        with mock.patch.object(
+            terraform_cloud, "get_cloud_api", return_value=StreamingAPI()
+        ):
+            command.stream_run_logs(run, panel)
+            first = terraform_cloud._log_task
+            command.stream_run_logs(run, panel)
+            second = terraform_cloud._log_task
+
+        self.assertTrue(first.cancelled)
+        self.assertTrue(wait_until(first.future.done))
+        self.assertFalse(second.cancelled)
+        second.cancel()
+        self.assertTrue(wait_until(second.future.done))
+
+
+class TestProgressivePanel(unittest.TestCase):
+    """Re-rendering quick panels as pages arrive"""
+
+    def setUp(self):
+        self.window = sublime.Window()
+        self.selected = []
+        self.panel = terraform_cloud.TerraformCloudProgressivePanel(
+            self.window, lambda item: item["name"], self.selected.append
+        )
+        self.panel.REFRESH_INTERVAL = 0
+
+    def add_pages_from_worker(self, *pages):
+        def add():
+            for number, names in pages:
+                self.panel.add_page(number, [{"name": name} for name in names])
+            self.panel.finish()
+
+        worker = threading.Thread(target=add)
+        worker.start()
+        worker.join()
+        self.assertTrue(sublime.wait_for_ui())
+
+    def test_pages_are_shown_in_page_order_on_the_ui_thread(self):
+        threads = []
+        self.window.on_quick_panel = lambda panel: threads.append(
+            threading.current_thread().name
+        )
+
+        self.add_pages_from_worker((2, ["c", "d"]), (1, ["a", "b"]))
+
+        self.assertEqual(self.window.quick_panels[-1]["items"], ["a", "b", "c", "d"])
+        self.assertEqual(set(threads), {"sublime-ui"})
+        self.assertTrue(self.panel.finished)
+
+    def test_selections_in_superseded_renders_are_ignored(self):
+        self.add_pages_from_worker((1, ["a"]), (2, ["b"]))
+        first, last = self.window.quick_panels[0], self.window.quick_panels[-1]
+        self.assertIsNot(first, last)
+
+        # Re-rendering closes the earlier panel, which reports a cancel
+        first["on_select"](-1)
+        self.assertFalse(self.panel.closed)
+
+        last["on_select"](1)
+        self.assertEqual(self.selected, [{"name": "b"}])
+        self.assertTrue(self.panel.closed)
+
+    def test_closing_the_panel_cancels_its_task(self):
+        release = threading.Event()
+        task = terraform_cloud.run_cloud_task(lambda task: release.wait(5))
+        self.panel.on_cancel = task.cancel
+        self.add_pages_from_worker((1, ["a"]))
+
+        self.window.quick_panels[-1]["on_select"](-1)
+        release.set()
+
+        self.assertTrue(task.cancelled)
+        self.assertTrue(self.panel.closed)
+
+
+class RecordingPanel(sublime.View):
+    """Output panel recording the thread every append ran on"""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def run_command(self, command, args=None):
+        self.threads.append(threading.current_thread().name)
+        super().run_command(command, args)
+
+
+class TestPanelWriter(unittest.TestCase):
+    """Appending streamed log lines to an output panel"""
+
+    def test_lines_are_appended_in_order_on_the_ui_thread(self):
+        panel = RecordingPanel()
+        writer = terraform_cloud.TerraformCloudPanelWriter(panel)
+        writer.FLUSH_LINES = 2
+
+        def write():
+            writer.write("--- Plan log ---\n")
+            for n in range(5):
+                writer.write_line(f"line {n}")
+            writer.flush()
+
+        worker = threading.Thread(target=write)
+        worker.start()
+        worker.join()
+        self.assertTrue(sublime.wait_for_ui())
+
+        self.assertEqual(
+            panel.text, "--- Plan log ---\n" + "".join(f"line {n}\n" for n in range(5))
+        )
+        self.assertEqual(set(panel.threads), {"sublime-ui"})
+
+    def test_cancelled_writers_append_nothing_more(self):
+        panel = sublime.View()
+        task = terraform_cloud.TerraformCloudTask(None)
+        writer = terraform_cloud.TerraformCloudPanelWriter(panel, task)
+        writer.FLUSH_LINES = 1
+        writer.write_line("before")
+        self.assertTrue(sublime.wait_for_ui())
+
+        # Appends already handed to the UI thread are dropped too
+        release = threading.Event()
+        sublime.set_timeout(lambda: release.wait(5))
+        writer.write_line("queued")
+        task.cancel()
+        release.set()
+        writer.write_line("after")
+        writer.flush()
+        self.assertTrue(sublime.wait_for_ui())
+
+        self.assertEqual(panel.text, "before\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Tests for the Terraform Cloud run watcher against the local mock server
+"""
+
+import unittest
+from unittest import mock
+
+from mock_cloud_server import MockTerraformCloudServer
+from support import load_plugin_module, sublime, wait_until
+from test_cloud_api import make_api
+
+watcher_module = load_plugin_module("cloud.terraform_cloud_watcher")
+
+HOSTNAME = "app.terraform.test"
+
+ORGANIZATION = "example-org"
+
+
+class TestRunWatcher(unittest.TestCase):
+    """Polling watched runs and workspaces"""
+
+    def start_server(self, **kwargs):
+        self.server = MockTerraformCloudServer(**kwargs).start()
+        self.addCleanup(self.server.stop)
+        patcher = mock.patch.object(
+            watcher_module,
+            "get_cloud_api",
+            return_value=make_api(self, self.server, cache=False),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.watcher = watcher_module.TerraformCloudRunWatcher()
+        self.addCleanup(self.watcher.stop)
+
+    def make_target(self, workspace, kind="workspace", run=None):
+        name = workspace["attributes"]["name"]
+        return watcher_module.TerraformCloudWatchTarget(
+            kind,
+            run["id"] if run else workspace["id"],
+            name,
+            workspace["id"],
+            name,
+            HOSTNAME,
+            ORGANIZATION,
+            self.server.token,
+        )
+
+    def poll(self, targets):
+        self.watcher._poll_organization(
+            HOSTNAME, ORGANIZATION, self.server.token, targets
+        )
+
+    def test_every_watched_workspace_gets_its_latest_run(self):
+        self.start_server(workspaces=60, runs_per_workspace=5)
+        workspaces = self.server.workspaces[ORGANIZATION][:50]
+        targets = [self.make_target(ws) for ws in workspaces]
+
+        self.poll(targets)
+
+        for target in targets:
+            latest = self.server.workspace_runs[target.workspace_id][0]
+            self.assertEqual(target.run_id, latest["id"], target.name)
+            self.assertEqual(target.status, latest["attributes"]["status"])
+        # Two batches of 25 workspaces, both needing a second page of runs
+        self.assertEqual(self.server.routes["organization_runs"], 4)
+
+    def test_workspaces_without_runs_stop_at_the_last_page(self):
+        self.start_server(workspaces=3, runs_per_workspace=0)
+        targets = [self.make_target(ws) for ws in self.server.workspaces[ORGANIZATION]]
+
+        self.poll(targets)
+
+        self.assertEqual(self.server.routes["organization_runs"], 1)
+        self.assertEqual([target.status for target in targets], [None] * 3)
+
+    def test_workspaces_without_runs_are_looked_up_on_their_own(self):
+        self.start_server(workspaces=3, runs_per_workspace=150)
+        workspaces = self.server.workspaces[ORGANIZATION]
+        self.server.workspace_runs[workspaces[2]["id"]].clear()
+        targets = [self.make_target(ws) for ws in workspaces]
+
+        self.poll(targets)
+
+        # Two pages find the busy workspaces, the third would be wasted
+        self.assertEqual(self.server.routes["organization_runs"], 2)
+        self.assertEqual(self.server.routes["workspace_runs"], 1)
+        self.assertEqual(
+            [target.status is not None for target in targets], [True, True, False]
+        )
+
+    def test_finished_runs_are_reported_and_dropped(self):
+        self.start_server(workspaces=5, runs_per_workspace=2)
+        workspace = self.server.workspaces[ORGANIZATION][3]
+        run = self.server.workspace_runs[workspace["id"]][0]
+        run["attributes"]["status"] = "planning"
+        target = self.make_target(workspace, "run", run)
+        self.watcher._targets[target.key] = target
+
+        self.poll([target])
+        self.assertEqual(target.status, "planning")
+        self.assertEqual(target.interval, self.watcher.ACTIVE_INTERVAL)
+
+        run["attributes"]["status"] = "applied"
+        self.poll([target])
+
+        self.assertEqual(self.watcher.get_targets(), [])
+        self.assertTrue(sublime.wait_for_ui())
+        self.assertIn(
+            "Terraform Cloud: workspace-00003 run planning → applied",
+            sublime._status_messages,
+        )
+
+    def test_new_targets_are_polled_right_away(self):
+        self.start_server(workspaces=5)
+        workspace = self.server.workspaces[ORGANIZATION][1]
+
+        self.watcher.watch_workspace(
+            workspace, HOSTNAME, ORGANIZATION, self.server.token
+        )
+
+        (target,) = self.watcher.get_targets()
+        self.assertTrue(wait_until(lambda: target.status is not None))
+        self.assertEqual(
+            target.run_id, self.server.workspace_runs[workspace["id"]][0]["id"]
+        )
+        self.assertGreater(target.next_poll, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,275 @@
+"""
+Tests for completions from the cached provider schemas
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from support import load_default_settings, load_plugin_module, sublime, wait_until
+
+terraform_completions = load_plugin_module("terraform_completions")
+terraform_schema = load_plugin_module("terraform_schema")
+terraform_settings = load_plugin_module("terraform_settings")
+
+AWS = "registry.terraform.io/hashicorp/aws"
+
+
+def make_raw_schema(extra_types=0):
+    """Get a providers schema -json document with an aws provider"""
+    bucket = {
+        "attributes": {
+            "bucket": {"type": "string", "required": True},
+            "tags": {"type": ["map", "string"], "optional": True},
+            "arn": {"type": "string", "computed": True},
+            "acl": {"type": "string", "optional": True, "deprecated": True},
+        },
+        "block_types": {
+            "rule": {
+                "nesting_mode": "list",
+                "block": {
+                    "attributes": {"id": {"type": "string", "optional": True}},
+                    "block_types": {
+                        "filter": {
+                            "nesting_mode": "single",
+                            "block": {
+                                "attributes": {
+                                    "prefix": {"type": "string", "optional": True}
+                                }
+                            },
+                        }
+                    },
+                },
+            }
+        },
+    }
+    resources = {"aws_s3_bucket": {"block": bucket}}
+    resources["aws_s3_object"] = {"block": {}}
+    resources["aws_instance"] = {"block": {}}
+    for i in range(extra_types):
+        resources[f"aws_generated_{i:04d}"] = {"block": {}}
+    return {
+        "provider_schemas": {
+            AWS: {
+                "provider": {
+                    "block": {
+                        "attributes": {"region": {"type": "string", "optional": True}}
+                    }
+                },
+                "resource_schemas": resources,
+                "data_source_schemas": {"aws_region": {"block": {}}},
+            }
+        }
+    }
+
+
+def make_schemas(folder, extra_types=0):
+    """Cache a schema under a fake lock hash and load its index"""
+    cache = terraform_schema.TerraformSchemaCache(os.path.join(folder, "cache"))
+    schema_dir = cache.get_schema_dir("lockhash")
+    os.makedirs(schema_dir)
+    raw_path = os.path.join(schema_dir, "raw.json")
+    with open(raw_path, "w") as f:
+        json.dump(make_raw_schema(extra_types), f)
+    cache._write_providers(raw_path, schema_dir)
+    return cache, cache._load_index("lockhash")
+
+
+def context(text):
+    view = sublime.View(text=text)
+    return terraform_completions.get_completion_context(view, len(text))
+
+
+def triggers(items):
+    return [item.trigger for item in items]
+
+
+class TestCompletionContext(unittest.TestCase):
+    """Finding what is being completed from the text before the cursor"""
+
+    def test_types_in_block_headers(self):
+        self.assertEqual(context('resource "aws_s3'), ("type", "resource", "aws_s3"))
+        self.assertEqual(context('data "'), ("type", "data", ""))
+
+    def test_nested_blocks_are_found(self):
+        text = (
+            'resource "aws_s3_bucket" "a" {\n  bucket = "x"\n}\n\n'
+            'resource "aws_s3_bucket" "b" {\n'
+            '  bucket = "${var.name}-{}" # }\n'
+            "  /* { */\n"
+            "  rule {\n"
+            "    filter {\n"
+            "    }\n"
+            "    "
+        )
+        self.assertEqual(
+            context(text),
+            ("body", (("resource", ("aws_s3_bucket", "b")), ("rule", ())), ""),
+        )
+
+    def test_object_values_are_not_blocks(self):
+        headers = context('resource "aws_s3_bucket" "b" {\n  tags = {\n    Na')[1]
+        self.assertEqual(headers[-1], (None, ()))
+
+    def test_values_are_not_completed(self):
+        self.assertIsNone(context('resource "aws_s3_bucket" "b" {\n  bucket = "x'))
+        self.assertIsNone(context("variable"))
+
+
+class TestSchemaCompletions(unittest.TestCase):
+    """Building completions from a provider schema"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.cache, self.schemas = make_schemas(self.folder, extra_types=1400)
+
+    def complete(self, text, deadline=None):
+        return terraform_completions.build_completions(
+            self.schemas, context(text), deadline
+        )
+
+    def test_types_are_found_by_prefix(self):
+        items, complete = self.complete('resource "aws_s3')
+
+        self.assertEqual(triggers(items), ["aws_s3_bucket", "aws_s3_object"])
+        self.assertEqual(items[0].annotation, "aws")
+        self.assertTrue(complete)
+
+    def test_long_lists_are_incomplete(self):
+        items, complete = self.complete('resource "aws_')
+
+        self.assertEqual(len(items), terraform_completions.MAX_COMPLETIONS)
+        self.assertFalse(complete)
+
+    def test_lists_are_cut_at_the_deadline(self):
+        items, complete = self.complete('resource "aws_', time.perf_counter() - 1)
+
+        self.assertEqual(len(items), terraform_completions.BUDGET_CHECK_INTERVAL)
+        self.assertFalse(complete)
+
+    def test_block_attributes_and_nested_blocks(self):
+        items, complete = self.complete('resource "aws_s3_bucket" "b" {\n  ')
+
+        self.assertEqual(triggers(items), ["bucket", "tags", "rule"])
+        self.assertEqual(items[0].annotation, "string, required")
+        self.assertEqual(items[0].completion, "bucket = ")
+        self.assertEqual(items[2].completion_format, sublime.COMPLETION_FORMAT_SNIPPET)
+
+    def test_dynamic_block_content(self):
+        items, _ = self.complete(
+            'resource "aws_s3_bucket" "b" {\n'
+            '  dynamic "rule" {\n'
+            "    content {\n"
+            "      filter {\n"
+            "        "
+        )
+        self.assertEqual(triggers(items), ["prefix"])
+
+    def test_provider_block(self):
+        items, _ = self.complete('provider "aws" {\n  ')
+        self.assertEqual(triggers(items), ["region"])
+
+    def test_unknown_blocks_have_no_completions(self):
+        self.assertEqual(
+            self.complete('resource "aws_s3_bucket" "b" {\n  lifecycle {\n'), ([], True)
+        )
+        self.assertEqual(self.complete('resource "google_thing" "b" {\n  '), ([], True))
+
+
+class TestSchemaCompletionListener(unittest.TestCase):
+    """Answering on_query_completions"""
+
+    def setUp(self):
+        load_default_settings()
+        self.addCleanup(load_default_settings)
+        self.addCleanup(terraform_settings.unload_settings_snapshot)
+
+        self.folder = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.cache, self.schemas = make_schemas(self.folder)
+        with open(os.path.join(self.folder, ".terraform.lock.hcl"), "w") as f:
+            f.write("# providers\n")
+
+        self.lookups = []
+
+        def get_provider_schemas(root_path):
+            self.lookups.append(root_path)
+            return self.schemas
+
+        patcher = mock.patch.object(
+            terraform_completions, "get_provider_schemas", get_provider_schemas
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(terraform_completions._view_schemas.clear)
+        self.listener = terraform_completions.TerraformSchemaCompletionListener()
+
+    def make_view(self, text, name="main.tf"):
+        return sublime.View(text=text, file_name=os.path.join(self.folder, name))
+
+    def query(self, text, view=None):
+        view = view or self.make_view(text)
+        return self.listener.on_query_completions(view, "", [len(text)])
+
+    def test_types_are_answered_from_the_index(self):
+        completions = self.query('resource "aws_s3')
+
+        self.assertEqual(
+            triggers(completions.completions), ["aws_s3_bucket", "aws_s3_object"]
+        )
+        self.assertEqual(len(self.cache._providers), 0)
+
+    def test_provider_is_loaded_in_background(self):
+        text = 'resource "aws_s3_bucket" "b" {\n  '
+        completions = self.query(text)
+
+        self.assertTrue(completions.done.wait(5))
+        self.assertIn("bucket", triggers(completions.completions))
+        self.assertEqual(len(self.cache._providers), 1)
+
+        completions = self.query(text)
+        self.assertIn("bucket", triggers(completions.completions))
+
+    def test_schemas_are_looked_up_once_per_view(self):
+        view = self.make_view('resource "aws_s3')
+
+        for _ in range(3):
+            completions = self.query('resource "aws_s3', view)
+            self.assertEqual(len(completions.completions), 2)
+
+        self.assertEqual(self.lookups, [self.folder])
+
+    def test_stale_schemas_are_looked_up_in_the_background(self):
+        view = self.make_view('resource "aws_s3')
+        self.query('resource "aws_s3', view)
+        root_path, schemas, _ = terraform_completions._view_schemas[view.id()]
+        terraform_completions._view_schemas[view.id()] = (root_path, schemas, 0)
+
+        self.assertEqual(len(self.query('resource "aws_s3', view).completions), 2)
+
+        self.assertTrue(wait_until(lambda: len(self.lookups) == 2))
+        self.query('resource "aws_s3', view)
+        self.assertEqual(len(self.lookups), 2)
+
+    def test_saving_the_lock_file_forgets_the_schemas(self):
+        view = self.make_view('resource "aws_s3')
+        self.query('resource "aws_s3', view)
+
+        self.listener.on_post_save_async(self.make_view("", ".terraform.lock.hcl"))
+        self.assertNotIn(view.id(), terraform_completions._view_schemas)
+
+        self.query('resource "aws_s3', view)
+        self.listener.on_post_save_async(view)
+        self.assertEqual(len(self.lookups), 3)
+
+        self.listener.on_close(view)
+        self.assertEqual(terraform_completions._view_schemas, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for the lazily loaded cloud commands
+"""
+
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+from support import PACKAGE_NAME, TESTS_DIR, load_plugin_module, sublime
+
+terraform_cloud_commands = load_plugin_module("terraform_cloud_commands")
+
+# Script that loads every root module like Sublime Text does and prints the
+# plugin modules that got imported
+LOAD_PLUGIN_SCRIPT = """
+import glob, os, sys
+from support import PLUGIN_DIR, load_plugin_module
+for path in sorted(glob.glob(os.path.join(PLUGIN_DIR, "*.py"))):
+    load_plugin_module(os.path.splitext(os.path.basename(path))[0])
+print("\\n".join(sorted(name for name in sys.modules if name.startswith("{}."))))
+"""
+
+
+def cloud_modules():
+    """Get the imported modules of the cloud package"""
+    return [name for name in sys.modules if name.startswith(f"{PACKAGE_NAME}.cloud")]
+
+
+class TestLazyLoading(unittest.TestCase):
+    """Importing the cloud client only when a cloud command runs"""
+
+    def test_loading_the_plugin_does_not_import_the_cloud_client(self):
+        output = subprocess.run(
+            [sys.executable, "-c", LOAD_PLUGIN_SCRIPT.format(PACKAGE_NAME)],
+            cwd=TESTS_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+
+        self.assertIn(f"{PACKAGE_NAME}.plugin", output)
+        self.assertIn(f"{PACKAGE_NAME}.terraform_lsp", output)
+        self.assertFalse([name for name in output if ".cloud" in name], output)
+
+    def test_commands_are_disabled_until_the_client_is_loaded(self):
+        window = sublime.Window()
+        with mock.patch.dict(sys.modules):
+            for name in cloud_modules():
+                del sys.modules[name]
+
+            show_runs = terraform_cloud_commands.TerraformCloudShowRunsCommand(window)
+            login = terraform_cloud_commands.TerraformCloudLoginCommand(window)
+
+            self.assertFalse(show_runs.is_enabled())
+            self.assertTrue(login.is_enabled())
+            self.assertEqual(cloud_modules(), [])
+
+    def test_commands_forward_to_the_implementation(self):
+        window = sublime.Window()
+        command = terraform_cloud_commands.TerraformCloudShowWatchedCommand(window)
+        command.run()
+
+        watcher = load_plugin_module("cloud.terraform_cloud_watcher")
+        self.addCleanup(watcher.stop_run_watcher)
+        self.assertEqual(command.get_command().__module__, watcher.__name__)
+        self.assertEqual(sublime._status_messages[-1], "Nothing is being watched")
+        unwatch = terraform_cloud_commands.TerraformCloudUnwatchAllCommand(window)
+        self.assertFalse(unwatch.is_enabled())
+
+    def test_unloading_forgets_the_cloud_package(self):
+        load_plugin_module("cloud.terraform_cloud")
+        with mock.patch.dict(sys.modules):
+            terraform_cloud_commands.unload_cloud()
+
+            self.assertEqual(cloud_modules(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Tests for the lock file parser and the providers panel
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import load_plugin_module
+
+terraform_lockfile = load_plugin_module("terraform_lockfile")
+terraform_module_explorer = load_plugin_module("terraform_module_explorer")
+
+LOCK_FILE = """\
+# This file is maintained automatically by "terraform init".
+# Manual edits may be lost in future updates.
+
+provider "registry.terraform.io/hashicorp/aws" {
+  version     = "5.31.0"
+  constraints = ">= 4.0.0, ~> 5.0"
+  hashes = [
+    "h1:ltxyuBWIy9cq0kIKDJH1jeWJy/y7XJLjS4QrsQK4plA=",
+    "zh:0cdb9c2083bf0902442384f7309367791e4640581652dda456f2d6d7abf0de8d",
+  ]
+}
+
+provider "example.com/acme/widgets" {
+  version = "0.1.0"
+  hashes  = []
+}
+"""
+
+VERSIONS_TF = """\
+terraform {
+  required_providers {
+    aws = {
+      source                = "hashicorp/aws"
+      version               = "~> 5.0"
+      configuration_aliases = [aws.east]
+    }
+    widgets = {
+      source = "example.com/acme/widgets"
+    }
+  }
+}
+
+provider "google" {}
+"""
+
+
+class TestLockFileParser(unittest.TestCase):
+    """Reading versions and hashes from .terraform.lock.hcl"""
+
+    def test_versions_and_hashes(self):
+        providers = terraform_lockfile.parse_lock_file(LOCK_FILE)
+
+        aws = providers["registry.terraform.io/hashicorp/aws"]
+        self.assertEqual(aws.version, "5.31.0")
+        self.assertEqual(aws.constraints, ">= 4.0.0, ~> 5.0")
+        self.assertEqual(len(aws.hashes), 2)
+        self.assertTrue(aws.hashes[1].startswith("zh:"))
+        self.assertEqual((aws.source, aws.name, aws.line), ("hashicorp/aws", "aws", 4))
+
+        widgets = providers["example.com/acme/widgets"]
+        self.assertEqual(widgets.source, "example.com/acme/widgets")
+        self.assertIsNone(widgets.constraints)
+        self.assertEqual(widgets.hashes, ())
+
+    def test_lock_files_are_parsed_again_when_changed(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        path = os.path.join(root, ".terraform.lock.hcl")
+        with open(path, "w") as f:
+            f.write(LOCK_FILE)
+        cache = terraform_lockfile.TerraformLockFileCache()
+
+        providers = cache.get_providers(root)
+        self.assertIs(cache.get_providers(root), providers)
+
+        with open(path, "w") as f:
+            f.write(LOCK_FILE.replace("5.31.0", "5.32.1"))
+        os.utime(path, ns=(1, 1))
+        aws = cache.get_providers(root)["registry.terraform.io/hashicorp/aws"]
+        self.assertEqual(aws.version, "5.32.1")
+
+        os.remove(path)
+        self.assertIsNone(cache.get_providers(root))
+
+
+class TestFindProviders(unittest.TestCase):
+    """Finding providers in a buffer"""
+
+    def test_providers_with_nested_braces(self):
+        providers = terraform_module_explorer.TerraformModuleParser.find_providers(
+            VERSIONS_TF
+        )
+
+        self.assertEqual(
+            providers,
+            [
+                {"name": "aws", "source": "hashicorp/aws", "version": "~> 5.0"},
+                {
+                    "name": "widgets",
+                    "source": "example.com/acme/widgets",
+                    "version": "latest",
+                },
+                {"name": "google", "source": "hashicorp/google", "version": "latest"},
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+"""
+Tests for scoping terraform-ls to the detected root modules
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import weakref
+from unittest import mock
+
+from support import load_default_settings, load_plugin_module, set_setting, sublime
+
+terraform_lsp = load_plugin_module("terraform_lsp")
+terraform_project = load_plugin_module("terraform_project")
+terraform_settings = load_plugin_module("terraform_settings")
+
+TerraformProjectDetector = terraform_project.TerraformProjectDetector
+
+
+class DottedDict:
+    """Stand-in for LSP's DottedDict"""
+
+    def __init__(self):
+        self.values = {}
+
+    def set(self, path, value):
+        *parents, name = path.split(".")
+        target = self.values
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[name] = value
+
+    def get(self, path=None):
+        value = self.values
+        for part in path.split(".") if path else ():
+            value = value[part]
+        return value
+
+
+class WorkspaceFolder:
+    def __init__(self, path):
+        self.path = path
+
+
+class ClientConfig:
+    def __init__(self):
+        self.init_options = DottedDict()
+        self.settings = DottedDict()
+
+
+class Session:
+    def __init__(self, folders):
+        self.config = ClientConfig()
+        self.folders = [WorkspaceFolder(folder) for folder in folders]
+        self.notifications = []
+
+    def get_workspace_folders(self):
+        return self.folders
+
+    def send_notification(self, notification):
+        self.notifications.append(notification)
+
+
+def write(path, content=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class TestIndexingScope(unittest.TestCase):
+    """Passing the detected projects to terraform-ls"""
+
+    def setUp(self):
+        load_default_settings()
+        self.addCleanup(load_default_settings)
+        self.addCleanup(terraform_settings.unload_settings_snapshot)
+        self.addCleanup(TerraformProjectDetector.cleanup)
+
+        self.folder = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.folder)
+        write(os.path.join(self.folder, ".gitignore"), "vendor/\n")
+        for stack in ("app", "db"):
+            write(os.path.join(self.folder, "stacks", stack, "main.tf"))
+            write(os.path.join(self.folder, "stacks", stack, ".terraform.lock.hcl"))
+        write(os.path.join(self.folder, "stacks", "app", ".terraform", "x.json"))
+        write(os.path.join(self.folder, "vendor", "module", "main.tf"))
+        write(os.path.join(self.folder, "examples", "basic", "main.tf"))
+        set_setting("exclude_root_modules", ["examples/*"])
+        self.window = sublime.Window([self.folder])
+
+    def path(self, *parts):
+        return os.path.join(self.folder, *parts)
+
+    def test_server_starts_with_ignored_paths(self):
+        config = ClientConfig()
+        terraform_lsp.TerraformLSPPlugin.on_pre_start(
+            self.window, None, [WorkspaceFolder(self.folder)], config
+        )
+
+        self.assertEqual(
+            config.init_options.get("indexing.ignorePaths"),
+            [self.path("examples", "basic"), self.path("vendor")],
+        )
+        self.assertIn(
+            ".terraform", config.init_options.get("indexing.ignoreDirectoryNames")
+        )
+
+    def test_settings_list_root_modules(self):
+        TerraformProjectDetector.refresh_projects(self.window)
+        session = Session([self.folder])
+        plugin = terraform_lsp.TerraformLSPPlugin.__new__(
+            terraform_lsp.TerraformLSPPlugin
+        )
+        plugin.weaksession = weakref.ref(session)
+        plugin._scope = None
+        plugin._on_change_key = "test"
+        notification = mock.patch.object(
+            terraform_lsp, "Notification", lambda method, params: (method, params)
+        )
+        notification.start()
+        self.addCleanup(notification.stop)
+
+        plugin.update_configuration()
+        plugin.update_configuration()
+
+        self.assertEqual(
+            session.config.settings.get("terraform-ls.rootModulePaths"),
+            [self.path("stacks", "app"), self.path("stacks", "db")],
+        )
+        self.assertEqual(len(session.notifications), 1)
+        self.assertEqual(
+            session.notifications[0][0], "workspace/didChangeConfiguration"
+        )
+
+        write(self.path("stacks", "web", "main.tf"))
+        write(self.path("stacks", "web", "terraform.tfstate"), "{}")
+        TerraformProjectDetector.refresh_projects(self.window)
+        plugin.update_configuration()
+
+        self.assertEqual(len(session.notifications), 2)
+        self.assertIn(
+            self.path("stacks", "web"),
+            session.config.settings.get("terraform-ls.rootModulePaths"),
+        )
+
+    def test_refreshing_a_window_keeps_the_roots_of_other_windows(self):
+        other = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, other)
+        write(os.path.join(other, "network", "main.tf"))
+        write(os.path.join(other, "network", "terraform.tfstate"), "{}")
+        window_b = sublime.Window([other])
+
+        TerraformProjectDetector.refresh_projects(self.window)
+        roots, _ = TerraformProjectDetector.get_indexing_scope([self.folder])
+        terraform_lsp.TerraformLSPPlugin.on_pre_start(
+            window_b, None, [WorkspaceFolder(other)], ClientConfig()
+        )
+
+        self.assertEqual(
+            TerraformProjectDetector.get_indexing_scope([self.folder])[0], roots
+        )
+        self.assertEqual(
+            TerraformProjectDetector.get_indexing_scope([other])[0],
+            [os.path.join(other, "network")],
+        )
+        self.assertTrue(TerraformProjectDetector.has_refreshed([self.folder, other]))
+
+    def test_servers_only_walk_folders_not_walked_yet(self):
+        TerraformProjectDetector.refresh_projects(self.window)
+
+        with mock.patch.object(terraform_project, "walk_folder") as walk_folder:
+            terraform_lsp.TerraformLSPPlugin.on_pre_start(
+                self.window, None, [WorkspaceFolder(self.folder)], ClientConfig()
+            )
+
+        walk_folder.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Tests for tracing the messages exchanged with terraform-ls
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from support import load_default_settings, load_plugin_module, set_setting, sublime
+
+terraform_lsp_trace = load_plugin_module("terraform_lsp_trace")
+terraform_settings = load_plugin_module("terraform_settings")
+
+
+class TracerTestCase(unittest.TestCase):
+    """Start every test with a fresh tracer"""
+
+    def setUp(self):
+        load_default_settings()
+        self.addCleanup(load_default_settings)
+        self.addCleanup(terraform_settings.unload_settings_snapshot)
+        self.tracer = terraform_lsp_trace.TerraformLspTracer()
+        self.addCleanup(self.tracer.close_log)
+
+    def enable(self, **trace):
+        set_setting("language_server", {"trace": dict(enabled=True, **trace)})
+
+
+class TestLspTracer(TracerTestCase):
+    """Recording latency and payload sizes"""
+
+    def test_nothing_is_recorded_when_disabled(self):
+        self.tracer.on_request(1, 1, "textDocument/hover", {"line": 1})
+        self.tracer.on_response(1, 1, {"contents": "x"})
+
+        self.assertEqual(self.tracer.get_stats(), [])
+        self.assertIsNone(self.tracer.get_log_path())
+
+    def test_requests_are_matched_with_responses(self):
+        self.enable(log_size_mb=0)
+        self.tracer.on_request(1, 1, "textDocument/completion", {"line": 1})
+        self.tracer.on_request(1, 2, "textDocument/completion", {"line": 2})
+
+        stats = dict(self.tracer.get_stats())["textDocument/completion"]
+        self.assertEqual(stats["in_flight"], 2)
+        self.assertEqual(stats["requests"], 0)
+
+        self.tracer.on_response(1, 2, {"items": []})
+        self.tracer.on_response(1, 1, {"items": []})
+        self.tracer.on_response(1, 3, {"items": []})
+
+        stats = dict(self.tracer.get_stats())["textDocument/completion"]
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["max_in_flight"], 2)
+        self.assertEqual(stats["sent"], 2 * len('{"line":1}'))
+        self.assertEqual(stats["received"], 2 * len('{"items":[]}'))
+
+    def test_sessions_number_their_requests_on_their_own(self):
+        self.enable(log_size_mb=0)
+        self.tracer.on_request(1, 1, "textDocument/hover", {})
+        self.tracer.on_request(2, 1, "textDocument/completion", {})
+        self.tracer.on_response(2, 1, {"items": []})
+
+        stats = dict(self.tracer.get_stats())
+        self.assertEqual(stats["textDocument/completion"]["requests"], 1)
+        self.assertEqual(stats["textDocument/completion"]["in_flight"], 0)
+        self.assertEqual(stats["textDocument/hover"]["requests"], 0)
+        self.assertEqual(stats["textDocument/hover"]["in_flight"], 1)
+
+    def test_requests_of_ended_sessions_are_dropped(self):
+        self.enable(log_size_mb=0)
+        self.tracer.on_request(1, 1, "textDocument/hover", {})
+        self.tracer.on_request(2, 1, "textDocument/hover", {})
+
+        self.tracer.on_session_end(1)
+        self.tracer.on_response(1, 1, {})
+
+        stats = dict(self.tracer.get_stats())["textDocument/hover"]
+        self.assertEqual(stats["in_flight"], 1)
+        self.assertEqual(stats["requests"], 0)
+
+    def test_notifications_count_bytes_by_direction(self):
+        self.enable(log_size_mb=0)
+        self.tracer.on_notification(1, "send", "textDocument/didChange", {"a": 1})
+        self.tracer.on_notification(1, "recv", "window/logMessage", {"message": "hi"})
+
+        stats = dict(self.tracer.get_stats())
+        self.assertEqual(stats["textDocument/didChange"]["sent"], len('{"a":1}'))
+        self.assertEqual(stats["window/logMessage"]["received"], 16)
+        self.assertEqual(stats["window/logMessage"]["requests"], 0)
+
+    def test_messages_are_logged_as_json_lines(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        patcher = mock.patch.object(sublime, "cache_path", return_value=cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.enable()
+        self.tracer.on_request(1, "a", "textDocument/hover", {"line": 1})
+        self.tracer.on_response(1, "a", None)
+        log_path = self.tracer.get_log_path()
+        self.tracer.close_log()
+
+        self.assertEqual(
+            os.path.dirname(log_path), os.path.join(cache_dir, "Terraform")
+        )
+        with open(log_path) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([entry["dir"] for entry in entries], ["send", "recv"])
+        self.assertEqual(entries[0]["id"], "a")
+        self.assertEqual(entries[0]["session"], 1)
+        self.assertIn("ms", entries[1])
+
+
+class TestShowLspStats(TracerTestCase):
+    """The stats panel"""
+
+    def format_stats(self):
+        command = terraform_lsp_trace.TerraformShowLspStatsCommand(sublime.Window())
+        with mock.patch.object(terraform_lsp_trace, "_lsp_tracer", self.tracer):
+            return command.format_stats()
+
+    def test_disabled_tracing_is_explained(self):
+        self.assertIn("tracing is off", self.format_stats())
+
+    def test_stats_are_formatted_as_table(self):
+        self.enable(log_size_mb=0)
+        self.tracer.on_request(1, 1, "textDocument/hover", {})
+        self.tracer.on_response(1, 1, {})
+        self.tracer.on_notification(1, "send", "textDocument/didOpen", {})
+
+        lines = self.format_stats().splitlines()
+
+        self.assertTrue(lines[0].startswith("Method"))
+        self.assertTrue(lines[2].startswith("textDocument/hover"))
+        self.assertIn(" - ", lines[3])
+
+
+if __name__ == "__main__":
+    unittest.main()
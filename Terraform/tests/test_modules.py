@@ -0,0 +1,239 @@
+"""
+Tests for the installed module index
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import load_plugin_module, sublime
+
+terraform_module_explorer = load_plugin_module("terraform_module_explorer")
+terraform_modules = load_plugin_module("terraform_modules")
+
+MAIN_TF = """\
+module "network" {
+  source  = "terraform-aws-modules/vpc/aws"
+  version = "5.1.0"
+}
+
+output "vpc_id" {
+  value = module.network.vpc_id
+}
+"""
+
+
+class TestModuleIndex(unittest.TestCase):
+    """Resolving module calls from modules.json"""
+
+    def setUp(self):
+        self.root = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        self.vpc = self.write(
+            ".terraform/modules/network/main.tf", 'variable "cidr" {}'
+        )
+        self.write(
+            ".terraform/modules/network/outputs.tf",
+            'output "vpc_id" {\n  value = "x"\n}\n',
+        )
+        self.write(".terraform/modules/network/modules/subnets/main.tf", "")
+        self.write_manifest(
+            [
+                {"Key": "", "Source": "", "Dir": "."},
+                {
+                    "Key": "network",
+                    "Source": "registry.terraform.io/terraform-aws-modules/vpc/aws",
+                    "Version": "5.1.0",
+                    "Dir": ".terraform/modules/network",
+                },
+                {
+                    "Key": "network.subnets",
+                    "Source": "./modules/subnets",
+                    "Dir": ".terraform/modules/network/modules/subnets",
+                },
+            ]
+        )
+        self.index = terraform_modules.TerraformModuleIndex()
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def write_manifest(self, modules):
+        self.write(terraform_modules.MODULES_MANIFEST, json.dumps({"Modules": modules}))
+
+    def test_calls_resolve_to_their_installed_code(self):
+        network = self.index.resolve(self.root, "module.network")
+        subnets = self.index.resolve(self.root, "module.network.module.subnets")
+
+        self.assertEqual(network.version, "5.1.0")
+        self.assertEqual(network.dir, os.path.dirname(self.vpc))
+        self.assertEqual(subnets.key, "network.subnets")
+        self.assertIsNone(subnets.version)
+        self.assertIsNone(self.index.resolve(self.root, "module.missing"))
+
+    def test_caller_of_files_in_installed_code(self):
+        self.assertEqual(
+            self.index.get_caller_address(self.root, self.vpc), "module.network"
+        )
+        self.assertEqual(
+            self.index.get_caller_address(os.path.join(self.root, "x"), self.vpc), ""
+        )
+        self.assertEqual(
+            self.index.get_caller_address(
+                self.root, os.path.join(self.root, "main.tf")
+            ),
+            "",
+        )
+
+    def test_changed_manifest_is_read_again(self):
+        interface = self.index.get_interface(
+            self.index.resolve(self.root, "module.network").dir
+        )
+        self.assertEqual(list(interface.variables), ["cidr"])
+        self.assertEqual(interface.outputs["vpc_id"].line, 1)
+
+        self.write_manifest([{"Key": "db", "Source": "./db", "Dir": "db"}])
+        os.utime(
+            os.path.join(self.root, terraform_modules.MODULES_MANIFEST),
+            ns=(1, 1),
+        )
+
+        self.assertIsNone(self.index.resolve(self.root, "module.network"))
+        self.assertEqual(self.index.resolve(self.root, "module.db").source, "./db")
+        self.assertEqual(self.index._interfaces, {})
+
+    def test_module_call_under_the_cursor(self):
+        view = sublime.View(text=MAIN_TF, file_name=os.path.join(self.root, "main.tf"))
+
+        self.assertEqual(terraform_modules.find_module_call(view, 30), "network")
+        point = MAIN_TF.index("network.vpc_id")
+        self.assertEqual(terraform_modules.find_module_call(view, point), "network")
+        self.assertIsNone(
+            terraform_modules.find_module_call(view, MAIN_TF.index("value"))
+        )
+
+    def test_module_code_is_resolved_once(self):
+        view = sublime.View(text=MAIN_TF, file_name=os.path.join(self.root, "main.tf"))
+
+        module, directory, address = terraform_modules.find_module_code(view, "network")
+
+        self.assertEqual(module.version, "5.1.0")
+        self.assertEqual(directory, module.dir)
+        self.assertEqual(address, "module.network")
+
+    def test_module_hover_is_escaped(self):
+        module = self.index.resolve(self.root, "module.network")
+        module.version = "<5.1.0>"
+
+        content = terraform_module_explorer.format_module_hover_html(
+            'example/vpc/aws"><b>', module
+        )
+
+        self.assertIn("<code>example/vpc/aws&quot;&gt;&lt;b&gt;</code>", content)
+        self.assertIn("&lt;5.1.0&gt;", content)
+        self.assertIn(
+            'href="https://registry.terraform.io/modules/example/vpc/aws&quot;',
+            content,
+        )
+        self.assertIn("Not installed, run terraform init", content)
+
+
+VARIABLES_TF = """\
+variable "name" {
+  description = "Name of the \\"network\\""
+  type        = string
+}
+
+variable "subnets" {
+  type = map(object({
+    cidr = string # like 10.0.0.0/24
+  }))
+  default = {}
+
+  validation {
+    condition     = length(var.subnets) < 10
+    error_message = "Too many subnets."
+  }
+}
+
+variable "tags" {
+  default = { Team = "platform" } # merged into every resource
+}
+"""
+
+OUTPUTS_TF = """\
+output "id" {
+  description = <<-EOT
+    ID of the network.
+  EOT
+  value     = "x"
+  sensitive = true
+}
+"""
+
+
+class TestModuleInterface(unittest.TestCase):
+    """Reading the variables and outputs of a module directory"""
+
+    def setUp(self):
+        self.module = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.module, ignore_errors=True)
+        for name, content in (
+            ("variables.tf", VARIABLES_TF),
+            ("outputs.tf", OUTPUTS_TF),
+        ):
+            with open(os.path.join(self.module, name), "w") as f:
+                f.write(content)
+        self.index = terraform_modules.TerraformModuleIndex()
+
+    def test_variables_with_types_and_defaults(self):
+        variables = self.index.get_interface(self.module).variables
+
+        self.assertEqual(list(variables), ["name", "subnets", "tags"])
+        self.assertEqual(variables["name"].description, 'Name of the "network"')
+        self.assertTrue(variables["name"].required)
+        self.assertEqual(variables["subnets"].type, "map(object({ cidr = string }))")
+        self.assertEqual(variables["subnets"].default, "{}")
+        self.assertEqual(variables["tags"].type, "any")
+        self.assertEqual(variables["tags"].default, '{ Team = "platform" }')
+        self.assertEqual(variables["tags"].line, 18)
+
+    def test_outputs(self):
+        output = self.index.get_interface(self.module).outputs["id"]
+
+        self.assertEqual(output.description, "ID of the network.")
+        self.assertTrue(output.sensitive)
+
+    def test_interface_is_read_again_when_files_change(self):
+        interface = self.index.get_interface(self.module)
+        self.assertIs(self.index.get_interface(self.module), interface)
+
+        path = os.path.join(self.module, "outputs.tf")
+        with open(path, "a") as f:
+            f.write('output "arn" {\n  value = "y"\n}\n')
+        os.utime(path, ns=(1, 1))
+
+        self.assertEqual(
+            list(self.index.get_interface(self.module).outputs), ["id", "arn"]
+        )
+        shutil.rmtree(self.module)
+        self.assertIsNone(self.index.get_interface(self.module))
+
+    def test_interface_popup(self):
+        content = terraform_modules.format_interface_html(
+            self.index.get_interface(self.module)
+        )
+
+        self.assertIn("<h4>Variables (3)</h4>", content)
+        self.assertIn("<code>name</code> string <em>required</em>", content)
+        self.assertIn("= { Team = &quot;platform&quot; }", content)
+
+
+if __name__ == "__main__":
+    unittest.main()
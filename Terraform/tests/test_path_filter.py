@@ -0,0 +1,141 @@
+"""
+Tests for the gitignore-style path filters
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import load_plugin_module
+
+terraform_path_filter = load_plugin_module("terraform_path_filter")
+
+TerraformPathFilter = terraform_path_filter.TerraformPathFilter
+
+
+def write(path, content=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class TestPathFilter(unittest.TestCase):
+    """Matching paths against patterns"""
+
+    def test_names_match_at_any_depth(self):
+        path_filter = TerraformPathFilter(["vendor", "*.tfstate"])
+
+        self.assertTrue(path_filter.matches("vendor", is_dir=True))
+        self.assertTrue(path_filter.matches("stacks/app/vendor", is_dir=True))
+        self.assertTrue(path_filter.matches("stacks/app/terraform.tfstate"))
+        self.assertFalse(path_filter.matches("stacks/vendored", is_dir=True))
+
+    def test_slashes_anchor_patterns(self):
+        path_filter = TerraformPathFilter(["/build", "examples/*"])
+
+        self.assertTrue(path_filter.matches("build", is_dir=True))
+        self.assertFalse(path_filter.matches("app/build", is_dir=True))
+        self.assertTrue(path_filter.matches("examples/basic", is_dir=True))
+        self.assertFalse(path_filter.matches("modules/examples/basic", is_dir=True))
+        self.assertFalse(path_filter.matches("examples/basic/main.tf"))
+
+    def test_double_star(self):
+        path_filter = TerraformPathFilter(["**/.terragrunt-cache/**", "docs/**/*.md"])
+
+        self.assertTrue(path_filter.matches("a/b/.terragrunt-cache", is_dir=True))
+        self.assertTrue(path_filter.matches(".terragrunt-cache/x/main.tf"))
+        self.assertTrue(path_filter.matches("docs/README.md"))
+        self.assertTrue(path_filter.matches("docs/a/b/usage.md"))
+        self.assertFalse(path_filter.matches("src/README.md"))
+
+    def test_directory_patterns_only_match_directories(self):
+        path_filter = TerraformPathFilter(["tmp/"])
+
+        self.assertTrue(path_filter.matches("app/tmp", is_dir=True))
+        self.assertFalse(path_filter.matches("app/tmp"))
+
+    def test_last_matching_pattern_wins(self):
+        path_filter = TerraformPathFilter(["examples/*", "!examples/complete"])
+
+        self.assertTrue(path_filter.matches("examples/basic", is_dir=True))
+        self.assertFalse(path_filter.matches("examples/complete", is_dir=True))
+        self.assertIs(path_filter.check("examples/complete", is_dir=True), False)
+        self.assertIsNone(path_filter.check("modules/vpc", is_dir=True))
+
+    def test_comments_and_blank_lines_are_skipped(self):
+        path_filter = TerraformPathFilter(["# comment", "", "   ", "\\#file"])
+
+        self.assertEqual(len(path_filter.rules), 1)
+        self.assertTrue(path_filter.matches("#file"))
+
+    def test_unanchored_patterns_match_absolute_paths(self):
+        path_filter = TerraformPathFilter(["examples/*", "/srv/legacy"], anchored=False)
+
+        self.assertTrue(path_filter.matches("/repo/modules/examples/a", is_dir=True))
+        self.assertTrue(path_filter.matches("/srv/legacy", is_dir=True))
+        self.assertFalse(path_filter.matches("/repo/srv/legacy", is_dir=True))
+
+
+class TestWalkFolder(unittest.TestCase):
+    """Walking a folder while pruning ignored directories"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        for path in (
+            "stacks/app/main.tf",
+            "stacks/app/.terraform/modules/modules.json",
+            "stacks/legacy/main.tf",
+            "vendor/module/main.tf",
+            "examples/basic/main.tf",
+            "examples/complete/main.tf",
+        ):
+            write(os.path.join(self.folder, path))
+
+    def walk(self, filters=()):
+        return sorted(
+            os.path.relpath(root, self.folder).replace(os.sep, "/")
+            for root, dirs, files in terraform_path_filter.walk_folder(
+                self.folder, filters
+            )
+        )
+
+    def test_ignore_files_prune_directories(self):
+        write(os.path.join(self.folder, ".gitignore"), "vendor/\n.terraform\n")
+        write(
+            os.path.join(self.folder, "examples", ".terraformignore"),
+            "*\n!complete\n!.terraformignore\n",
+        )
+
+        self.assertEqual(
+            self.walk(),
+            [
+                ".",
+                "examples",
+                "examples/complete",
+                "stacks",
+                "stacks/app",
+                "stacks/legacy",
+            ],
+        )
+
+    def test_filters_prune_directories(self):
+        filters = [TerraformPathFilter(["legacy/", "examples/**"], anchored=False)]
+
+        self.assertEqual(
+            self.walk(filters),
+            [
+                ".",
+                "stacks",
+                "stacks/app",
+                "stacks/app/.terraform",
+                "stacks/app/.terraform/modules",
+                "vendor",
+                "vendor/module",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Tests for the performance instrumentation
+"""
+
+import json
+import unittest
+
+from support import load_plugin_module
+
+terraform_perf = load_plugin_module("terraform_perf")
+
+
+class TestPerfRecorder(unittest.TestCase):
+    """Recording timings of operations"""
+
+    def setUp(self):
+        self.recorder = terraform_perf.get_perf_recorder()
+        self.recorder.reset()
+        self.addCleanup(self.recorder.reset)
+        self.addCleanup(self.recorder.configure, False)
+
+    def test_nothing_is_recorded_while_disabled(self):
+        self.recorder.configure(False)
+
+        @terraform_perf.timed("test.decorated")
+        def work():
+            return 42
+
+        with terraform_perf.span("test.block") as timing:
+            timing.add_bytes(10)
+
+        self.assertEqual(work(), 42)
+        self.assertIs(timing, terraform_perf._null_span)
+        self.assertEqual(self.recorder.get_stats(), [])
+
+    def test_spans_and_decorators_are_recorded(self):
+        self.recorder.configure(True)
+
+        @terraform_perf.timed("test.decorated")
+        def work():
+            return 42
+
+        for _ in range(3):
+            work()
+        with terraform_perf.span("test.block", 100) as timing:
+            timing.add_bytes(28)
+
+        stats = dict(self.recorder.get_stats())
+        self.assertEqual(stats["test.decorated"]["count"], 3)
+        self.assertEqual(stats["test.block"]["count"], 1)
+        self.assertEqual(stats["test.block"]["bytes"], 128)
+
+    def test_failures_are_recorded(self):
+        self.recorder.configure(True)
+
+        @terraform_perf.timed("test.failing")
+        def fail():
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertEqual(dict(self.recorder.get_stats())["test.failing"]["count"], 1)
+
+    def test_percentiles(self):
+        stat = terraform_perf.TerraformPerfStat()
+        for ms in range(1, 101):
+            stat.add(ms / 1000)
+
+        self.assertAlmostEqual(stat.percentile(50), 0.050, delta=0.0011)
+        self.assertAlmostEqual(stat.percentile(95), 0.095, delta=0.0011)
+        self.assertAlmostEqual(stat.max, 0.100)
+
+    def test_trace_events(self):
+        self.recorder.configure(True, tracing=True)
+        with terraform_perf.span("test.traced", 5, path="/tmp"):
+            pass
+
+        trace = json.loads(json.dumps(self.recorder.get_trace()))
+        events = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["name"], "test.traced")
+        self.assertEqual(events[0]["cat"], "test")
+        self.assertEqual(events[0]["args"], {"path": "/tmp", "bytes": 5})
+        self.assertTrue(any(e["ph"] == "M" for e in trace["traceEvents"]))
+
+    def test_stats_table(self):
+        self.recorder.configure(True)
+        with terraform_perf.span("test.block", 2048):
+            pass
+
+        table = terraform_perf.TerraformShowPerformanceStatsCommand().format_stats()
+        self.assertIn("test.block", table)
+        self.assertIn("2.0KB", table)
+
+
+if __name__ == "__main__":
+    unittest.main()
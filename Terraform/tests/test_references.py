@@ -0,0 +1,320 @@
+"""
+Tests for the block scanner and the reference graph
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from support import load_plugin_module, sublime, wait_until
+
+terraform_blocks = load_plugin_module("terraform_blocks")
+terraform_code_lens = load_plugin_module("terraform_code_lens")
+terraform_references = load_plugin_module("terraform_references")
+
+MAIN_TF = """\
+variable "cidr" {
+  type = string
+  validation {
+    condition     = can(cidrhost(var.cidr, 0))
+    error_message = "Not a CIDR: {var.cidr}"
+  }
+}
+
+locals {
+  name = "${var.prefix}-net" # var.unused
+  tags = {
+    Name = local.name
+  }
+}
+
+module "network" {
+  source = "./modules/network"
+  cidr   = var.cidr
+  tags   = local.tags
+}
+
+resource "aws_instance" "web" {
+  count     = 2
+  subnet_id = module.network.subnet_ids[count.index]
+  user_data = <<-EOT
+    #!/bin/sh
+    echo "${module.network.vpc_id}" }
+  EOT
+}
+"""
+
+OUTPUTS_TF = """\
+output "vpc_id" {
+  value = module.network.vpc_id
+}
+
+output "ips" {
+  value = aws_instance.web[*].private_ip
+}
+
+data "aws_region" "this" {}
+
+output "region" {
+  value = data.aws_region.this.name
+}
+"""
+
+
+class TestBlockScanner(unittest.TestCase):
+    """Finding blocks and attributes without an HCL parser"""
+
+    def test_top_level_blocks(self):
+        blocks = terraform_blocks.scan_blocks(MAIN_TF)
+
+        self.assertEqual(
+            [block.address for block in blocks],
+            ["var.cidr", None, "module.network", "aws_instance.web"],
+        )
+        self.assertEqual((blocks[0].line, blocks[0].end_line), (1, 7))
+        self.assertEqual((blocks[3].line, blocks[3].end_line), (22, 29))
+
+    def test_locals_attributes(self):
+        locals_block = terraform_blocks.scan_blocks(MAIN_TF)[1]
+        attributes = terraform_blocks.find_attributes(MAIN_TF, locals_block)
+
+        self.assertEqual([name for name, _ in attributes], ["name", "tags"])
+
+    def test_unclosed_block_runs_to_the_end(self):
+        blocks = terraform_blocks.scan_blocks('resource "a_b" "c" {\n  x = 1\n')
+
+        self.assertEqual(blocks[0].address, "a_b.c")
+        self.assertEqual(blocks[0].end_line, 2)
+
+
+class TestFindReferences(unittest.TestCase):
+    """Finding references in expressions"""
+
+    def references(self, text):
+        return [
+            path for path, _ in terraform_references.find_references(text, 0, len(text))
+        ]
+
+    def test_references_in_expressions_and_interpolations(self):
+        self.assertEqual(
+            self.references('x = "${var.a}-b.c" # var.d\ny = aws_s3_bucket.b[0].arn'),
+            ["var.a", "aws_s3_bucket.b.arn"],
+        )
+
+    def test_meta_references_are_skipped(self):
+        self.assertEqual(self.references("x = each.value\ny = count.index"), [])
+
+    def test_base_addresses(self):
+        get_base_address = terraform_references.get_base_address
+        self.assertEqual(get_base_address("module.network.vpc_id"), "module.network")
+        self.assertEqual(
+            get_base_address("data.aws_region.this.name"), "data.aws_region.this"
+        )
+        self.assertEqual(get_base_address("aws_instance.web.id"), "aws_instance.web")
+
+
+class TestReferenceGraph(unittest.TestCase):
+    """Answering reference queries from the graph"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.write("main.tf", MAIN_TF)
+        self.write("outputs.tf", OUTPUTS_TF)
+        self.graph = terraform_references.TerraformReferenceGraph(self.root)
+        self.graph.refresh()
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def test_dependents_and_dependencies(self):
+        graph = self.graph
+        self.assertEqual(
+            graph.get_dependents("module.network"),
+            ["aws_instance.web", "output.vpc_id"],
+        )
+        self.assertEqual(
+            graph.get_dependencies("module.network"), ["local.tags", "var.cidr"]
+        )
+        self.assertEqual(graph.get_dependencies("local.tags"), ["local.name"])
+        self.assertEqual(graph.get_dependencies("local.name"), [])
+        self.assertEqual(graph.get_dependents("var.cidr"), ["module.network"])
+        self.assertEqual(graph.count_dependents("data.aws_region.this"), 1)
+
+    def test_find_references_to_an_output_of_a_module(self):
+        references = self.graph.find_references("module.network.vpc_id")
+
+        self.assertEqual(
+            [
+                (os.path.basename(f), line, source)
+                for f, line, _, source, _ in references
+            ],
+            [("main.tf", 27, "aws_instance.web"), ("outputs.tf", 2, "output.vpc_id")],
+        )
+        self.assertEqual(len(self.graph.find_references("module.network")), 3)
+
+    def test_symbol_at_line(self):
+        self.assertEqual(self.graph.get_symbol_at(self.path("main.tf"), 4), "var.cidr")
+        self.assertEqual(
+            self.graph.get_symbol_at(self.path("main.tf"), 12), "local.tags"
+        )
+        self.assertEqual(
+            self.graph.get_symbol_at(self.path("main.tf"), 10), "local.name"
+        )
+        self.assertIsNone(self.graph.get_symbol_at(self.path("main.tf"), 8))
+
+    def test_file_updates_are_incremental(self):
+        self.graph.update_file(
+            self.path("outputs.tf"), 'output "vpc_id" {\n  value = var.cidr\n}\n'
+        )
+
+        self.assertEqual(
+            self.graph.get_dependents("module.network"), ["aws_instance.web"]
+        )
+        self.assertEqual(
+            self.graph.get_dependents("var.cidr"), ["module.network", "output.vpc_id"]
+        )
+        self.assertNotIn("output.region", self.graph.blocks)
+        self.assertNotIn("data.aws_region.this", self.graph.dependents)
+
+    def test_deleted_files_are_forgotten(self):
+        os.remove(self.path("outputs.tf"))
+        self.graph.refresh()
+
+        self.assertEqual(
+            self.graph.get_dependents("module.network"), ["aws_instance.web"]
+        )
+        self.assertEqual(self.graph.find_references("aws_instance.web"), [])
+
+
+class TestConcurrentUpdates(unittest.TestCase):
+    """Reading a reference graph while files are indexed again"""
+
+    def test_readers_wait_for_updates_in_progress(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with open(os.path.join(root, "main.tf"), "w") as f:
+            f.write(MAIN_TF)
+        graph = terraform_references.TerraformReferenceGraph(root)
+        graph.refresh()
+
+        for read in (
+            graph.refresh,
+            graph.get_module_calls,
+            lambda: graph.get_dependents("var.cidr"),
+            lambda: graph.count_references("var.cidr"),
+            lambda: graph.get_file_symbols(os.path.join(root, "main.tf")),
+        ):
+            # An update holds the lock while it changes the graph
+            with graph._lock:
+                reader = threading.Thread(target=read)
+                reader.start()
+                reader.join(0.05)
+                self.assertTrue(reader.is_alive())
+            reader.join(5)
+            self.assertFalse(reader.is_alive())
+
+
+class TestReferenceCounts(unittest.TestCase):
+    """Showing reference counts around the viewport"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.main = os.path.join(self.root, "main.tf")
+        for name, content in (("main.tf", MAIN_TF), ("outputs.tf", OUTPUTS_TF)):
+            with open(os.path.join(self.root, name), "w") as f:
+                f.write(content)
+        self.graph = terraform_references.TerraformReferenceGraph(self.root)
+        self.graph.refresh()
+
+    def test_counts_of_the_blocks_in_a_line_range(self):
+        counts = terraform_code_lens.get_reference_counts(self.graph, self.main, 2, 16)
+
+        self.assertEqual(
+            counts,
+            {"local.name": (10, 1), "local.tags": (11, 1), "module.network": (16, 3)},
+        )
+
+    def test_only_changed_counts_get_new_phantoms(self):
+        view = sublime.View(text=MAIN_TF, file_name=self.main)
+        counts = terraform_code_lens.TerraformReferenceCounts(view, self.root)
+        get_counts = terraform_code_lens.get_reference_counts
+
+        self.assertTrue(counts.update(get_counts(self.graph, self.main, 1, 100)))
+        phantoms = dict(counts.shown)
+        self.assertEqual(
+            phantoms["aws_instance.web"][1].region,
+            sublime.Region(MAIN_TF.index("\n", MAIN_TF.index('resource "aws'))),
+        )
+        self.assertFalse(counts.update(get_counts(self.graph, self.main, 1, 100)))
+
+        self.graph.update_file(
+            os.path.join(self.root, "outputs.tf"),
+            'output "ips" {\n  value = var.cidr\n}',
+        )
+        self.assertTrue(counts.update(get_counts(self.graph, self.main, 1, 100)))
+
+        self.assertEqual(counts.phantom_set.updates, 2)
+        self.assertIs(counts.shown["local.tags"][1], phantoms["local.tags"][1])
+        self.assertIsNot(counts.shown["var.cidr"][1], phantoms["var.cidr"][1])
+        self.assertIn("2 references", counts.shown["var.cidr"][1].content)
+
+    def test_cursor_moves_inside_the_viewport_redraw_nothing(self):
+        view = sublime.View(text=MAIN_TF, file_name=self.main)
+        counts = terraform_code_lens.TerraformReferenceCounts(view, self.root)
+        counts.view_state = (view.visible_region(), view.change_count())
+        listener = terraform_code_lens.TerraformReferenceCountListener()
+
+        with mock.patch.multiple(
+            terraform_code_lens,
+            _views={view.id(): counts},
+            update_reference_counts=mock.DEFAULT,
+        ) as patched:
+            listener.on_selection_modified_async(view)
+            patched["update_reference_counts"].assert_not_called()
+
+            view.run_command("append", {"characters": "\n"})
+            listener.on_selection_modified_async(view)
+            patched["update_reference_counts"].assert_called_once_with(view)
+
+    def test_scrolled_viewports_are_redrawn(self):
+        view = sublime.View(text=MAIN_TF, file_name=self.main)
+        counts = terraform_code_lens.TerraformReferenceCounts(view, self.root)
+        counts.viewport = view.viewport_position()
+        updated = []
+
+        def update_reference_counts(view):
+            counts.viewport = view.viewport_position()
+            updated.append(counts.viewport)
+
+        with mock.patch.multiple(
+            terraform_code_lens,
+            _views={view.id(): counts},
+            update_reference_counts=update_reference_counts,
+            VIEWPORT_POLL_INTERVAL=10,
+        ):
+            self.addCleanup(terraform_code_lens.stop_viewport_poll)
+            terraform_code_lens.poll_viewport(view)
+            view.set_viewport_position((0.0, 400.0))
+
+            self.assertTrue(wait_until(lambda: updated))
+            self.assertEqual(updated, [(0.0, 400.0)])
+
+            terraform_code_lens.stop_viewport_poll(view)
+            view.set_viewport_position((0.0, 800.0))
+            threading.Event().wait(0.1)
+            self.assertEqual(updated, [(0.0, 400.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Tests for the workspace module and provider report
+"""
+
+import ntpath
+import os
+import shutil
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from support import load_plugin_module
+
+terraform_references = load_plugin_module("terraform_references")
+terraform_report = load_plugin_module("terraform_report")
+
+APP_TF = """\
+terraform {
+  required_providers {
+    aws = {
+      source  = "hashicorp/aws"
+      version = "~> 5.0"
+    }
+  }
+}
+
+module "network" {
+  source  = "terraform-aws-modules/vpc/aws"
+  version = "5.1.0"
+  tags    = { Name = "app" }
+}
+
+module "dns" {
+  source = "git::https://example.com/dns.git?ref=v1.2.0"
+}
+"""
+
+DB_TF = """\
+terraform {
+  required_providers {
+    aws = "~> 4.0"
+  }
+}
+
+module "network" {
+  source  = "terraform-aws-modules/vpc/aws"
+  version = "4.0.2"
+}
+
+module "backup" {
+  source = "../modules/backup"
+}
+"""
+
+EDGE_TF = """\
+module "network" {
+  source  = "terraform-aws-modules/vpc/aws"
+  version = "5.1.0"
+}
+"""
+
+
+class TestWorkspaceReport(unittest.TestCase):
+    """Collecting module and provider usage across root modules"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.addCleanup(terraform_references.close_reference_graphs)
+        self.roots = []
+        for name, content in (("app", APP_TF), ("db", DB_TF), ("edge", EDGE_TF)):
+            root = os.path.join(self.folder, name)
+            os.makedirs(root)
+            with open(os.path.join(root, "main.tf"), "w") as f:
+                f.write(content)
+            self.roots.append(root)
+        graphs = terraform_report.index_roots(self.roots, workers=2)
+        self.modules, self.providers = terraform_report.collect_usage(graphs)
+
+    def test_module_calls_are_grouped_by_source_and_version(self):
+        vpc = self.modules["terraform-aws-modules/vpc/aws"]
+
+        self.assertEqual(vpc.calls, 3)
+        self.assertEqual(vpc.roots, 3)
+        self.assertEqual(sorted(vpc.versions), ["4.0.2", "5.1.0"])
+        self.assertEqual(
+            self.modules["git::https://example.com/dns.git"].versions,
+            {"v1.2.0": [(os.path.join(self.roots[0], "main.tf"), 16, "module.dns")]},
+        )
+        self.assertEqual(list(self.modules["../modules/backup"].versions), ["local"])
+
+    def test_provider_constraints(self):
+        aws = self.providers["hashicorp/aws"]
+
+        self.assertEqual(sorted(aws.versions), ["~> 4.0", "~> 5.0"])
+        self.assertEqual(aws.roots, 2)
+
+    def test_locked_provider_inventory(self):
+        for root, version in zip(self.roots, ("5.31.0", "5.31.0", "4.67.0")):
+            with open(os.path.join(root, ".terraform.lock.hcl"), "w") as f:
+                f.write(
+                    'provider "registry.terraform.io/hashicorp/aws" {\n'
+                    f'  version = "{version}"\n'
+                    '  hashes  = ["h1:a", "zh:b"]\n'
+                    "}\n"
+                )
+        lock_files = terraform_report.read_lock_files(self.roots, workers=2)
+        locked = terraform_report.collect_locked_providers(lock_files)
+
+        self.assertEqual(list(locked), ["hashicorp/aws"])
+        self.assertEqual(
+            locked["hashicorp/aws"].versions["5.31.0"][0][1:],
+            (1, "no constraints, 2 hashes"),
+        )
+
+        inventory = terraform_report.format_inventory(locked, "source", self.folder, 3)
+        self.assertIn("hashicorp/aws: 2 versions, 3 lock files in 3 roots", inventory)
+
+    def test_report_sorted_by_drift(self):
+        report = terraform_report.format_report(
+            self.modules, self.providers, "drift", self.folder, 3
+        )
+
+        self.assertTrue(
+            report.startswith(
+                "Terraform workspace report: 3 module sources, 5 module calls and "
+                "1 providers in 3 root modules"
+            )
+        )
+        self.assertLess(
+            report.index("terraform-aws-modules/vpc/aws: 2 versions, 3 calls"),
+            report.index("../modules/backup: 1 version, 1 call in 1 root"),
+        )
+        self.assertIn(
+            f"  5.1.0: 2\n    {os.path.join('app', 'main.tf')}:10 module.network\n",
+            report,
+        )
+
+    def test_folders_on_different_drives(self):
+        with mock.patch.object(
+            terraform_report, "os", types.SimpleNamespace(path=ntpath)
+        ):
+            base_dir = terraform_report.get_base_dir(["C:\\infra", "D:\\modules"])
+            self.assertEqual(base_dir, "C:\\infra")
+            self.assertEqual(
+                terraform_report.get_report_path("C:\\infra\\app\\main.tf", base_dir),
+                "app\\main.tf",
+            )
+            self.assertEqual(
+                terraform_report.get_report_path("D:\\modules\\main.tf", base_dir),
+                "D:\\modules\\main.tf",
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
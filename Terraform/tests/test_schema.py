@@ -0,0 +1,247 @@
+"""
+Tests for the provider schema cache
+"""
+
+import io
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+from support import load_default_settings, load_plugin_module, set_setting, wait_until
+
+terraform_schema = load_plugin_module("terraform_schema")
+terraform_settings = load_plugin_module("terraform_settings")
+
+# What the fake terraform prints for providers schema -json
+RAW_SCHEMA = {
+    "format_version": "1.0",
+    "provider_schemas": {
+        "registry.terraform.io/hashicorp/aws": {
+            "provider": {
+                "version": 0,
+                "block": {
+                    "attributes": {
+                        "region": {
+                            "type": "string",
+                            "optional": True,
+                            "description_kind": "plain",
+                        }
+                    },
+                    "description_kind": "plain",
+                },
+            },
+            "resource_schemas": {
+                "aws_s3_bucket": {
+                    "version": 0,
+                    "block": {
+                        "attributes": {
+                            "bucket": {"type": "string", "optional": True},
+                            "tags": {"type": ["map", "string"], "optional": True},
+                            "arn": {"type": "string", "computed": True},
+                        },
+                        "block_types": {
+                            "versioning": {
+                                "nesting_mode": "list",
+                                "max_items": 1,
+                                "block": {
+                                    "attributes": {
+                                        "enabled": {"type": "bool", "optional": True}
+                                    }
+                                },
+                            }
+                        },
+                        "description": "Provides a S3 bucket resource.",
+                        "description_kind": "plain",
+                    },
+                }
+            },
+            "data_source_schemas": {
+                "aws_region": {
+                    "version": 0,
+                    "block": {
+                        "attributes": {"name": {"type": "string", "computed": True}}
+                    },
+                }
+            },
+        }
+    },
+}
+
+# Fake terraform that counts its runs in the file named by the first argument
+FAKE_TERRAFORM = """\
+#!{python}
+import sys
+with open({runs!r}, "a") as f:
+    f.write(" ".join(sys.argv[1:]) + "\\n")
+print({schema!r})
+"""
+
+
+class TestCompactSchema(unittest.TestCase):
+    """Compacting the raw schemas"""
+
+    def test_types_are_formatted_like_terraform(self):
+        self.assertEqual(terraform_schema.format_type("string"), "string")
+        self.assertEqual(terraform_schema.format_type("dynamic"), "any")
+        self.assertEqual(
+            terraform_schema.format_type(["list", ["map", "number"]]),
+            "list(map(number))",
+        )
+        self.assertEqual(
+            terraform_schema.format_type(["object", {"a": "bool"}]),
+            "object({a = bool})",
+        )
+
+    def test_blocks_keep_only_what_is_used(self):
+        raw = RAW_SCHEMA["provider_schemas"]["registry.terraform.io/hashicorp/aws"]
+        block = terraform_schema.compact_provider(raw)["resources"]["aws_s3_bucket"]
+
+        self.assertEqual(
+            block["attributes"]["tags"], {"type": "map(string)", "optional": True}
+        )
+        self.assertEqual(
+            block["attributes"]["arn"], {"type": "string", "computed": True}
+        )
+        self.assertEqual(block["blocks"]["versioning"]["nesting"], "list")
+        self.assertEqual(block["blocks"]["versioning"]["max_items"], 1)
+        self.assertNotIn("description_kind", json.dumps(block))
+
+
+class TestRawProviders(unittest.TestCase):
+    """Reading terraform's output one provider at a time"""
+
+    def read(self, text, chunk_size):
+        return list(terraform_schema.iter_raw_providers(io.StringIO(text), chunk_size))
+
+    def test_providers_are_decoded_across_chunks(self):
+        raw = dict(json.loads(json.dumps(RAW_SCHEMA)), format_version=1.0)
+        raw["provider_schemas"]["registry.terraform.io/hashicorp/null"] = {
+            "provider": {"version": 12345, "block": {}}
+        }
+        expected = list(raw["provider_schemas"].items())
+
+        for indent in (None, 2):
+            text = json.dumps(raw, indent=indent)
+            for chunk_size in (1, 7, 64, len(text)):
+                self.assertEqual(self.read(text, chunk_size), expected)
+
+    def test_empty_provider_schemas(self):
+        self.assertEqual(self.read('{"format_version": "1.0"}', 4), [])
+        self.assertEqual(self.read('{"provider_schemas": {}}', 4), [])
+
+    def test_broken_output_is_an_error(self):
+        text = json.dumps(RAW_SCHEMA)
+        for broken in (text[:-40], "[]", "", "Error: no lock file"):
+            with self.assertRaises(ValueError):
+                self.read(broken, 16)
+
+
+@unittest.skipIf(sys.platform == "win32", "the fake terraform is a script")
+class TestSchemaCache(unittest.TestCase):
+    """Generating, sharing and lazily loading cached schemas"""
+
+    def setUp(self):
+        load_default_settings()
+        self.addCleanup(load_default_settings)
+        self.addCleanup(terraform_settings.unload_settings_snapshot)
+
+        self.folder = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.runs = os.path.join(self.folder, "runs.txt")
+        terraform = os.path.join(self.folder, "terraform")
+        with open(terraform, "w") as f:
+            f.write(
+                FAKE_TERRAFORM.format(
+                    python=sys.executable,
+                    runs=self.runs,
+                    schema=json.dumps(RAW_SCHEMA),
+                )
+            )
+        os.chmod(terraform, os.stat(terraform).st_mode | stat.S_IEXEC)
+        set_setting("terraform_path", terraform)
+
+        self.cache = terraform_schema.TerraformSchemaCache(
+            os.path.join(self.folder, "cache")
+        )
+        self.addCleanup(self.cache.close)
+
+    def make_root(self, name, lock="# providers\n"):
+        root = os.path.join(self.folder, name)
+        os.makedirs(os.path.join(root, ".terraform"))
+        with open(os.path.join(root, ".terraform.lock.hcl"), "w") as f:
+            f.write(lock)
+        return root
+
+    def count_runs(self):
+        if not os.path.exists(self.runs):
+            return 0
+        with open(self.runs) as f:
+            return len(f.readlines())
+
+    def test_schemas_are_generated_once_per_lock_file(self):
+        app = self.make_root("app")
+        db = self.make_root("db")
+
+        schemas = self.cache.generate(app, self.cache.get_lock_hash(app))
+
+        self.assertEqual(
+            schemas.resource_types,
+            {"aws_s3_bucket": "registry.terraform.io/hashicorp/aws"},
+        )
+        self.assertIs(self.cache.get_schemas(db), schemas)
+        self.assertEqual(self.count_runs(), 1)
+
+    def test_providers_are_loaded_on_first_use(self):
+        app = self.make_root("app")
+        self.cache.generate(app, self.cache.get_lock_hash(app))
+
+        cache = terraform_schema.TerraformSchemaCache(self.cache.cache_dir)
+        schemas = cache.get_schemas(app, generate=False)
+        self.assertEqual(len(cache._providers), 0)
+
+        bucket = schemas.get_resource("aws_s3_bucket")
+        self.assertEqual(bucket["description"], "Provides a S3 bucket resource.")
+        self.assertIsNotNone(schemas.get_data_source("aws_region"))
+        self.assertEqual(len(cache._providers), 1)
+        self.assertIsNone(schemas.get_resource("aws_instance"))
+
+    def test_changed_lock_file_is_generated_in_background(self):
+        app = self.make_root("app")
+        self.cache.generate(app, self.cache.get_lock_hash(app))
+        old_dir = self.cache.get_schema_dir(self.cache.get_lock_hash(app))
+
+        with open(os.path.join(app, ".terraform.lock.hcl"), "a") as f:
+            f.write("# upgraded\n")
+        self.assertIsNone(self.cache.get_schemas(app))
+
+        self.assertTrue(
+            wait_until(lambda: self.cache.get_schemas(app, generate=False) is not None)
+        )
+        self.assertTrue(os.path.isdir(old_dir))
+        self.assertEqual(self.count_runs(), 2)
+
+    def test_uninitialized_roots_are_skipped(self):
+        root = os.path.join(self.folder, "new")
+        os.makedirs(root)
+        with open(os.path.join(root, ".terraform.lock.hcl"), "w") as f:
+            f.write("# providers\n")
+
+        self.assertIsNone(self.cache.get_schemas(root))
+        self.assertEqual(self.count_runs(), 0)
+
+    def test_failures_are_not_retried(self):
+        app = self.make_root("app")
+        set_setting("terraform_path", os.path.join(self.folder, "missing"))
+
+        self.assertIsNone(self.cache.generate(app, self.cache.get_lock_hash(app)))
+        self.assertIsNotNone(self.cache.get_error(app))
+        self.assertIsNone(self.cache.get_schemas(app))
+        self.assertEqual(os.listdir(self.cache.cache_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Tests for the settings and their snapshot
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from support import load_default_settings, load_plugin_module, set_setting, sublime
+
+terraform_settings = load_plugin_module("terraform_settings")
+terraform_project = load_plugin_module("terraform_project")
+
+
+class SettingsTestCase(unittest.TestCase):
+    """Start every test from the default settings"""
+
+    def setUp(self):
+        load_default_settings()
+        self.addCleanup(load_default_settings)
+        self.addCleanup(terraform_settings.unload_settings_snapshot)
+
+
+class TestNestedSettings(SettingsTestCase):
+    """Dotted keys for nested settings"""
+
+    def test_dotted_keys_are_resolved(self):
+        settings = terraform_settings.get_settings()
+
+        self.assertEqual(settings.get("language_server.args"), ["serve"])
+        self.assertEqual(settings.get("terraform_cloud.cache.ttl.runs"), 15)
+        self.assertEqual(settings.get("language_server.missing", "x"), "x")
+        self.assertEqual(settings.get("terraform_path.missing", "x"), "x")
+
+    def test_dotted_keys_are_set_in_place(self):
+        settings = terraform_settings.get_settings()
+        settings.set("language_server.path", "/usr/bin/terraform-ls")
+
+        self.assertEqual(settings.get("language_server.path"), "/usr/bin/terraform-ls")
+        self.assertEqual(settings.get("language_server")["args"], ["serve"])
+        raw = sublime.load_settings(terraform_settings.TerraformSettings.SETTINGS_FILE)
+        self.assertFalse(raw.has("language_server.path"))
+
+
+class TestSettingsSnapshot(SettingsTestCase):
+    """The read-only settings snapshot"""
+
+    def test_snapshot_is_read_only(self):
+        snapshot = terraform_settings.get_settings_snapshot()
+
+        with self.assertRaises(AttributeError):
+            snapshot.terraform_path = "tofu"
+        with self.assertRaises(TypeError):
+            snapshot.get("terraform_cloud")["hostname"] = "tfe.example.com"
+        self.assertIsInstance(snapshot.get("root_modules"), tuple)
+
+    def test_snapshot_is_rebuilt_when_settings_change(self):
+        snapshot = terraform_settings.get_settings_snapshot()
+        self.assertIs(terraform_settings.get_settings_snapshot(), snapshot)
+
+        set_setting("terraform_path", "/opt/terraform")
+
+        self.assertIsNot(terraform_settings.get_settings_snapshot(), snapshot)
+        self.assertEqual(
+            terraform_settings.get_settings_snapshot().terraform_path, "/opt/terraform"
+        )
+
+    def test_walking_directories_does_not_read_settings(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for i in range(20):
+                stack = os.path.join(folder, f"stack-{i}")
+                os.makedirs(os.path.join(stack, ".terraform"))
+                with open(os.path.join(stack, "main.tf"), "w") as f:
+                    f.write('resource "null_resource" "this" {}\n')
+            terraform_settings.get_settings_snapshot()
+
+            with mock.patch.object(
+                terraform_settings.TerraformSettings, "get"
+            ) as settings_get:
+                terraform_project.TerraformProjectDetector.refresh_projects(
+                    sublime.Window([folder])
+                )
+
+            settings_get.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()